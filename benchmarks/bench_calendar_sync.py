@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日历同步插件基准测试
+sync_calendars() 的合并和查询、增量同步、后台同步期间的GUI帧间隔、iCalendar 解析和重复事件展开、
+CalendarWidget.update_events() 的组件重建随事件数量变化的开销
+"""
+
+import importlib
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from PyQt6.QtCore import QCoreApplication, QEventLoop
+
+from plugin_host_stub import process_deferred_deletes
+
+
+def make_events(count, now=None):
+    """生成 count 个与 generate_sample_events() 格式相同的事件，顺序打乱"""
+    now = now or datetime.now()
+    events = []
+    for index in range(count):
+        # 用固定步长打乱顺序，让排序有实际工作量
+        start = now + timedelta(minutes=(index * 37) % (count * 15 + 1))
+        end = start + timedelta(minutes=45)
+        all_day = index % 10 == 0
+        events.append({
+            'id': f'{now:%Y%m%d}-{index}',
+            'title': f'事件 {index}',
+            'start_time': start.strftime('%H:%M'),
+            'end_time': end.strftime('%H:%M'),
+            'all_day': all_day,
+            'start_datetime': start,
+            'end_datetime': end
+        })
+    return events
+
+
+@pytest.mark.parametrize('count', [10, 1000, 10000])
+def bench_sync_calendars(benchmark, make_plugin, count):
+    """同步数据路径：合并 count 个事件、查询显示的事件和检查提醒，不创建界面组件"""
+    plugin = make_plugin('calendar_sync', event_reminder=True)
+    events = make_events(count)
+    plugin.generate_sample_events = lambda: list(events)
+    
+    benchmark(plugin.sync_calendars, background=False)
+    
+    assert len(plugin.events) == plugin.settings['show_upcoming_events']
+
+
+class ChangesSource:
+    """第一次同步返回全部事件，之后每次返回 changes 个修改过的事件"""
+    
+    source_id = 'bench'
+    
+    def __init__(self, events, changes):
+        self.events = events
+        self.changes = changes
+        self.version = 0
+    
+    def fetch_changes(self, sync_token=None):
+        if sync_token is None:
+            return SimpleNamespace(events=list(self.events), removed=[], token='0', full=True)
+        
+        self.version += 1
+        changed = [dict(event, title=f"{event['title']} v{self.version}") for event in self.events[:self.changes]]
+        return SimpleNamespace(events=changed, removed=[], token=str(self.version), full=False)
+
+
+@pytest.mark.parametrize('count', [1000, 100000])
+def bench_incremental_sync(benchmark, make_plugin, count):
+    """已同步 count 个事件后，每次同步只有10个事件变化"""
+    plugin = make_plugin('calendar_sync')
+    plugin.sources = [ChangesSource(make_events(count), changes=10)]
+    plugin.sync_calendars(background=False)
+    
+    benchmark(plugin.sync_calendars, background=False)
+    
+    assert len(plugin.event_store) == count
+
+
+class SlowSource:
+    """模拟远程日历服务：等待 delay 秒的网络响应，再花CPU时间转换 events"""
+    
+    timeout = 10
+    
+    def __init__(self, source_id, events, delay):
+        self.source_id = source_id
+        self.events = events
+        self.delay = delay
+    
+    def fetch_changes(self, sync_token=None):
+        time.sleep(self.delay)
+        events = [dict(event, id=f"{self.source_id}-{event['id']}") for event in self.events]
+        return SimpleNamespace(events=events, removed=[], token=None, full=True)
+
+
+def bench_background_sync_frame_gaps(benchmark, make_plugin):
+    """三个各需0.05秒的数据源在后台并发同步，同时以约60帧/秒运行GUI事件循环
+    
+    耗时约为单个数据源的延迟而不是三者之和；extra_info 记录同步期间GUI线程最长的帧间隔。
+    """
+    plugin = make_plugin('calendar_sync')
+    plugin.sources = [SlowSource(source_id, make_events(1000), delay=0.05)
+                      for source_id in ('google', 'outlook', 'ics')]
+    statuses = []
+    plugin.events_updated.connect(lambda events, status: statuses.append(status))
+    gaps = []
+    
+    def sync():
+        statuses.clear()
+        assert plugin.sync_calendars()
+        last = time.perf_counter()
+        while not statuses:
+            QCoreApplication.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 16)
+            time.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+    
+    benchmark.pedantic(sync, rounds=10, warmup_rounds=1)
+    benchmark.extra_info['max_frame_gap_ms'] = round(max(gaps) * 1000, 2)
+    
+    assert len(plugin.event_store) == 3000
+    assert '失败' not in statuses[-1]
+
+
+def write_timetable(path, courses, history):
+    """写入一学期的课表：courses 门每周重复20次的课程，以及 history 个已经结束的单次事件"""
+    term_start = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0) - timedelta(weeks=4)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n")
+        for index in range(history):
+            start = datetime(2015, 1, 1, 9) + timedelta(hours=index)
+            f.write(f"BEGIN:VEVENT\r\nUID:history-{index}\r\nSUMMARY:历史事件 {index}\r\n"
+                    f"DTSTART:{start:%Y%m%dT%H%M%S}\r\nDTEND:{start + timedelta(minutes=50):%Y%m%dT%H%M%S}\r\n"
+                    f"END:VEVENT\r\n")
+        for index in range(courses):
+            start = term_start + timedelta(days=index % 5, minutes=index // 5 * 100)
+            f.write(f"BEGIN:VEVENT\r\nUID:course-{index}\r\nSUMMARY:课程 {index}\r\n"
+                    f"DTSTART:{start:%Y%m%dT%H%M%S}\r\nDTEND:{start + timedelta(minutes=95):%Y%m%dT%H%M%S}\r\n"
+                    f"RRULE:FREQ=WEEKLY;COUNT=20\r\nEXDATE:{start + timedelta(weeks=6):%Y%m%dT%H%M%S}\r\n"
+                    f"END:VEVENT\r\n")
+        f.write("END:VCALENDAR\r\n")
+
+
+@pytest.fixture
+def ics_source_class(plugin_loader):
+    """插件包中的 IcsSource"""
+    plugin_loader.import_plugin(plugin_loader.plugins['calendar_sync'])
+    return importlib.import_module('timenest_plugins.calendar_sync.sources').IcsSource
+
+
+@pytest.mark.parametrize('history', [0, 20000])
+def bench_ics_parse(benchmark, ics_source_class, tmp_path, history):
+    """解析30门课的课表文件，history 为文件中已经结束的历史事件数"""
+    path = tmp_path / "timetable.ics"
+    write_timetable(path, courses=30, history=history)
+    source = ics_source_class(str(path), future_days=14)
+    
+    changes = benchmark(source.fetch_changes, None)
+    
+    # 只保留课程的主记录，两周内每门课最多展开两次
+    assert len(source.calendar) == 30
+    assert len(changes.events) <= 60
+
+
+def bench_ics_resync_unchanged(benchmark, ics_source_class, tmp_path):
+    """文件未变化时的同步：不重新解析，只展开可见时间范围"""
+    path = tmp_path / "timetable.ics"
+    write_timetable(path, courses=30, history=0)
+    source = ics_source_class(str(path), future_days=14)
+    token = source.fetch_changes(None).token
+    
+    benchmark(source.fetch_changes, token)
+
+
+@pytest.mark.parametrize('count', [1000, 100000])
+def bench_filter_events(benchmark, make_plugin, count):
+    """从保存了 count 个历史事件的存储中取出即将到来的事件"""
+    plugin = make_plugin('calendar_sync')
+    plugin.event_store.replace_all(make_events(count, now=datetime.now() - timedelta(days=365)))
+    plugin.event_store.update(make_events(10))
+    
+    events = benchmark(plugin.filter_events)
+    
+    assert len(events) == plugin.settings['show_upcoming_events']
+
+
+@pytest.mark.parametrize('count', [10, 50, 200])
+def bench_sync_calendars_with_widget(benchmark, make_plugin, count):
+    """同步并通过 events_updated 信号刷新已创建的日历组件"""
+    plugin = make_plugin('calendar_sync', show_upcoming_events=count)
+    events = make_events(count)
+    plugin.generate_sample_events = lambda: list(events)
+    plugin.get_widget()
+    
+    def sync():
+        plugin.sync_calendars(background=False)
+        process_deferred_deletes()
+    
+    benchmark(sync)
+
+
+@pytest.mark.parametrize('count', [0, 10, 50, 200])
+def bench_calendar_widget_update_events(benchmark, make_plugin, count):
+    """重复刷新日历组件，包含事件循环中执行的 deleteLater() 删除"""
+    plugin = make_plugin('calendar_sync')
+    widget = plugin.get_widget()
+    events = make_events(count)
+    
+    def update():
+        widget.update_events(events, "最后同步: 12:00")
+        process_deferred_deletes()
+    
+    benchmark(update)
+
+
+@pytest.mark.parametrize('count', [10, 50])
+def bench_calendar_widget_rotate_events(benchmark, make_plugin, count):
+    """每次刷新都换成另一组事件（全部删除、全部新增），组件从备用池中复用
+    
+    extra_info 记录反复刷新后事件容器的子对象数和布局项数，两者不随刷新次数增长。
+    """
+    plugin = make_plugin('calendar_sync')
+    widget = plugin.get_widget()
+    now = datetime.now()
+    batches = [make_events(count, now=now), make_events(count, now=now + timedelta(days=1))]
+    rounds = []
+    
+    def update():
+        widget.update_events(batches[len(rounds) % 2], "最后同步: 12:00")
+        rounds.append(None)
+        process_deferred_deletes()
+    
+    benchmark(update)
+    benchmark.extra_info['children'] = len(widget.events_widget.children())
+    benchmark.extra_info['layout_items'] = widget.events_layout.count()
+    
+    # 删除的组件立即被新增的事件复用：count 个事件组件、"无日程"提示和弹性空间
+    assert widget.events_layout.count() == count + 2
+    assert not widget.spare_widgets
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+深色主题插件基准测试
+generate_stylesheet() 的开销，以及生成的样式表应用到不同数量组件时的开销
+"""
+
+import pytest
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton
+
+
+THEMES = ['midnight', 'charcoal', 'obsidian', 'slate']
+
+
+def theme_data(plugin, theme_variant, accent_color='blue'):
+    """与 apply_current_theme() 相同的方式组合主题数据"""
+    data = plugin.themes[theme_variant].copy()
+    data['accent'] = plugin.accent_colors[accent_color]
+    return data
+
+
+@pytest.mark.parametrize('theme_variant', THEMES)
+def bench_generate_stylesheet(benchmark, make_plugin, theme_variant):
+    """生成一次样式表"""
+    plugin = make_plugin('dark_theme')
+    data = theme_data(plugin, theme_variant)
+    
+    stylesheet = benchmark(plugin.generate_stylesheet, data)
+    
+    assert data['accent'] in stylesheet
+
+
+def bench_apply_current_theme(benchmark, make_plugin):
+    """组合主题数据、生成样式表并发送 theme_changed 信号"""
+    plugin = make_plugin('dark_theme', theme_variant='slate', accent_color='purple')
+    
+    benchmark(plugin.apply_current_theme)
+
+
+@pytest.mark.parametrize('widget_count', [10, 100, 1000])
+def bench_stylesheet_restyle(benchmark, make_plugin, widget_count):
+    """把样式表应用到包含 widget_count 个子组件的窗口，切换主题时的主要开销"""
+    plugin = make_plugin('dark_theme')
+    stylesheets = [plugin.generate_stylesheet(theme_data(plugin, variant)) for variant in THEMES]
+    
+    window = QWidget()
+    layout = QVBoxLayout(window)
+    for index in range(widget_count):
+        layout.addWidget(QPushButton(f"按钮 {index}") if index % 2 else QLabel(f"标签 {index}"))
+    window.ensurePolished()
+    
+    state = {'index': 0}
+    
+    def restyle():
+        # 每次切换到不同的主题，避免样式表未变化时的提前返回
+        state['index'] = (state['index'] + 1) % len(stylesheets)
+        window.setStyleSheet(stylesheets[state['index']])
+    
+    benchmark(restyle)
+    
+    window.deleteLater()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+番茄钟插件基准测试
+每秒一次的 PomodoroWidget.update_display() 以及计时器滴答的开销
+"""
+
+import pytest
+
+
+STATES = {
+    'work': ("工作时间", 1499, 1500, 1, 4),
+    'short_break': ("短休息", 299, 300, 1, 4),
+    'long_break': ("长休息", 899, 900, 4, 4)
+}
+
+
+@pytest.mark.parametrize('state', list(STATES))
+def bench_pomodoro_widget_update_display(benchmark, make_plugin, state):
+    """刷新一次计时显示"""
+    plugin = make_plugin('pomodoro_timer')
+    widget = plugin.get_widget()
+    
+    benchmark(widget.update_display, *STATES[state])
+
+
+@pytest.mark.parametrize('ticks', [1, 60, 1500])
+def bench_pomodoro_ticks(benchmark, make_plugin, ticks):
+    """连续 ticks 次 update_timer()，即运行 ticks 秒的开销"""
+    plugin = make_plugin('pomodoro_timer')
+    plugin.get_widget()
+    plugin.is_running = True
+    
+    def run():
+        plugin.time_left = plugin.total_time = ticks + 1
+        for _ in range(ticks):
+            plugin.update_timer()
+    
+    benchmark(run)
+    
+    assert plugin.time_left == 1
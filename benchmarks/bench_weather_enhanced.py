@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+增强天气插件基准测试
+WeatherWidget.update_weather_display() 在不同显示设置下的开销
+"""
+
+import pytest
+
+# 插件模块导入 requests
+pytest.importorskip('requests')
+
+
+WEATHER_DATA = {
+    'temperature': 22.5,
+    'condition': '多云',
+    'humidity': 65,
+    'wind_speed': 12
+}
+
+SETTINGS = {
+    'celsius': {'temperature_unit': 'celsius'},
+    'fahrenheit': {'temperature_unit': 'fahrenheit'},
+    'minimal': {'show_humidity': False, 'show_wind': False}
+}
+
+
+@pytest.mark.parametrize('variant', list(SETTINGS))
+def bench_weather_widget_update_display(benchmark, make_plugin, variant):
+    """刷新一次天气显示"""
+    plugin = make_plugin('weather_enhanced', **SETTINGS[variant])
+    widget = plugin.get_widget()
+    
+    benchmark(widget.update_weather_display, WEATHER_DATA)
+    
+    assert widget.main_info.text().startswith(plugin.settings['location'])
+
+
+@pytest.mark.parametrize('updates', [1, 60])
+def bench_weather_updated_signal(benchmark, make_plugin, updates):
+    """连续多次通过 weather_updated 信号刷新，模拟批量到达的天气数据"""
+    plugin = make_plugin('weather_enhanced')
+    plugin.get_widget()
+    readings = [dict(WEATHER_DATA, temperature=15 + index * 0.1) for index in range(updates)]
+    
+    def emit_all():
+        for reading in readings:
+            plugin.weather_updated.emit(reading)
+    
+    benchmark(emit_all)
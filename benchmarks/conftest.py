@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+插件基准测试的公共配置
+在Qt的offscreen平台下运行，core.plugin_base 使用 plugin_host_stub 中的最小替身实现，
+插件通过 plugin_loader 以包的形式导入，与宿主中的加载方式一致。
+缺少 PyQt6 或 pytest-benchmark 时跳过全部基准测试。
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# 必须在导入 PyQt6 之前设置
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+STORE_DIR = Path(__file__).resolve().parent.parent
+PLUGINS_DIR = STORE_DIR / "plugins"
+
+try:
+    import pytest_benchmark  # noqa: F401
+    from PyQt6.QtWidgets import QApplication
+except ImportError:
+    collect_ignore_glob = ['bench_*.py']
+else:
+    sys.path.insert(0, str(STORE_DIR))
+    from plugin_loader import PluginLoader
+    from manifest_schema import compile_settings_schema
+    from plugin_host_stub import install_plugin_base_stub, process_deferred_deletes
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    """整个测试会话共用的 QApplication"""
+    install_plugin_base_stub()
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture(scope='session')
+def plugin_loader(qapp):
+    """读取仓库中插件清单的加载器"""
+    loader = PluginLoader(PLUGINS_DIR)
+    loader.discover()
+    return loader
+
+
+@pytest.fixture
+def make_plugin(plugin_loader):
+    """创建并初始化插件的新实例，测试结束后清理
+    
+    每个测试使用独立实例，避免上一个测试修改的设置和数据影响结果。
+    """
+    created = []
+    
+    def factory(plugin_id, **settings):
+        descriptor = plugin_loader.plugins[plugin_id]
+        module = plugin_loader.import_plugin(descriptor)
+        plugin = module.create_plugin()
+        plugin.settings_validator = compile_settings_schema(descriptor.manifest.get('settings', {}))
+        plugin.settings.update(settings)
+        assert plugin.initialize(None)
+        created.append(plugin)
+        return plugin
+    
+    yield factory
+    
+    for plugin in created:
+        plugin.cleanup()
+    process_deferred_deletes()
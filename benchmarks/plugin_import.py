@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+插件导入基准测试
+比较安装 4 个和 100 个插件时宿主的启动耗时：
+- legacy：启动时导入所有 plugin.py，每个插件导入时向 sys.path 追加宿主目录（旧的加载方式）
+- loader：plugin_loader 启动时只读取manifest.json，core 包由查找器提供，不修改 sys.path
+
+每种情况在独立的子进程中运行，使用合成的插件和最小的 core.plugin_base，不依赖PyQt6。
+
+用法: python benchmarks/plugin_import.py [--counts 4 100] [--repeat 5]
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+import importlib.util
+from pathlib import Path
+
+
+STORE_DIR = Path(__file__).resolve().parent.parent
+
+# 插件目录相对宿主目录的位置：旧的插件用 '..' x 4 回到宿主目录
+PLUGINS_SUBDIR = Path("data") / "store" / "plugins"
+
+# 导入未命中的探测次数，sys.path 越长每次未命中越慢
+MISS_PROBES = 2000
+
+PLUGIN_BASE_SOURCE = '''
+import enum
+
+
+class PluginStatus(enum.Enum):
+    LOADED = "loaded"
+    INITIALIZED = "initialized"
+    ENABLED = "enabled"
+    DISABLED = "disabled"
+    ERROR = "error"
+    UNLOADED = "unloaded"
+
+
+class IPlugin:
+    def __init__(self):
+        pass
+'''
+
+LEGACY_HEADER = '''
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+'''
+
+PLUGIN_SOURCE = '''
+import logging
+from typing import Dict, Any
+
+from core.plugin_base import IPlugin, PluginStatus
+
+
+class SamplePlugin(IPlugin):
+    def __init__(self):
+        super().__init__()
+        self.logger = logging.getLogger(f'{__name__}.SamplePlugin')
+        self.status = PluginStatus.LOADED
+        self.settings = {'enabled': True}
+    
+    def initialize(self, plugin_manager) -> bool:
+        self.status = PluginStatus.INITIALIZED
+        return True
+    
+    def activate(self) -> bool:
+        self.status = PluginStatus.ENABLED
+        return True
+    
+    def deactivate(self) -> bool:
+        self.status = PluginStatus.DISABLED
+        return True
+    
+    def cleanup(self) -> bool:
+        self.status = PluginStatus.UNLOADED
+        return True
+    
+    def get_widget(self):
+        return None
+    
+    def get_settings(self) -> Dict[str, Any]:
+        return self.settings.copy()
+
+
+def create_plugin():
+    return SamplePlugin()
+'''
+
+
+def create_layout(root, count, legacy):
+    """在 root 下创建宿主目录（含 core 包）和 count 个合成插件，返回 (宿主目录, 插件目录)"""
+    app_dir = Path(root) / "app"
+    core_dir = app_dir / "core"
+    core_dir.mkdir(parents=True)
+    (core_dir / "__init__.py").write_text("", encoding='utf-8')
+    (core_dir / "plugin_base.py").write_text(PLUGIN_BASE_SOURCE, encoding='utf-8')
+    
+    plugins_dir = app_dir / PLUGINS_SUBDIR
+    source = (LEGACY_HEADER if legacy else "") + PLUGIN_SOURCE
+    for index in range(count):
+        plugin_id = f"sample_plugin_{index:03d}"
+        plugin_dir = plugins_dir / plugin_id
+        plugin_dir.mkdir(parents=True)
+        (plugin_dir / "plugin.py").write_text(source, encoding='utf-8')
+        manifest = {
+            "id": plugin_id,
+            "name": f"示例插件 {index}",
+            "version": "1.0.0",
+            "description": "导入基准测试使用的合成插件",
+            "author": "Benchmark",
+            "plugin_class": "SamplePlugin",
+            "plugin_type": "utility",
+            "api_version": "1.0.0",
+            "permissions": [],
+            "settings": {
+                "enabled": {"type": "boolean", "default": True, "description": "启用"}
+            }
+        }
+        (plugin_dir / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False), encoding='utf-8')
+    
+    return app_dir, plugins_dir
+
+
+def measure_import_misses():
+    """测量查找不存在的顶层模块的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for index in range(MISS_PROBES):
+        importlib.util.find_spec(f"_benchmark_missing_module_{index}")
+    return (time.perf_counter() - start) / MISS_PROBES * 1e6
+
+
+def run_child(mode, app_dir, plugins_dir):
+    """在子进程中模拟宿主启动，返回测量结果"""
+    path_before = len(sys.path)
+    plugin_dirs = sorted(Path(plugins_dir).iterdir())
+    
+    if mode == 'legacy':
+        # 旧的宿主在启动时导入并创建所有插件
+        start = time.perf_counter()
+        for plugin_dir in plugin_dirs:
+            spec = importlib.util.spec_from_file_location(f"plugin_{plugin_dir.name}", plugin_dir / "plugin.py")
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.create_plugin().initialize(None)
+        startup = time.perf_counter() - start
+        activate_all = startup
+    else:
+        sys.path.insert(0, str(STORE_DIR))
+        path_before = len(sys.path)
+        from plugin_loader import PluginLoader
+        
+        start = time.perf_counter()
+        loader = PluginLoader(plugins_dir, app_dir=app_dir)
+        loader.discover()
+        startup = time.perf_counter() - start
+        
+        for descriptor in list(loader.plugins.values()):
+            loader.activate(descriptor.id)
+        activate_all = time.perf_counter() - start
+    
+    return {
+        'startup_ms': startup * 1000,
+        'activate_all_ms': activate_all * 1000,
+        'sys_path_added': len(sys.path) - path_before,
+        'import_miss_us': measure_import_misses()
+    }
+
+
+def run_case(mode, count, repeat):
+    """创建插件目录并多次运行子进程，返回各项指标的中位数"""
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        app_dir, plugins_dir = create_layout(root, count, legacy=(mode == 'legacy'))
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', mode, str(app_dir), str(plugins_dir)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results.append(json.loads(output))
+    
+    return {key: statistics.median(result[key] for result in results) for key in results[0]}
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="插件导入基准测试")
+    parser.add_argument('--counts', type=int, nargs='+', default=[4, 100], metavar='N',
+                        help="已安装的插件数量（默认: 4 100）")
+    parser.add_argument('--repeat', type=int, default=5, metavar='N',
+                        help="每种情况运行的次数，结果取中位数（默认: 5）")
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'APP_DIR', 'PLUGINS_DIR'),
+                        help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    
+    if args.child:
+        mode, app_dir, plugins_dir = args.child
+        print(json.dumps(run_child(mode, app_dir, plugins_dir)))
+        return 0
+    
+    print("⏱️  插件导入基准测试")
+    print(f"   Python {sys.version.split()[0]}，每种情况运行 {args.repeat} 次取中位数\n")
+    header = f"{'插件数':>6}  {'方式':<8}{'启动(ms)':>10}{'全部激活(ms)':>14}{'sys.path新增':>14}{'导入未命中(µs)':>16}"
+    print(header)
+    for count in args.counts:
+        for mode in ('legacy', 'loader'):
+            result = run_case(mode, count, args.repeat)
+            print(f"{count:>6}  {mode:<8}{result['startup_ms']:>10.2f}{result['activate_all_ms']:>14.2f}"
+                  f"{result['sys_path_added']:>14}{result['import_miss_us']:>16.2f}")
+    
+    print("\n说明: legacy 的启动即导入全部插件；loader 的启动只读取manifest.json，"
+          "全部激活为启动后再激活所有插件的累计耗时")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
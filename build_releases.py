@@ -7,32 +7,488 @@
 """
 
 import os
+import sys
 import json
 import zipfile
 import hashlib
+import fnmatch
+import re
+import ast
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 
+from store_catalog import delta_key
+from manifest_schema import validate_plugin_dirs
+
+
+# 增量构建清单，记录每个插件的文件哈希和上次构建的发布信息
+BUILD_MANIFEST_NAME = ".build_manifest.json"
+BUILD_MANIFEST_VERSION = 2
+
+# 一致性检查使用的发布包哈希缓存，大小和修改时间不变时不再重新计算
+RELEASE_HASHES_NAME = ".release_hashes.json"
+
+# 计算校验和时的读取缓冲区大小
+HASH_BUFFER_SIZE = 1024 * 1024
+
+# 按文件类型选择压缩方式和压缩级别：(压缩方式, 压缩级别)
+# 图片、音视频和压缩包本身已经压缩过，DEFLATE 几乎无法再减小体积，直接存储
+STORED_COMPRESSION = (zipfile.ZIP_STORED, None)
+TEXT_COMPRESSION = (zipfile.ZIP_DEFLATED, 9)
+DEFAULT_COMPRESSION = (zipfile.ZIP_DEFLATED, 6)
+COMPRESSION_POLICY = {
+    **dict.fromkeys(
+        ['.png', '.jpg', '.jpeg', '.gif', '.webp',
+         '.zip', '.gz', '.bz2', '.xz', '.7z',
+         '.mp3', '.ogg', '.mp4', '.woff', '.woff2'],
+        STORED_COMPRESSION
+    ),
+    **dict.fromkeys(
+        ['.py', '.json', '.md', '.txt', '.qss', '.css', '.svg', '.html', '.ics'],
+        TEXT_COMPRESSION
+    ),
+}
+
+# 发布包下载地址前缀，完整地址为 {前缀}/v{版本}/{文件名}
+RELEASE_BASE_URL = "https://github.com/ziyi127/TimeNest-Store/releases/download"
+# 相邻版本之间的增量包：{插件ID}_v{旧版本}_to_v{新版本}.delta.zip
+DELTA_PACKAGE_SUFFIX = ".delta.zip"
+DELTA_MANIFEST_NAME = "delta.json"
+
+# 分片目录，与plugins.json一起发布，商城首页只需下载其中的摘要索引
+CATALOG_DIR_NAME = "catalog"
+# 摘要索引中每个插件保留的字段
+SUMMARY_FIELDS = ['id', 'name', 'version', 'category', 'checksum', 'size']
+# 分片文件使用紧凑格式
+COMPACT_JSON = {'separators': (',', ':')}
+# 增量更新目录，以及保留多少个历史版本的增量
+DELTAS_DIR_NAME = "deltas"
+DELTA_HISTORY_LIMIT = 30
+
+# 默认不打包的文件：Python缓存、编辑器临时文件、系统文件和版本控制目录
+DEFAULT_EXCLUDE = [
+    '__pycache__', '*.pyc', '*.pyo',
+    '*~', '*.swp', '*.swo', '.#*', '*.orig', '*.rej', '*.tmp',
+    '.DS_Store', 'Thumbs.db', 'desktop.ini',
+    '.git', '.svn', '.hg', '.idea', '.vscode',
+]
+
+# 一致性检查时在plugins.json、manifest.json和get_info()之间比对的字段
+CONSISTENCY_FIELDS = ['name', 'version', 'description', 'author']
+# get_info() 中的 description 是界面上显示的简短说明，不要求与manifest中的完整描述相同
+INFO_CONSISTENCY_FIELDS = ['name', 'version', 'author']
+
+# 可复现构建使用的固定文件权限
+DETERMINISTIC_FILE_MODE = 0o644
+DETERMINISTIC_EXEC_MODE = 0o755
+# ZIP格式能表示的最早时间
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
 
 def calculate_sha256(file_path):
     """计算文件的SHA256校验和"""
     sha256_hash = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
+    buffer = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            sha256_hash.update(view[:size])
     return sha256_hash.hexdigest()
 
 
-def create_plugin_release(plugin_dir, releases_dir):
-    """为单个插件创建发布包"""
+class HashingWriter:
+    """写入文件的同时计算SHA256和已写入字节数
+    
+    不提供 tell/seek，zipfile 会因此以流式模式写入（使用数据描述符），
+    不会回头改写已写出的字节，保证哈希与最终文件内容一致。
+    """
+    
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+    
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+    
+    def flush(self):
+        self.fileobj.flush()
+    
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+
+def load_plugin_manifest(plugin_dir):
+    """读取插件的manifest.json，文件不存在或无法解析时返回 None"""
+    try:
+        with open(Path(plugin_dir) / "manifest.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def matches_pattern(arcname, pattern):
+    """判断包内路径是否匹配规则
+    
+    规则可以匹配完整路径（如 ``screenshots/*``），也可以匹配任意一级
+    目录或文件名（如 ``__pycache__``、``*.pyc``）；以 ``/`` 结尾的规则匹配该目录下的所有文件。
+    """
+    pattern = pattern.strip('/') if pattern.endswith('/') else pattern.lstrip('/')
+    if fnmatch.fnmatchcase(arcname, pattern) or arcname.startswith(pattern + '/'):
+        return True
+    if '/' not in pattern:
+        return any(fnmatch.fnmatchcase(part, pattern) for part in arcname.split('/'))
+    return False
+
+
+def is_packaged_file(arcname, manifest=None):
+    """根据manifest中的 files/exclude 规则判断文件是否需要打包
+    
+    manifest.json 总是打包；设置了 files 时只打包匹配的文件；
+    DEFAULT_EXCLUDE 和 exclude 中的规则始终生效。
+    """
+    manifest = manifest or {}
+    if arcname == "manifest.json":
+        return True
+    
+    include = manifest.get('files')
+    if include and not any(matches_pattern(arcname, pattern) for pattern in include):
+        return False
+    
+    exclude = DEFAULT_EXCLUDE + list(manifest.get('exclude', []))
+    return not any(matches_pattern(arcname, pattern) for pattern in exclude)
+
+
+def iter_plugin_files(plugin_path, manifest=None):
+    """按包内路径排序遍历插件中需要打包的文件，返回 (包内路径, 文件路径)"""
+    plugin_path = Path(plugin_path)
+    files = []
+    for file_path in plugin_path.rglob('*'):
+        if not file_path.is_file():
+            continue
+        arcname = file_path.relative_to(plugin_path).as_posix()
+        if is_packaged_file(arcname, manifest):
+            files.append((arcname, file_path))
+    files.sort()
+    return files
+
+
+def get_release_timestamp():
+    """可复现构建写入ZIP的时间戳
+    
+    遵循 SOURCE_DATE_EPOCH 约定，未设置时使用ZIP格式的最早时间。
+    """
+    source_date_epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if not source_date_epoch:
+        return ZIP_EPOCH
+    
+    timestamp = datetime.fromtimestamp(int(source_date_epoch), tz=timezone.utc)
+    return max(ZIP_EPOCH, timestamp.timetuple()[:6])
+
+
+def get_compression(arcname):
+    """根据文件扩展名返回 (压缩方式, 压缩级别)"""
+    suffix = os.path.splitext(arcname)[1].lower()
+    return COMPRESSION_POLICY.get(suffix, DEFAULT_COMPRESSION)
+
+
+def compression_options():
+    """压缩策略的可序列化形式，记录在构建选项中，修改策略后不复用上次的构建结果"""
+    return {
+        'default': list(DEFAULT_COMPRESSION),
+        'policy': {suffix: list(compression) for suffix, compression in sorted(COMPRESSION_POLICY.items())}
+    }
+
+
+def write_deterministic_entry(zipf, arcname, file_path, date_time):
+    """以固定时间戳和权限向ZIP写入一个文件"""
+    stat = file_path.stat()
+    mode = DETERMINISTIC_EXEC_MODE if stat.st_mode & 0o111 else DETERMINISTIC_FILE_MODE
+    
+    zinfo = zipfile.ZipInfo(arcname, date_time=date_time)
+    zinfo.create_system = 3  # Unix，使权限位在所有平台上一致
+    zinfo.external_attr = (0o100000 | mode) << 16
+    
+    # 通过 writestr 的公开参数设置每个文件的压缩方式和级别，不套用 ZipFile 的默认值
+    compress_type, compresslevel = get_compression(arcname)
+    zipf.writestr(zinfo, file_path.read_bytes(), compress_type, compresslevel)
+
+
+def scan_plugin_files(plugin_dir, previous_files=None):
+    """记录插件中每个文件的大小、修改时间和SHA256
+    
+    文件的大小和修改时间与上次记录一致时直接复用记录的哈希，不再读取文件内容。
+    """
+    previous_files = previous_files or {}
+    files = {}
+    manifest = load_plugin_manifest(plugin_dir)
+    
+    for arcname, file_path in iter_plugin_files(plugin_dir, manifest):
+        stat = file_path.stat()
+        previous = previous_files.get(arcname)
+        
+        if (previous and previous.get('size') == stat.st_size
+                and previous.get('mtime_ns') == stat.st_mtime_ns):
+            checksum = previous['sha256']
+        else:
+            checksum = calculate_sha256(file_path)
+        
+        files[arcname] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': checksum
+        }
+    
+    return files
+
+
+def write_text_atomic(path, text):
+    """把文本写入临时文件后原子替换目标文件，读取方不会看到写了一半的内容"""
+    path = Path(path)
+    temp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def write_json_atomic(path, data, **dump_options):
+    """原子地写入JSON文件"""
+    write_text_atomic(path, json.dumps(data, ensure_ascii=False, **dump_options) + "\n")
+
+
+def write_json_if_changed(path, data, **dump_options):
+    """内容与现有文件不同时才原子地写入JSON文件，返回是否写入"""
+    text = json.dumps(data, ensure_ascii=False, **dump_options) + "\n"
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    
+    write_text_atomic(path, text)
+    return True
+
+
+def load_build_manifest(releases_dir, build_options=None):
+    """读取增量构建清单
+    
+    清单不存在、格式不兼容或上次构建选项与本次不同时返回空清单。
+    """
+    manifest_path = Path(releases_dir) / BUILD_MANIFEST_NAME
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    
+    if data.get('version') != BUILD_MANIFEST_VERSION:
+        return {}
+    if data.get('build_options', {}) != (build_options or {}):
+        return {}
+    return data.get('plugins', {})
+
+
+def save_build_manifest(build_manifest, releases_dir, build_options=None):
+    """保存增量构建清单"""
+    manifest_path = Path(releases_dir) / BUILD_MANIFEST_NAME
+    data = {
+        'version': BUILD_MANIFEST_VERSION,
+        'build_options': build_options or {},
+        'plugins': build_manifest
+    }
+    write_json_atomic(manifest_path, data, indent=2, sort_keys=True)
+
+
+def is_plugin_unchanged(entry, files, releases_dir):
+    """判断插件源文件自上次构建以来是否未变化，且上次的发布包仍然存在"""
+    if not entry or 'release' not in entry:
+        return False
+    
+    old_hashes = {name: info['sha256'] for name, info in entry.get('files', {}).items()}
+    new_hashes = {name: info['sha256'] for name, info in files.items()}
+    if old_hashes != new_hashes:
+        return False
+    
+    release_info = entry['release']
+    expected_files = [release_info]
+    if release_info.get('delta'):
+        expected_files.append(release_info['delta'])
+    
+    for file_info in expected_files:
+        try:
+            if (Path(releases_dir) / file_info['filename']).stat().st_size != file_info['size']:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def summarize_compression(infolist):
+    """统计发布包中文件的原始大小、压缩后大小和节省的字节数"""
+    original_size = sum(info.file_size for info in infolist)
+    compressed_size = sum(info.compress_size for info in infolist)
+    return {
+        'original_size': original_size,
+        'compressed_size': compressed_size,
+        'saved_bytes': original_size - compressed_size,
+        'stored_files': sum(1 for info in infolist if info.compress_type == zipfile.ZIP_STORED)
+    }
+
+
+def version_key(version):
+    """把版本号转换为可比较的元组，如 '2.1.0' -> (2, 1, 0)"""
+    return tuple(int(part) for part in re.findall(r'\d+', version))
+
+
+def find_previous_release(releases_dir, plugin_id, version):
+    """在发布目录中查找比指定版本更早的最新完整发布包，返回 (版本, 路径)"""
+    pattern = re.compile(rf'^{re.escape(plugin_id)}_v(.+)\.zip$')
+    current_key = version_key(version)
+    
+    previous = None
+    for release_path in Path(releases_dir).glob(f"{plugin_id}_v*.zip"):
+        if release_path.name.endswith(DELTA_PACKAGE_SUFFIX):
+            continue
+        match = pattern.match(release_path.name)
+        if not match:
+            continue
+        release_version = match.group(1)
+        key = version_key(release_version)
+        if key < current_key and (previous is None or key > version_key(previous[0])):
+            previous = (release_version, release_path)
+    
+    return previous
+
+
+def hash_zip_members(zip_path):
+    """计算ZIP中每个文件解压后的SHA256和大小"""
+    members = {}
+    with zipfile.ZipFile(zip_path) as zipf:
+        for info in zipf.infolist():
+            if info.is_dir():
+                continue
+            sha256_hash = hashlib.sha256()
+            with zipf.open(info) as member:
+                for block in iter(lambda: member.read(HASH_BUFFER_SIZE), b""):
+                    sha256_hash.update(block)
+            members[info.filename] = {'sha256': sha256_hash.hexdigest(), 'size': info.file_size}
+    return members
+
+
+def create_release_delta(releases_dir, plugin_id, version, release_path, release_checksum):
+    """为插件的上一个版本和当前版本生成文件级增量包
+
+    增量包中的 delta.json 列出变化、新增和删除的文件及其SHA256，
+    并包含变化和新增文件的完整内容。没有更早的版本或增量包不比完整包小时返回 None。
+    """
+    previous = find_previous_release(releases_dir, plugin_id, version)
+    if previous is None:
+        return None
+    
+    from_version, previous_path = previous
+    old_members = hash_zip_members(previous_path)
+    new_members = hash_zip_members(release_path)
+    
+    changed, added = [], []
+    for name, info in sorted(new_members.items()):
+        entry = {'path': name, **info}
+        if name not in old_members:
+            added.append(entry)
+        elif old_members[name]['sha256'] != info['sha256']:
+            changed.append(entry)
+    removed = sorted(name for name in old_members if name not in new_members)
+    
+    delta_manifest = {
+        'plugin_id': plugin_id,
+        'from_version': from_version,
+        'to_version': version,
+        'base_checksum': f"sha256:{calculate_sha256(previous_path)}",
+        'target_checksum': release_checksum,
+        'changed': changed,
+        'added': added,
+        'removed': removed
+    }
+    
+    delta_filename = f"{plugin_id}_v{from_version}_to_v{version}{DELTA_PACKAGE_SUFFIX}"
+    delta_path = Path(releases_dir) / delta_filename
+    temp_path = delta_path.with_name(delta_filename + ".tmp")
+    date_time = get_release_timestamp()
+    
+    try:
+        with open(temp_path, 'wb') as f:
+            writer = HashingWriter(f)
+            with zipfile.ZipFile(writer, 'w', zipfile.ZIP_DEFLATED) as delta_zip, \
+                    zipfile.ZipFile(release_path) as release_zip:
+                manifest_info = zipfile.ZipInfo(DELTA_MANIFEST_NAME, date_time=date_time)
+                manifest_info.create_system = 3
+                manifest_info.external_attr = (0o100000 | DETERMINISTIC_FILE_MODE) << 16
+                manifest_info.compress_type = zipfile.ZIP_DEFLATED
+                delta_zip.writestr(manifest_info, json.dumps(delta_manifest, ensure_ascii=False, indent=2))
+                
+                for entry in changed + added:
+                    source_info = release_zip.getinfo(entry['path'])
+                    zinfo = zipfile.ZipInfo(entry['path'], date_time=date_time)
+                    zinfo.create_system = 3
+                    zinfo.external_attr = source_info.external_attr
+                    compress_type, compresslevel = get_compression(entry['path'])
+                    delta_zip.writestr(zinfo, release_zip.read(source_info), compress_type, compresslevel)
+        
+        if writer.size >= release_path.stat().st_size:
+            temp_path.unlink()
+            if delta_path.exists():
+                delta_path.unlink()
+            return None
+        
+        os.replace(temp_path, delta_path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+    
+    return {
+        'from_version': from_version,
+        'filename': delta_filename,
+        'size': writer.size,
+        'checksum': f"sha256:{writer.hexdigest()}",
+        'changed': len(changed),
+        'added': len(added),
+        'removed': len(removed)
+    }
+
+
+def create_plugin_release(plugin_dir, releases_dir, deterministic=True, size_budget=None, log=print):
+    """为单个插件创建发布包
+    
+    deterministic 为 True 时按固定顺序、时间戳和权限写入，
+    相同的源文件总是生成字节完全相同的发布包。
+    每个文件的压缩方式和级别由 COMPRESSION_POLICY 决定。
+    发布包超过大小预算（manifest中的 max_release_size，未设置时为 size_budget）时构建失败，
+    已有的同名发布包保持不变。
+    构建报告逐行交给 log 输出。
+    """
     plugin_path = Path(plugin_dir)
     plugin_name = plugin_path.name
     
     # 读取manifest.json获取版本信息
     manifest_path = plugin_path / "manifest.json"
     if not manifest_path.exists():
-        print(f"警告: {plugin_name} 缺少 manifest.json 文件")
+        log(f"警告: {plugin_name} 缺少 manifest.json 文件")
         return None
     
+    temp_path = None
     try:
         with open(manifest_path, 'r', encoding='utf-8') as f:
             manifest = json.load(f)
@@ -43,70 +499,609 @@ def create_plugin_release(plugin_dir, releases_dir):
         # 创建发布包文件名
         release_filename = f"{plugin_id}_v{version}.zip"
         release_path = Path(releases_dir) / release_filename
+        temp_path = release_path.with_name(release_filename + ".tmp")
         
-        # 创建ZIP文件
-        with zipfile.ZipFile(release_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file_path in plugin_path.rglob('*'):
-                if file_path.is_file():
-                    # 计算相对路径
-                    arcname = file_path.relative_to(plugin_path)
-                    zipf.write(file_path, arcname)
+        # 创建ZIP文件，写入时同步计算文件大小和校验和
+        with open(temp_path, 'wb') as f:
+            writer = HashingWriter(f)
+            with zipfile.ZipFile(writer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                date_time = get_release_timestamp()
+                for arcname, file_path in iter_plugin_files(plugin_path, manifest):
+                    if deterministic:
+                        write_deterministic_entry(zipf, arcname, file_path, date_time)
+                    else:
+                        compress_type, compresslevel = get_compression(arcname)
+                        zipf.write(file_path, arcname, compress_type, compresslevel)
+                
+                compression = summarize_compression(zipf.infolist())
         
-        # 计算文件大小和校验和
-        file_size = release_path.stat().st_size
-        checksum = calculate_sha256(release_path)
+        file_size = writer.size
+        checksum = writer.hexdigest()
         
-        print(f"✅ 创建发布包: {release_filename}")
-        print(f"   大小: {file_size:,} 字节")
-        print(f"   校验和: {checksum}")
+        budget = manifest.get('max_release_size', size_budget)
+        if budget and file_size > budget:
+            raise ValueError(f"发布包大小 {file_size:,} 字节超出预算 {budget:,} 字节")
         
-        return {
+        os.replace(temp_path, release_path)
+        
+        log(f"✅ 创建发布包: {release_filename}")
+        log(f"   大小: {file_size:,} 字节")
+        log(f"   校验和: {checksum}")
+        log(f"   压缩: {compression['original_size']:,} → {compression['compressed_size']:,} 字节"
+              f"，节省 {compression['saved_bytes']:,} 字节"
+              f"（{compression['stored_files']} 个文件直接存储）")
+        
+        release_info = {
             'plugin_id': plugin_id,
             'version': version,
             'filename': release_filename,
             'size': file_size,
-            'checksum': f"sha256:{checksum}"
+            'checksum': f"sha256:{checksum}",
+            'compression': compression
         }
         
+        # 增量包只是优化，生成失败不影响完整发布包
+        try:
+            delta = create_release_delta(releases_dir, plugin_id, version,
+                                         release_path, release_info['checksum'])
+        except Exception as e:
+            log(f"⚠️  生成 {plugin_id} 增量包失败: {e}")
+            delta = None
+        if delta:
+            release_info['delta'] = delta
+            log(f"   增量包: {delta['filename']}（{delta['size']:,} 字节，"
+                  f"{delta['changed']} 个变化、{delta['added']} 个新增、{delta['removed']} 个删除）")
+        
+        return release_info
+    
     except Exception as e:
-        print(f"❌ 创建 {plugin_name} 发布包失败: {e}")
+        log(f"❌ 创建 {plugin_name} 发布包失败: {e}")
+        if temp_path is not None and temp_path.exists():
+            temp_path.unlink()
         return None
 
 
+def create_plugin_release_buffered(plugin_dir, releases_dir, **release_options):
+    """在工作进程中创建发布包，返回 (发布信息, 构建报告的各行)
+    
+    并行构建时各进程的报告不直接输出，由主进程按提交顺序打印，输出与串行构建相同。
+    """
+    messages = []
+    release_info = create_plugin_release(plugin_dir, releases_dir, log=messages.append, **release_options)
+    return release_info, messages
+
+
+def release_download_url(version, filename):
+    """发布包的下载地址"""
+    return f"{RELEASE_BASE_URL}/v{version}/{filename}"
+
+
+def apply_release_info(plugin, release_info):
+    """把发布信息写入plugins.json中的插件条目，返回条目是否发生变化"""
+    updates = {
+        'download_url': release_download_url(release_info['version'], release_info['filename']),
+        'size': release_info['size'],
+        'checksum': release_info['checksum'],
+        'version': release_info['version']
+    }
+    
+    delta = release_info.get('delta')
+    if delta:
+        updates['deltas'] = [{
+            'from_version': delta['from_version'],
+            'download_url': release_download_url(release_info['version'], delta['filename']),
+            'size': delta['size'],
+            'checksum': delta['checksum']
+        }]
+    
+    changed = any(plugin.get(key) != value for key, value in updates.items())
+    if not delta and 'deltas' in plugin:
+        del plugin['deltas']
+        changed = True
+    plugin.update(updates)
+    return changed
+
+
 def update_plugins_json(releases_info, plugins_json_path):
-    """更新plugins.json文件中的发布信息"""
+    """更新plugins.json文件中的发布信息
+    
+    只有发布信息确实变化时才重写文件，重写通过临时文件和原子替换完成。
+    返回文件是否被更新。
+    """
     try:
         with open(plugins_json_path, 'r', encoding='utf-8') as f:
             plugins_data = json.load(f)
         
+        releases_by_id = {r['plugin_id']: r for r in releases_info}
+        
         # 更新插件信息
+        changed = False
         for plugin in plugins_data.get('plugins', []):
             plugin_id = plugin.get('id')
             
-            # 查找对应的发布信息
-            release_info = next((r for r in releases_info if r['plugin_id'] == plugin_id), None)
-            if release_info:
-                # 更新下载URL
-                base_url = "https://github.com/ziyi127/TimeNest-Store/releases/download"
-                plugin['download_url'] = f"{base_url}/v{release_info['version']}/{release_info['filename']}"
-                plugin['size'] = release_info['size']
-                plugin['checksum'] = release_info['checksum']
-                plugin['version'] = release_info['version']
-                
+            release_info = releases_by_id.get(plugin_id)
+            if release_info and apply_release_info(plugin, release_info):
+                changed = True
                 print(f"📝 更新 {plugin_id} 的发布信息")
         
+        if not changed:
+            print("✅ plugins.json 无需更新")
+            return False
+        
         # 保存更新后的文件
-        with open(plugins_json_path, 'w', encoding='utf-8') as f:
-            json.dump(plugins_data, f, ensure_ascii=False, indent=4)
+        write_json_atomic(plugins_json_path, plugins_data, indent=4)
         
         print("✅ plugins.json 更新完成")
-        
+        return True
+    
     except Exception as e:
         print(f"❌ 更新 plugins.json 失败: {e}")
+        return False
+
+
+def summarize_plugin(plugin):
+    """提取插件条目中商城列表需要的字段"""
+    return {field: plugin.get(field) for field in SUMMARY_FIELDS}
+
+
+def write_catalog_shards(plugins_data, catalog_dir):
+    """根据plugins.json生成摘要索引、分类分片和插件详情分片
+    
+    - index.json：商城元信息、分类列表和每个插件的摘要，featured 已解析为插件摘要
+    - categories/<分类ID>.json：该分类下所有插件的完整条目
+    - plugins/<插件ID>.json：单个插件的完整条目
+    
+    只重写内容发生变化的文件，并删除已不在目录中的插件和分类的分片。
+    返回写入的文件数。
+    """
+    catalog_dir = Path(catalog_dir)
+    categories_dir = catalog_dir / "categories"
+    plugin_shards_dir = catalog_dir / "plugins"
+    categories_dir.mkdir(parents=True, exist_ok=True)
+    plugin_shards_dir.mkdir(parents=True, exist_ok=True)
+    
+    plugins = plugins_data.get('plugins', [])
+    summaries = {plugin['id']: summarize_plugin(plugin) for plugin in plugins}
+    
+    plugins_by_category = {}
+    for plugin in plugins:
+        plugins_by_category.setdefault(plugin.get('category'), []).append(plugin)
+    
+    categories = []
+    for category in plugins_data.get('categories', []):
+        categories.append({
+            **category,
+            'count': len(plugins_by_category.get(category['id'], []))
+        })
+    
+    index = {
+        key: plugins_data[key]
+        for key in ('version', 'last_updated', 'repository_name', 'repository_url', 'description')
+        if key in plugins_data
+    }
+    index['featured'] = [
+        summaries[plugin_id] for plugin_id in plugins_data.get('featured', [])
+        if plugin_id in summaries
+    ]
+    index['categories'] = categories
+    index['plugins'] = list(summaries.values())
+    
+    written = 0
+    written += write_json_if_changed(catalog_dir / "index.json", index, **COMPACT_JSON)
+    
+    expected_files = set()
+    for category in categories:
+        shard_path = categories_dir / f"{category['id']}.json"
+        shard = {**category, 'plugins': plugins_by_category.get(category['id'], [])}
+        written += write_json_if_changed(shard_path, shard, **COMPACT_JSON)
+        expected_files.add(shard_path)
+    
+    for plugin in plugins:
+        shard_path = plugin_shards_dir / f"{plugin['id']}.json"
+        written += write_json_if_changed(shard_path, plugin, **COMPACT_JSON)
+        expected_files.add(shard_path)
+    
+    # 清理已删除插件和分类留下的分片
+    for shard_dir in (categories_dir, plugin_shards_dir):
+        for shard_path in shard_dir.glob('*.json'):
+            if shard_path not in expected_files:
+                shard_path.unlink()
+                written += 1
+    
+    return written
+
+
+def utc_timestamp():
+    """当前UTC时间，格式与plugins.json中的时间字段一致"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def parse_timestamp(value):
+    """解析plugins.json中的时间字段"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def catalog_metadata(plugins_data):
+    """plugins.json中除插件列表和版本以外的顶层字段"""
+    return {key: value for key, value in plugins_data.items()
+            if key not in ('plugins', 'last_updated')}
+
+
+def without_updated_at(plugin):
+    """去掉 updated_at 后的插件条目，用于比较内容是否变化"""
+    return {key: value for key, value in plugin.items() if key != 'updated_at'}
+
+
+def load_catalog_snapshot(catalog_dir):
+    """读取上次生成的插件详情分片作为比较基准，尚未生成过分片时返回 None"""
+    shards_dir = Path(catalog_dir) / "plugins"
+    if not shards_dir.is_dir():
+        return None
+    
+    snapshot = {}
+    for shard_path in shards_dir.glob('*.json'):
+        with open(shard_path, 'r', encoding='utf-8') as f:
+            snapshot[shard_path.stem] = json.load(f)
+    return snapshot
+
+
+def stamp_catalog_changes(plugins_data, snapshot, now):
+    """为内容与上次分片不同的插件更新 updated_at
+    
+    返回 (变化的插件ID列表, 已删除的插件ID列表)。
+    """
+    changed_ids = []
+    current_ids = set()
+    for plugin in plugins_data.get('plugins', []):
+        plugin_id = plugin['id']
+        current_ids.add(plugin_id)
+        
+        previous = snapshot.get(plugin_id)
+        if previous is None or without_updated_at(previous) != without_updated_at(plugin):
+            plugin['updated_at'] = now
+            changed_ids.append(plugin_id)
+    
+    removed_ids = [plugin_id for plugin_id in snapshot if plugin_id not in current_ids]
+    return changed_ids, removed_ids
+
+
+def write_catalog_deltas(plugins_data, deltas_dir, versions, tombstones):
+    """为每个保留的历史版本生成到最新版本的增量更新文件
+    
+    - index.json：最新版本、可增量更新的历史版本、已删除插件及删除时间
+    - <版本>.json：该版本之后更新过的插件条目、删除的插件ID和最新的顶层字段
+    
+    返回写入或删除的文件数。
+    """
+    deltas_dir = Path(deltas_dir)
+    deltas_dir.mkdir(parents=True, exist_ok=True)
+    
+    latest = plugins_data['last_updated']
+    versions = versions[-DELTA_HISTORY_LIMIT:]
+    # 比最早保留版本还旧的删除记录已经不再需要
+    if versions:
+        oldest = parse_timestamp(versions[0])
+        tombstones = {plugin_id: removed_at for plugin_id, removed_at in tombstones.items()
+                      if parse_timestamp(removed_at) > oldest}
+    else:
+        tombstones = {}
+    
+    metadata = catalog_metadata(plugins_data)
+    plugins = plugins_data.get('plugins', [])
+    
+    written = 0
+    expected_files = {deltas_dir / "index.json"}
+    for version in versions:
+        since = parse_timestamp(version)
+        delta = {
+            'from': version,
+            'to': latest,
+            'catalog': metadata,
+            'plugins': [plugin for plugin in plugins
+                        if plugin.get('updated_at') and parse_timestamp(plugin['updated_at']) > since],
+            'removed': sorted(plugin_id for plugin_id, removed_at in tombstones.items()
+                              if parse_timestamp(removed_at) > since)
+        }
+        delta_file = deltas_dir / f"{delta_key(version)}.json"
+        written += write_json_if_changed(delta_file, delta, **COMPACT_JSON)
+        expected_files.add(delta_file)
+    
+    delta_index = {
+        'latest': latest,
+        'versions': versions,
+        'removed': tombstones,
+        'catalog': metadata
+    }
+    written += write_json_if_changed(deltas_dir / "index.json", delta_index, **COMPACT_JSON)
+    
+    for delta_file in deltas_dir.glob('*.json'):
+        if delta_file not in expected_files:
+            delta_file.unlink()
+            written += 1
+    
+    return written
+
+
+def publish_catalog(plugins_json_path, catalog_dir):
+    """根据plugins.json生成分片目录和增量更新文件
+    
+    与上次生成的分片比较，内容变化的插件更新 updated_at，有任何变化时更新顶层的
+    last_updated 并把旧版本加入可增量更新的版本列表。返回写入的文件数。
+    """
+    catalog_dir = Path(catalog_dir)
+    deltas_dir = catalog_dir / DELTAS_DIR_NAME
+    
+    with open(plugins_json_path, 'r', encoding='utf-8') as f:
+        plugins_data = json.load(f)
+    
+    try:
+        with open(deltas_dir / "index.json", 'r', encoding='utf-8') as f:
+            delta_index = json.load(f)
+    except (OSError, ValueError):
+        delta_index = {}
+    
+    versions = list(delta_index.get('versions', []))
+    tombstones = dict(delta_index.get('removed', {}))
+    written = 0
+    
+    # 第一次生成分片时没有比较基准，以当前plugins.json作为初始版本
+    snapshot = load_catalog_snapshot(catalog_dir)
+    if snapshot is not None:
+        now = utc_timestamp()
+        changed_ids, removed_ids = stamp_catalog_changes(plugins_data, snapshot, now)
+        metadata_changed = ('catalog' in delta_index
+                            and delta_index['catalog'] != catalog_metadata(plugins_data))
+        
+        if changed_ids or removed_ids or metadata_changed:
+            previous_version = plugins_data.get('last_updated')
+            if previous_version and previous_version != now and previous_version not in versions:
+                versions.append(previous_version)
+            plugins_data['last_updated'] = now
+            
+            for plugin_id in changed_ids:
+                tombstones.pop(plugin_id, None)
+            for plugin_id in removed_ids:
+                tombstones[plugin_id] = now
+            
+            write_json_atomic(plugins_json_path, plugins_data, indent=4)
+            written += 1
+            print(f"🕒 目录版本更新为 {now}，{len(changed_ids)} 个插件变化，{len(removed_ids)} 个插件删除")
+    
+    written += write_catalog_deltas(plugins_data, deltas_dir, versions, tombstones)
+    written += write_catalog_shards(plugins_data, catalog_dir)
+    return written
 
 
-def main():
+def build_releases(plugin_dirs, releases_dir, jobs=1, **release_options):
+    """为多个插件创建发布包，返回与 plugin_dirs 顺序一致的发布信息列表
+    
+    jobs 大于1时在进程池中并行压缩；失败的插件对应位置为 None。
+    release_options 原样传给 create_plugin_release。
+    """
+    if jobs <= 1 or len(plugin_dirs) <= 1:
+        return [
+            create_plugin_release(plugin_dir, releases_dir, **release_options)
+            for plugin_dir in plugin_dirs
+        ]
+    
+    results = []
+    with ProcessPoolExecutor(max_workers=min(jobs, len(plugin_dirs))) as executor:
+        futures = [
+            executor.submit(create_plugin_release_buffered, plugin_dir, releases_dir, **release_options)
+            for plugin_dir in plugin_dirs
+        ]
+        # 按提交顺序收集结果并打印各插件的报告，保证输出顺序确定
+        for plugin_dir, future in zip(plugin_dirs, futures):
+            try:
+                release_info, messages = future.result()
+                for message in messages:
+                    print(message)
+                results.append(release_info)
+            except Exception as e:
+                # 工作进程异常退出等 create_plugin_release 自身无法捕获的错误
+                print(f"❌ 创建 {Path(plugin_dir).name} 发布包失败: {e}")
+                results.append(None)
+    
+    return results
+
+
+def load_release_hashes(releases_dir):
+    """读取发布包哈希缓存：文件名 -> {size, mtime_ns, sha256}"""
+    try:
+        with open(Path(releases_dir) / RELEASE_HASHES_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_release_hashes(release_hashes, releases_dir):
+    """保存发布包哈希缓存"""
+    write_json_if_changed(Path(releases_dir) / RELEASE_HASHES_NAME, release_hashes,
+                          indent=2, sort_keys=True)
+
+
+def record_release_hash(release_hashes, release_path, checksum):
+    """记录刚构建的发布包的哈希，之后的一致性检查无需重新读取文件"""
+    stat = Path(release_path).stat()
+    release_hashes[Path(release_path).name] = {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': checksum
+    }
+
+
+def cached_release_sha256(release_path, release_hashes):
+    """返回发布包的SHA256，大小和修改时间与缓存一致时直接使用缓存"""
+    stat = release_path.stat()
+    cached = release_hashes.get(release_path.name)
+    if cached and cached.get('size') == stat.st_size and cached.get('mtime_ns') == stat.st_mtime_ns:
+        return cached['sha256']
+    
+    checksum = calculate_sha256(release_path)
+    record_release_hash(release_hashes, release_path, checksum)
+    return checksum
+
+
+def read_plugin_info(plugin_file):
+    """不导入插件，从plugin.py的get_info()中读取字面量字段
+    
+    只解析 return 语句中的字典字面量，值不是常量的字段（如运行状态）会被忽略。
+    找不到get_info()时返回 None。
+    """
+    try:
+        tree = ast.parse(Path(plugin_file).read_text(encoding='utf-8'), str(plugin_file))
+    except (OSError, SyntaxError, ValueError):
+        return None
+    
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.FunctionDef) or node.name != 'get_info':
+            continue
+        for child in ast.walk(node):
+            if isinstance(child, ast.Return) and isinstance(child.value, ast.Dict):
+                return {
+                    key.value: value.value
+                    for key, value in zip(child.value.keys, child.value.values)
+                    if isinstance(key, ast.Constant) and isinstance(value, ast.Constant)
+                }
+    return None
+
+
+def check_release_file(plugin, releases_dir, release_hashes):
+    """检查plugins.json中记录的发布包是否存在，且下载地址、大小和校验和与实际文件一致"""
+    problems = []
+    plugin_id = plugin['id']
+    version = plugin.get('version')
+    filename = f"{plugin_id}_v{version}.zip"
+    release_path = Path(releases_dir) / filename
+    
+    expected_url = release_download_url(version, filename)
+    if plugin.get('download_url') != expected_url:
+        problems.append(f"plugins.json 中的 download_url 应为 {expected_url}，实际为 {plugin.get('download_url')}")
+    
+    if not release_path.is_file():
+        problems.append(f"发布包不存在: releases/{filename}")
+        return problems
+    
+    size = release_path.stat().st_size
+    if plugin.get('size') != size:
+        problems.append(f"plugins.json 中的 size 为 {plugin.get('size')}，{filename} 实际为 {size}")
+    
+    checksum = f"sha256:{cached_release_sha256(release_path, release_hashes)}"
+    if plugin.get('checksum') != checksum:
+        problems.append(f"plugins.json 中的 checksum 与 {filename} 不一致")
+    return problems
+
+
+def check_consistency(plugins_dir, releases_dir, plugins_json_path):
+    """交叉检查plugins.json、每个插件的manifest.json、get_info()和发布包
+    
+    返回 [(插件ID, 问题描述)]，没有问题时返回空列表。
+    发布包的哈希通过缓存复用，只有新增或变化的发布包才会重新计算。
+    """
+    problems = []
+    with open(plugins_json_path, 'r', encoding='utf-8') as f:
+        catalog_plugins = {plugin['id']: plugin for plugin in json.load(f).get('plugins', [])}
+    
+    plugin_dirs = {d.name: d for d in Path(plugins_dir).iterdir() if d.is_dir()}
+    release_hashes = load_release_hashes(releases_dir)
+    
+    for plugin_id in sorted(set(catalog_plugins) | set(plugin_dirs)):
+        plugin = catalog_plugins.get(plugin_id)
+        plugin_dir = plugin_dirs.get(plugin_id)
+        if plugin is None:
+            problems.append((plugin_id, "插件目录存在，但plugins.json中没有对应条目"))
+            continue
+        if plugin_dir is None:
+            problems.append((plugin_id, "plugins.json中有条目，但插件目录不存在"))
+            continue
+        
+        manifest = load_plugin_manifest(plugin_dir)
+        if manifest is None:
+            problems.append((plugin_id, "无法读取 manifest.json"))
+            continue
+        info = read_plugin_info(plugin_dir / "plugin.py")
+        if info is None:
+            problems.append((plugin_id, "plugin.py 中找不到 get_info() 的字典字面量"))
+            info = {}
+        
+        for field in CONSISTENCY_FIELDS:
+            expected = manifest.get(field)
+            if plugin.get(field) != expected:
+                problems.append((plugin_id, f"plugins.json 中的 {field} 为 {plugin.get(field)!r}，"
+                                            f"manifest.json 中为 {expected!r}"))
+            if field in INFO_CONSISTENCY_FIELDS and field in info and info[field] != expected:
+                problems.append((plugin_id, f"get_info() 中的 {field} 为 {info[field]!r}，"
+                                            f"manifest.json 中为 {expected!r}"))
+        if 'id' in info and info['id'] != plugin_id:
+            problems.append((plugin_id, f"get_info() 中的 id 为 {info['id']!r}"))
+        
+        problems.extend((plugin_id, problem) for problem in check_release_file(plugin, releases_dir, release_hashes))
+    
+    save_release_hashes(release_hashes, releases_dir)
+    return problems
+
+
+def run_consistency_check(plugins_dir, releases_dir, plugins_json_path):
+    """执行一致性检查并输出结果，返回进程退出码"""
+    print("🔍 检查plugins.json、manifest.json、get_info()和发布包的一致性...")
+    try:
+        problems = check_consistency(plugins_dir, releases_dir, plugins_json_path)
+    except Exception as e:
+        print(f"❌ 一致性检查失败: {e}")
+        return 1
+    
+    if not problems:
+        print("✅ 所有插件信息一致")
+        return 0
+    
+    for plugin_id, problem in problems:
+        print(f"❌ {plugin_id}: {problem}")
+    print(f"\n⚠️  发现 {len(problems)} 处不一致")
+    return 1
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="构建插件发布包")
+    parser.add_argument(
+        '--check', action='store_true',
+        help="只检查plugins.json、manifest.json、get_info()和发布包是否一致，不构建"
+    )
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help="增量构建：跳过自上次构建以来源文件未变化的插件"
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1, metavar='N',
+        help="并行构建的进程数，0 表示使用全部CPU核心（默认: 1）"
+    )
+    parser.add_argument(
+        '--no-deterministic', dest='deterministic', action='store_false',
+        help="保留文件的真实修改时间和权限，不生成可复现的发布包"
+    )
+    parser.add_argument(
+        '--size-budget', type=int, default=None, metavar='BYTES',
+        help="单个发布包的默认大小上限（字节），插件可在manifest中用 max_release_size 覆盖"
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 0:
+        parser.error("--jobs 不能为负数")
+    if args.size_budget is not None and args.size_budget <= 0:
+        parser.error("--size-budget 必须为正数")
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    return args
+
+
+def main(argv=None):
     """主函数"""
+    args = parse_args(argv)
+    
+    if args.check:
+        store_dir = Path(__file__).parent
+        return run_consistency_check(store_dir / "plugins", store_dir / "releases",
+                                     store_dir / "plugins.json")
+    
     print("🚀 开始构建插件发布包...")
     
     # 设置路径
@@ -119,36 +1114,119 @@ def main():
     releases_dir.mkdir(exist_ok=True)
     
     # 获取所有插件目录
-    plugin_dirs = [d for d in plugins_dir.iterdir() if d.is_dir()]
+    plugin_dirs = sorted(d for d in plugins_dir.iterdir() if d.is_dir())
     
     if not plugin_dirs:
         print("❌ 未找到任何插件目录")
-        return
+        return 1
     
     print(f"📦 找到 {len(plugin_dirs)} 个插件:")
     for plugin_dir in plugin_dirs:
         print(f"   - {plugin_dir.name}")
     
+    # 清单不合法的插件不能发布
+    print("\n🔍 校验插件清单...")
+    manifest_errors = validate_plugin_dirs(plugin_dirs)
+    if manifest_errors:
+        for plugin_id, errors in manifest_errors.items():
+            for error in errors:
+                print(f"❌ {plugin_id}: {error}")
+        print(f"\n⚠️  {len(manifest_errors)} 个插件的清单不合法，已停止构建")
+        return 1
+    print("✅ 所有插件清单校验通过")
+    
     print("\n🔨 开始构建发布包...")
     
     # 为每个插件创建发布包
+    release_options = {
+        'deterministic': args.deterministic,
+        'size_budget': args.size_budget
+    }
+    # 构建选项会影响发布包内容，选项变化后不能复用上次的结果
+    build_options = dict(release_options, compression=compression_options())
+    if args.deterministic:
+        build_options['timestamp'] = list(get_release_timestamp())
+    previous_manifest = load_build_manifest(releases_dir, build_options)
+    plugin_files = {}
+    cached_releases = {}
+    for plugin_dir in plugin_dirs:
+        entry = previous_manifest.get(plugin_dir.name)
+        files = scan_plugin_files(plugin_dir, entry.get('files') if entry else None)
+        plugin_files[plugin_dir.name] = files
+        
+        if args.incremental and is_plugin_unchanged(entry, files, releases_dir):
+            cached_releases[plugin_dir.name] = entry['release']
+            print(f"⏭️  跳过未变化的插件: {entry['release']['filename']}")
+    
+    dirs_to_build = [d for d in plugin_dirs if d.name not in cached_releases]
+    built_releases = dict(zip(
+        (d.name for d in dirs_to_build),
+        build_releases(dirs_to_build, releases_dir, args.jobs, **release_options)
+    ))
+    
+    build_manifest = {}
     releases_info = []
+    skipped_count = len(cached_releases)
     for plugin_dir in plugin_dirs:
-        release_info = create_plugin_release(plugin_dir, releases_dir)
+        release_info = cached_releases.get(plugin_dir.name) or built_releases.get(plugin_dir.name)
+        files = plugin_files[plugin_dir.name]
+        
         if release_info:
             releases_info.append(release_info)
+            build_manifest[plugin_dir.name] = {
+                'files': files,
+                'release': release_info
+            }
+    
+    save_build_manifest(build_manifest, releases_dir, build_options)
+    
+    # 新构建的发布包的哈希已知，记入缓存供一致性检查复用
+    if built_releases:
+        release_hashes = load_release_hashes(releases_dir)
+        for release_info in built_releases.values():
+            if release_info:
+                record_release_hash(release_hashes, releases_dir / release_info['filename'],
+                                    release_info['checksum'].split(':', 1)[1])
+        save_release_hashes(release_hashes, releases_dir)
     
     print(f"\n📊 构建完成:")
     print(f"   成功: {len(releases_info)} 个")
+    if skipped_count:
+        print(f"   其中未变化跳过: {skipped_count} 个")
     print(f"   失败: {len(plugin_dirs) - len(releases_info)} 个")
     
+    compressed_releases = [r for r in releases_info if 'compression' in r]
+    if compressed_releases:
+        print(f"\n🗜️  压缩统计:")
+        for release_info in compressed_releases:
+            compression = release_info['compression']
+            print(f"   {release_info['plugin_id']}: 节省 {compression['saved_bytes']:,} 字节"
+                  f"（{compression['original_size']:,} → {compression['compressed_size']:,}）")
+        total_saved = sum(r['compression']['saved_bytes'] for r in compressed_releases)
+        print(f"   合计节省: {total_saved:,} 字节")
+    
     # 更新plugins.json
     if releases_info and plugins_json_path.exists():
         print("\n📝 更新插件配置...")
         update_plugins_json(releases_info, plugins_json_path)
     
+    # 生成分片目录和增量更新
+    if plugins_json_path.exists():
+        try:
+            written = publish_catalog(plugins_json_path, store_dir / CATALOG_DIR_NAME)
+            print(f"🗂️  分片目录和增量更新已生成，更新了 {written} 个文件")
+        except Exception as e:
+            print(f"❌ 生成分片目录失败: {e}")
+            return 1
+    
+    failed_count = len(plugin_dirs) - len(releases_info)
+    if failed_count:
+        print(f"\n⚠️  {failed_count} 个插件构建失败")
+        return 1
+    
     print("\n🎉 所有任务完成!")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+插件依赖解析
+根据插件目录中的 dependencies、min_app_version 和 max_app_version
+生成按依赖顺序排列的安装计划
+"""
+
+import re
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+
+# 依赖声明，如 "weather_enhanced"、"weather_enhanced>=1.0,<2.0"
+_REQUIREMENT_PATTERN = re.compile(r'^\s*([A-Za-z0-9_\-]+)\s*(.*?)\s*$')
+_CONSTRAINT_PATTERN = re.compile(r'^(==|!=|>=|<=|>|<)?\s*([0-9][0-9A-Za-z.\-]*)$')
+
+_COMPARATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '>=': lambda a, b: a >= b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '<': lambda a, b: a < b,
+}
+
+
+class DependencyError(Exception):
+    """依赖解析失败"""
+
+
+class MissingDependencyError(DependencyError):
+    """依赖的插件不在目录中"""
+
+
+class IncompatibleVersionError(DependencyError):
+    """插件版本不满足依赖要求，或与应用版本不兼容"""
+
+
+class DependencyCycleError(DependencyError):
+    """插件之间存在循环依赖"""
+    
+    def __init__(self, cycle: List[str]):
+        super().__init__(f"循环依赖: {' -> '.join(cycle)}")
+        self.cycle = cycle
+
+
+def parse_version(version: str) -> Tuple[int, ...]:
+    """把版本号转换为可比较的元组，如 '2.1.0' -> (2, 1, 0)，末尾的 0 不影响比较"""
+    parts = [int(part) for part in re.findall(r'\d+', version or '')]
+    while parts and parts[-1] == 0:
+        parts.pop()
+    return tuple(parts)
+
+
+def version_satisfies(version: str, constraint: str) -> bool:
+    """判断版本是否满足约束，约束可以用逗号组合，如 '>=1.0,<2.0'；空约束总是满足"""
+    for part in filter(None, (p.strip() for p in (constraint or '').split(','))):
+        match = _CONSTRAINT_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"无效的版本约束: {part}")
+        operator = match.group(1) or '=='
+        if not _COMPARATORS[operator](parse_version(version), parse_version(match.group(2))):
+            return False
+    return True
+
+
+def parse_requirement(requirement: Any) -> Tuple[str, str]:
+    """解析一条依赖声明，返回 (插件ID, 版本约束)
+    
+    支持字符串形式 "plugin_id>=1.0,<2.0" 和对象形式 {"id": "plugin_id", "version": ">=1.0"}。
+    """
+    if isinstance(requirement, dict):
+        return requirement['id'], requirement.get('version', '')
+    
+    match = _REQUIREMENT_PATTERN.match(str(requirement))
+    if not match:
+        raise ValueError(f"无效的依赖声明: {requirement}")
+    return match.group(1), match.group(2)
+
+
+def is_app_compatible(plugin: Dict[str, Any], app_version: str) -> bool:
+    """判断插件是否兼容当前应用版本，max_app_version 为空表示不限制"""
+    app_key = parse_version(app_version)
+    min_version = plugin.get('min_app_version')
+    max_version = plugin.get('max_app_version')
+    if min_version and app_key < parse_version(min_version):
+        return False
+    if max_version and app_key > parse_version(max_version):
+        return False
+    return True
+
+
+class InstallPlan:
+    """安装计划
+    
+    Attributes:
+        order: 按依赖顺序排列的待安装插件ID，依赖总在被依赖者之前
+        stages: 分阶段的插件ID，同一阶段的插件互不依赖，可以并行下载和安装；
+                下载可以提前开始，但每个阶段要等前一阶段安装完成后才能安装
+        critical_path: 按下载大小计算的最长依赖链，决定整个安装计划的最短耗时
+        skipped: 已安装且满足要求、无需再次安装的插件ID
+    """
+    
+    def __init__(self, plugins: Dict[str, Dict[str, Any]], stages: List[List[str]],
+                 critical_path: List[str], skipped: List[str]):
+        self.plugins = plugins
+        self.stages = stages
+        self.order = [plugin_id for stage in stages for plugin_id in stage]
+        self.critical_path = critical_path
+        self.skipped = skipped
+    
+    @property
+    def total_size(self) -> int:
+        """全部待安装插件的下载大小"""
+        return sum(self.plugins[plugin_id].get('size', 0) for plugin_id in self.order)
+    
+    @property
+    def critical_path_size(self) -> int:
+        """关键路径上插件的下载大小"""
+        return sum(self.plugins[plugin_id].get('size', 0) for plugin_id in self.critical_path)
+    
+    def __repr__(self):
+        return f"InstallPlan(stages={self.stages!r}, skipped={self.skipped!r})"
+
+
+class DependencyResolver:
+    """插件依赖解析器
+    
+    对同一组请求（以及相同的已安装插件）重复解析时直接返回缓存的安装计划。
+    目录或已安装插件变化后应创建新的解析器，或调用 clear_cache()。
+    """
+    
+    def __init__(self, plugins: Iterable[Dict[str, Any]], app_version: str,
+                 installed: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            plugins: 目录中的插件条目（plugins.json 中的 plugins）
+            app_version: 当前应用版本
+            installed: 已安装插件的 ID -> 版本
+        """
+        self.plugins = {plugin['id']: plugin for plugin in plugins}
+        self.app_version = app_version
+        self.installed = dict(installed or {})
+        self._requirements: Dict[str, List[Tuple[str, str]]] = {}
+        self._cache: Dict[frozenset, InstallPlan] = {}
+    
+    def clear_cache(self):
+        """清空解析结果缓存"""
+        self._cache.clear()
+    
+    def get_requirements(self, plugin_id: str) -> List[Tuple[str, str]]:
+        """插件的直接依赖 [(插件ID, 版本约束)]，解析结果会被缓存"""
+        requirements = self._requirements.get(plugin_id)
+        if requirements is None:
+            plugin = self.plugins[plugin_id]
+            requirements = [parse_requirement(r) for r in plugin.get('dependencies', [])]
+            self._requirements[plugin_id] = requirements
+        return requirements
+    
+    def resolve(self, requested: Iterable[str]) -> InstallPlan:
+        """解析要安装的插件及其全部依赖，返回安装计划"""
+        key = frozenset(requested)
+        plan = self._cache.get(key)
+        if plan is None:
+            plan = self._resolve(sorted(key))
+            self._cache[key] = plan
+        return plan
+    
+    def _check_plugin(self, plugin_id: str, constraint: str, required_by: Optional[str]):
+        """检查插件存在、版本满足约束且兼容当前应用"""
+        source = f"（{required_by} 依赖）" if required_by else ""
+        plugin = self.plugins.get(plugin_id)
+        if plugin is None:
+            raise MissingDependencyError(f"插件 {plugin_id} 不在目录中{source}")
+        if not version_satisfies(plugin.get('version', ''), constraint):
+            raise IncompatibleVersionError(
+                f"插件 {plugin_id} 的版本 {plugin.get('version')} 不满足 {constraint}{source}"
+            )
+        if not is_app_compatible(plugin, self.app_version):
+            raise IncompatibleVersionError(
+                f"插件 {plugin_id} 不兼容应用版本 {self.app_version}"
+                f"（要求 {plugin.get('min_app_version') or '*'} ~ {plugin.get('max_app_version') or '*'}）"
+            )
+    
+    def _is_installed(self, plugin_id: str, constraint: str) -> bool:
+        """已安装的版本与目录中的版本一致且满足约束时无需重新安装"""
+        installed_version = self.installed.get(plugin_id)
+        if installed_version is None:
+            return False
+        catalog_version = self.plugins.get(plugin_id, {}).get('version')
+        return (parse_version(installed_version) >= parse_version(catalog_version or '')
+                and version_satisfies(installed_version, constraint))
+    
+    def _resolve(self, requested: List[str]) -> InstallPlan:
+        # 深度优先遍历：0 未访问，1 访问中，2 已完成
+        state: Dict[str, int] = {}
+        # 每个待安装插件所在的阶段，以及关键路径上的前驱和累计大小
+        stage_of: Dict[str, int] = {}
+        path_size: Dict[str, int] = {}
+        path_prev: Dict[str, Optional[str]] = {}
+        skipped: List[str] = []
+        
+        def visit(plugin_id: str, constraint: str, required_by: Optional[str], stack: List[str]):
+            if self._is_installed(plugin_id, constraint):
+                if plugin_id not in skipped:
+                    skipped.append(plugin_id)
+                return
+            
+            status = state.get(plugin_id, 0)
+            if status == 1:
+                raise DependencyCycleError(stack[stack.index(plugin_id):] + [plugin_id])
+            if status == 2:
+                # 已经解析过，但仍需检查新的版本约束
+                self._check_plugin(plugin_id, constraint, required_by)
+                return
+            
+            self._check_plugin(plugin_id, constraint, required_by)
+            state[plugin_id] = 1
+            stack.append(plugin_id)
+            
+            stage = 0
+            best_size, best_prev = 0, None
+            for dependency_id, dependency_constraint in self.get_requirements(plugin_id):
+                visit(dependency_id, dependency_constraint, plugin_id, stack)
+                if dependency_id in stage_of:
+                    stage = max(stage, stage_of[dependency_id] + 1)
+                    if path_size[dependency_id] > best_size or best_prev is None:
+                        best_size, best_prev = path_size[dependency_id], dependency_id
+            
+            stack.pop()
+            state[plugin_id] = 2
+            stage_of[plugin_id] = stage
+            path_size[plugin_id] = best_size + self.plugins[plugin_id].get('size', 0)
+            path_prev[plugin_id] = best_prev
+        
+        for plugin_id in requested:
+            visit(plugin_id, '', None, [])
+        
+        stages: List[List[str]] = [[] for _ in range(max(stage_of.values(), default=-1) + 1)]
+        for plugin_id in sorted(stage_of):
+            stages[stage_of[plugin_id]].append(plugin_id)
+        
+        critical_path: List[str] = []
+        if path_size:
+            current = max(sorted(path_size), key=path_size.__getitem__)
+            while current is not None:
+                critical_path.append(current)
+                current = path_prev[current]
+            critical_path.reverse()
+        
+        resolved = {plugin_id: self.plugins[plugin_id] for plugin_id in stage_of}
+        return InstallPlan(resolved, stages, critical_path, skipped)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+插件清单校验
+检查 manifest.json 的必填字段、插件类型、权限、依赖声明和打包规则，
+并把 settings 中声明的设置项编译为校验器，供构建脚本和插件更新设置时使用
+"""
+
+import re
+import json
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Iterable, Union
+
+from dependency_resolver import parse_requirement, version_satisfies
+
+
+REQUIRED_FIELDS = ('id', 'name', 'version', 'description', 'author',
+                   'plugin_class', 'plugin_type', 'api_version')
+PLUGIN_TYPES = ('component', 'utility', 'theme', 'integration', 'notification')
+PERMISSIONS = ('network_access', 'config_access', 'notification_access',
+               'file_access', 'theme_access')
+SETTING_TYPES = ('string', 'integer', 'boolean', 'choice')
+
+_VERSION_PATTERN = re.compile(r'^\d+(\.\d+)*$')
+_ID_PATTERN = re.compile(r'^[A-Za-z0-9_\-]+$')
+
+
+class ManifestError(ValueError):
+    """插件清单不合法"""
+    
+    def __init__(self, errors: List[str]):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+class SettingsValidationError(ValueError):
+    """设置值不符合插件清单中的声明"""
+    
+    def __init__(self, errors: List[str]):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def _compile_setting(key: str, spec: Dict[str, Any]) -> Callable[[Any], Optional[str]]:
+    """把一个设置项的声明编译为检查函数，检查函数返回错误信息，值合法时返回 None"""
+    setting_type = spec.get('type')
+    
+    if setting_type == 'boolean':
+        def check(value):
+            if value is not True and value is not False:
+                return f"设置 {key} 应为布尔值，实际为 {value!r}"
+            return None
+    
+    elif setting_type == 'integer':
+        low, high = spec.get('min'), spec.get('max')
+        
+        def check(value):
+            # bool 是 int 的子类，不能当作整数
+            if type(value) is not int:
+                return f"设置 {key} 应为整数，实际为 {value!r}"
+            if low is not None and value < low:
+                return f"设置 {key} 不能小于 {low}，实际为 {value}"
+            if high is not None and value > high:
+                return f"设置 {key} 不能大于 {high}，实际为 {value}"
+            return None
+    
+    elif setting_type == 'string':
+        def check(value):
+            if not isinstance(value, str):
+                return f"设置 {key} 应为字符串，实际为 {value!r}"
+            return None
+    
+    elif setting_type == 'choice':
+        choices = frozenset(spec.get('choices') or ())
+        
+        def check(value):
+            if not isinstance(value, str) or value not in choices:
+                return f"设置 {key} 应为 {'/'.join(sorted(choices))} 之一，实际为 {value!r}"
+            return None
+    
+    else:
+        raise ManifestError([f"设置 {key} 的类型未知: {setting_type!r}"])
+    
+    return check
+
+
+class SettingsValidator:
+    """编译后的设置校验器
+    
+    每个设置项的类型、范围和可选值在编译时确定，校验时只需按键查找检查函数。
+    调用校验器时，校验失败抛出 SettingsValidationError。
+    """
+    
+    __slots__ = ('checks', 'required', 'defaults')
+    
+    def __init__(self, checks: Dict[str, Callable[[Any], Optional[str]]],
+                 required: List[str], defaults: Dict[str, Any]):
+        self.checks = checks
+        self.required = required
+        self.defaults = defaults
+    
+    def validate(self, values: Dict[str, Any], partial: bool = True) -> List[str]:
+        """返回错误信息列表
+        
+        partial 为 True 时只检查传入的设置项（用于 update_settings），
+        否则还要求所有 required 的设置项都存在。
+        """
+        errors = []
+        checks = self.checks
+        for key, value in values.items():
+            check = checks.get(key)
+            if check is None:
+                errors.append(f"未知的设置项: {key}")
+                continue
+            error = check(value)
+            if error:
+                errors.append(error)
+        
+        if not partial:
+            errors.extend(f"缺少必填设置: {key}" for key in self.required if key not in values)
+        return errors
+    
+    def __call__(self, values: Dict[str, Any], partial: bool = True):
+        errors = self.validate(values, partial)
+        if errors:
+            raise SettingsValidationError(errors)
+
+
+def compile_settings_schema(settings: Dict[str, Any]) -> SettingsValidator:
+    """把 manifest.json 中的 settings 编译为校验器，声明本身不合法时抛出 ManifestError"""
+    if not isinstance(settings, dict):
+        raise ManifestError(["settings 应为对象"])
+    
+    errors = []
+    checks = {}
+    required = []
+    defaults = {}
+    for key, spec in settings.items():
+        if not isinstance(spec, dict):
+            errors.append(f"设置 {key} 的声明应为对象")
+            continue
+        
+        setting_type = spec.get('type')
+        if setting_type not in SETTING_TYPES:
+            errors.append(f"设置 {key} 的类型未知: {setting_type!r}")
+            continue
+        if setting_type == 'integer':
+            low, high = spec.get('min'), spec.get('max')
+            if any(bound is not None and type(bound) is not int for bound in (low, high)):
+                errors.append(f"设置 {key} 的 min/max 应为整数")
+                continue
+            if low is not None and high is not None and low > high:
+                errors.append(f"设置 {key} 的 min 大于 max")
+                continue
+        if setting_type == 'choice':
+            choices = spec.get('choices')
+            if not isinstance(choices, list) or not choices or \
+               not all(isinstance(choice, str) for choice in choices):
+                errors.append(f"设置 {key} 的 choices 应为非空字符串列表")
+                continue
+        if not isinstance(spec.get('required', False), bool):
+            errors.append(f"设置 {key} 的 required 应为布尔值")
+            continue
+        
+        check = _compile_setting(key, spec)
+        if 'default' in spec:
+            error = check(spec['default'])
+            if error:
+                errors.append(f"默认值不合法: {error}")
+                continue
+            defaults[key] = spec['default']
+        if spec.get('required'):
+            required.append(key)
+        checks[key] = check
+    
+    if errors:
+        raise ManifestError(errors)
+    return SettingsValidator(checks, required, defaults)
+
+
+def validate_manifest(manifest: Any, plugin_id: Optional[str] = None) -> List[str]:
+    """检查插件清单，返回错误信息列表
+    
+    plugin_id 为插件目录名，提供时要求与清单中的 id 一致。
+    """
+    if not isinstance(manifest, dict):
+        return ["manifest.json 应为对象"]
+    
+    errors = []
+    for field in REQUIRED_FIELDS:
+        value = manifest.get(field)
+        if not isinstance(value, str) or not value:
+            errors.append(f"缺少必填字段或不是字符串: {field}")
+    
+    manifest_id = manifest.get('id')
+    if isinstance(manifest_id, str) and manifest_id:
+        if not _ID_PATTERN.match(manifest_id):
+            errors.append(f"插件ID只能包含字母、数字、下划线和连字符: {manifest_id}")
+        if plugin_id is not None and manifest_id != plugin_id:
+            errors.append(f"插件ID {manifest_id} 与目录名 {plugin_id} 不一致")
+    
+    for field in ('version', 'api_version', 'min_app_version', 'max_app_version'):
+        value = manifest.get(field)
+        if isinstance(value, str) and value and not _VERSION_PATTERN.match(value):
+            errors.append(f"{field} 不是有效的版本号: {value}")
+    
+    plugin_type = manifest.get('plugin_type')
+    if isinstance(plugin_type, str) and plugin_type and plugin_type not in PLUGIN_TYPES:
+        errors.append(f"未知的插件类型: {plugin_type}")
+    
+    permissions = manifest.get('permissions', [])
+    if not isinstance(permissions, list):
+        errors.append("permissions 应为列表")
+    else:
+        errors.extend(f"未知的权限: {permission}" for permission in permissions
+                      if permission not in PERMISSIONS)
+    
+    tags = manifest.get('tags', [])
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        errors.append("tags 应为字符串列表")
+    
+    # 构建脚本按这些规则选择打包的文件和检查发布包大小
+    for field in ('files', 'exclude'):
+        patterns = manifest.get(field, [])
+        if not isinstance(patterns, list) or not all(isinstance(pattern, str) and pattern
+                                                     for pattern in patterns):
+            errors.append(f"{field} 应为非空字符串（文件匹配规则）列表")
+    
+    max_release_size = manifest.get('max_release_size')
+    if max_release_size is not None and (type(max_release_size) is not int or max_release_size <= 0):
+        errors.append(f"max_release_size 应为正整数（字节），实际为 {max_release_size!r}")
+    
+    dependencies = manifest.get('dependencies', [])
+    if not isinstance(dependencies, list):
+        errors.append("dependencies 应为列表")
+    else:
+        for requirement in dependencies:
+            try:
+                _, constraint = parse_requirement(requirement)
+                version_satisfies('0', constraint)
+            except (ValueError, KeyError, TypeError):
+                errors.append(f"无效的依赖声明: {requirement}")
+    
+    try:
+        compile_settings_schema(manifest.get('settings', {}))
+    except ManifestError as e:
+        errors.extend(e.errors)
+    
+    return errors
+
+
+def validate_plugin_dirs(plugin_dirs: Iterable[Union[str, Path]]) -> Dict[str, List[str]]:
+    """批量检查插件目录中的 manifest.json，返回 插件目录名 -> 错误信息（只包含有错误的插件）"""
+    results = {}
+    for plugin_dir in plugin_dirs:
+        plugin_dir = Path(plugin_dir)
+        try:
+            with open(plugin_dir / "manifest.json", 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except OSError:
+            results[plugin_dir.name] = ["缺少 manifest.json"]
+            continue
+        except ValueError as e:
+            results[plugin_dir.name] = [f"manifest.json 不是有效的JSON: {e}"]
+            continue
+        
+        errors = validate_manifest(manifest, plugin_dir.name)
+        if errors:
+            results[plugin_dir.name] = errors
+    return results
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+宿主应用的最小替身
+在没有 TimeNest 主程序的环境中（功能测试、基准测试）提供插件导入的 core.plugin_base，
+插件本身通过 plugin_loader.PluginLoader 导入，与宿主中的加载方式一致。需要 PyQt6。
+"""
+
+import sys
+import enum
+import types
+
+from manifest_schema import PLUGIN_TYPES
+
+
+def install_plugin_base_stub():
+    """注册最小的 core.plugin_base，宿主应用已提供时保持不变"""
+    if 'core.plugin_base' in sys.modules:
+        return
+    from PyQt6.QtCore import QObject
+    
+    class PluginStatus(enum.Enum):
+        LOADED = "loaded"
+        INITIALIZED = "initialized"
+        ENABLED = "enabled"
+        DISABLED = "disabled"
+        ERROR = "error"
+        UNLOADED = "unloaded"
+    
+    PluginType = enum.Enum('PluginType', {plugin_type.upper(): plugin_type for plugin_type in PLUGIN_TYPES})
+    
+    class PluginMetadata:
+        """插件元数据替身"""
+        
+        def __init__(self, **fields):
+            self.__dict__.update(fields)
+    
+    class IPlugin(QObject):
+        """插件基类替身，插件在类上定义 pyqtSignal，因此必须继承 QObject"""
+    
+    core = sys.modules.setdefault('core', types.ModuleType('core'))
+    core.__path__ = []
+    plugin_base = types.ModuleType('core.plugin_base')
+    plugin_base.PluginStatus = PluginStatus
+    plugin_base.PluginType = PluginType
+    plugin_base.PluginMetadata = PluginMetadata
+    plugin_base.IPlugin = IPlugin
+    core.plugin_base = plugin_base
+    sys.modules['core.plugin_base'] = plugin_base
+
+
+def process_deferred_deletes():
+    """执行 deleteLater() 排队的删除，宿主中由事件循环完成"""
+    from PyQt6.QtCore import QCoreApplication, QEvent
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+插件安装器
+按 plugins.json 中的 download_url、size 和 checksum 下载并安装插件发布包：
+下载结果按SHA256缓存在本地，多个插件并行下载，边下载边校验，中断的下载可以续传；
+解压时拒绝越出插件目录的路径和超出大小限制的文件
+"""
+
+import os
+import stat
+import shutil
+import hashlib
+import logging
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Dict, Any, Optional, Iterable, List, Union
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from dependency_resolver import parse_requirement
+
+
+# 下载、校验和解压时每次读写的字节数，决定安装过程的内存占用
+CHUNK_SIZE = 256 * 1024
+
+# 解压限制：单个文件和解压后总大小的上限，防止压缩炸弹
+MAX_MEMBER_SIZE = 64 * 1024 * 1024
+MAX_EXTRACTED_SIZE = 256 * 1024 * 1024
+
+
+class InstallError(Exception):
+    """插件下载或安装失败"""
+
+
+class ChecksumMismatchError(InstallError):
+    """下载内容的大小或校验和与目录中记录的不一致"""
+
+
+class UnsafeArchiveError(InstallError):
+    """发布包中包含越出插件目录的路径、符号链接或超出大小限制的文件"""
+
+
+def parse_checksum(checksum: str) -> str:
+    """从 'sha256:<hex>' 格式的校验和中取出十六进制摘要"""
+    algorithm, _, digest = (checksum or '').partition(':')
+    if algorithm != 'sha256' or len(digest) != 64:
+        raise InstallError(f"不支持的校验和: {checksum}")
+    return digest.lower()
+
+
+def hash_file(path: Union[str, Path]) -> str:
+    """分块计算文件的SHA256，内存占用与文件大小无关"""
+    sha256_hash = hashlib.sha256()
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            sha256_hash.update(view[:count])
+    return sha256_hash.hexdigest()
+
+
+def member_path(target_dir: Path, name: str) -> Path:
+    """把压缩包成员名转换为目标目录下的路径，拒绝绝对路径和 '..'"""
+    normalized = name.replace('\\', '/')
+    parts = PurePosixPath(normalized).parts
+    if (not parts or normalized.startswith('/') or ':' in parts[0]
+            or any(part == '..' for part in parts)):
+        raise UnsafeArchiveError(f"不安全的文件路径: {name}")
+    return target_dir.joinpath(*(part for part in parts if part != '.'))
+
+
+def extract_archive(zip_path: Union[str, Path], target_dir: Union[str, Path],
+                    checksum: Optional[str] = None, max_member_size: int = MAX_MEMBER_SIZE,
+                    max_extracted_size: int = MAX_EXTRACTED_SIZE) -> List[Path]:
+    """安全地解压发布包，返回解压出的文件
+    
+    提供 checksum 时先分块校验整个压缩包。写入任何文件之前先检查全部成员的路径、
+    类型和声明大小；解压时逐个成员分块复制，不会把压缩包或单个文件整体读入内存。
+    zipfile 读取成员时不会超出声明的大小，并在读完时校验CRC。
+    """
+    target_dir = Path(target_dir)
+    if checksum is not None and hash_file(zip_path) != parse_checksum(checksum):
+        raise ChecksumMismatchError(f"校验失败: {zip_path}")
+    
+    with zipfile.ZipFile(zip_path) as zipf:
+        members = []
+        total_size = 0
+        for info in zipf.infolist():
+            path = member_path(target_dir, info.filename)
+            if stat.S_ISLNK(info.external_attr >> 16):
+                raise UnsafeArchiveError(f"发布包不能包含符号链接: {info.filename}")
+            if info.file_size > max_member_size:
+                raise UnsafeArchiveError(
+                    f"文件 {info.filename} 解压后 {info.file_size} 字节，超过上限 {max_member_size} 字节"
+                )
+            total_size += info.file_size
+            if total_size > max_extracted_size:
+                raise UnsafeArchiveError(f"发布包解压后超过上限 {max_extracted_size} 字节")
+            members.append((info, path))
+        
+        extracted = []
+        for info, path in members:
+            if info.is_dir():
+                path.mkdir(parents=True, exist_ok=True)
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with zipf.open(info) as source, open(path, 'wb') as target:
+                shutil.copyfileobj(source, target, CHUNK_SIZE)
+            extracted.append(path)
+    
+    return extracted
+
+
+class DownloadCache:
+    """以SHA256为键的本地发布包缓存
+    
+    缓存中的文件只有在完整下载并校验通过后才会放到最终位置，
+    因此命中缓存时无需再次校验。未完成的下载保存为 .part 文件，供续传使用。
+    """
+    
+    def __init__(self, cache_dir: Union[str, Path]):
+        self.cache_dir = Path(cache_dir)
+    
+    def path_for(self, digest: str) -> Path:
+        """校验和对应的缓存文件路径"""
+        return self.cache_dir / "sha256" / digest[:2] / f"{digest}.zip"
+    
+    def partial_path_for(self, digest: str) -> Path:
+        """校验和对应的未完成下载路径"""
+        return self.path_for(digest).with_suffix(".part")
+    
+    def get(self, digest: str) -> Optional[Path]:
+        """返回已缓存的发布包路径，未缓存时返回 None"""
+        path = self.path_for(digest)
+        return path if path.is_file() else None
+
+
+class PluginInstaller:
+    """插件安装器
+    
+    同一个发布包在缓存中只下载一次；并发下载数不超过 max_concurrent_downloads；
+    下载时边接收边计算SHA256，结束时与目录中的 size 和 checksum 比对；
+    中断后再次下载时通过 HTTP Range 请求从断点继续。
+    """
+    
+    def __init__(self, cache_dir: Union[str, Path], plugins_dir: Union[str, Path],
+                 max_concurrent_downloads: int = 4, timeout: float = 30,
+                 max_member_size: int = MAX_MEMBER_SIZE, max_extracted_size: int = MAX_EXTRACTED_SIZE):
+        self.logger = logging.getLogger(f'{__name__}.PluginInstaller')
+        self.cache = DownloadCache(cache_dir)
+        self.plugins_dir = Path(plugins_dir)
+        self.max_concurrent_downloads = max_concurrent_downloads
+        self.timeout = timeout
+        self.max_member_size = max_member_size
+        self.max_extracted_size = max_extracted_size
+        
+        # 同一个校验和同时只允许一个线程下载
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+    
+    def _lock_for(self, digest: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(digest, threading.Lock())
+    
+    def download(self, plugin: Dict[str, Any]) -> Path:
+        """下载插件发布包到缓存并校验，返回缓存文件路径"""
+        digest = parse_checksum(plugin.get('checksum'))
+        cached = self.cache.get(digest)
+        if cached:
+            self.logger.debug(f"命中缓存: {plugin.get('id')}")
+            return cached
+        
+        with self._lock_for(digest):
+            # 等待锁期间可能已被其他线程下载完成
+            cached = self.cache.get(digest)
+            if cached:
+                return cached
+            return self._download(plugin['download_url'], digest, plugin.get('size'))
+    
+    def _download(self, url: str, digest: str, expected_size: Optional[int]) -> Path:
+        final_path = self.cache.path_for(digest)
+        partial_path = self.cache.partial_path_for(digest)
+        partial_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        sha256_hash = hashlib.sha256()
+        offset = partial_path.stat().st_size if partial_path.exists() else 0
+        if expected_size is not None and offset > expected_size:
+            offset = 0
+        
+        # 续传时先把已下载的部分计入哈希
+        if offset:
+            with open(partial_path, 'rb') as f:
+                remaining = offset
+                while remaining:
+                    block = f.read(min(CHUNK_SIZE, remaining))
+                    if not block:
+                        break
+                    sha256_hash.update(block)
+                    remaining -= len(block)
+        
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        size = offset
+        range_rejected = False
+        try:
+            with urlopen(Request(url, headers=headers), timeout=self.timeout) as response:
+                if offset and response.status != 206:
+                    # 服务器不支持续传，从头开始
+                    self.logger.debug(f"服务器不支持续传，重新下载: {url}")
+                    sha256_hash = hashlib.sha256()
+                    size = 0
+                
+                with open(partial_path, 'ab' if size else 'wb') as f:
+                    while True:
+                        chunk = response.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        size += len(chunk)
+                        if expected_size is not None and size > expected_size:
+                            raise ChecksumMismatchError(f"下载大小超过记录的 {expected_size} 字节: {url}")
+                        sha256_hash.update(chunk)
+                        f.write(chunk)
+        except HTTPError as e:
+            # 416 表示上次已下载完整，只是尚未校验
+            if not (e.code == 416 and offset):
+                raise InstallError(f"下载失败: {url}: {e}") from e
+            range_rejected = True
+        except ChecksumMismatchError:
+            partial_path.unlink(missing_ok=True)
+            raise
+        except OSError as e:
+            # 保留 .part 文件，下次从断点继续
+            raise InstallError(f"下载中断: {url}: {e}") from e
+        
+        if expected_size is not None and size < expected_size and not range_rejected:
+            # 连接提前关闭时 read() 只返回空数据而不抛出异常，同样保留 .part 文件，下次从断点继续
+            raise InstallError(f"下载不完整（{size}/{expected_size} 字节）: {url}")
+        
+        if (expected_size is not None and size != expected_size) or sha256_hash.hexdigest() != digest:
+            partial_path.unlink(missing_ok=True)
+            raise ChecksumMismatchError(f"校验失败: {url}")
+        
+        os.replace(partial_path, final_path)
+        return final_path
+    
+    def download_many(self, plugins: Iterable[Dict[str, Any]]) -> Dict[str, Union[Path, Exception]]:
+        """并行下载多个插件，返回 插件ID -> 缓存路径或异常"""
+        plugins = list(plugins)
+        results: Dict[str, Union[Path, Exception]] = {}
+        if not plugins:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrent_downloads, len(plugins))) as executor:
+            futures = {plugin['id']: executor.submit(self.download, plugin) for plugin in plugins}
+            for plugin_id, future in futures.items():
+                try:
+                    results[plugin_id] = future.result()
+                except Exception as e:
+                    self.logger.error(f"下载插件 {plugin_id} 失败: {e}")
+                    results[plugin_id] = e
+        
+        return results
+    
+    def extract(self, zip_path: Union[str, Path], plugin_id: str,
+                checksum: Optional[str] = None) -> Path:
+        """把发布包解压到插件目录，先解压到临时目录再整体替换旧版本
+        
+        缓存中的发布包已在下载时校验过；安装本地文件时可以传入 checksum 再校验一次。
+        """
+        target_dir = self.plugins_dir / plugin_id
+        staging_dir = self.plugins_dir / f".{plugin_id}.installing"
+        backup_dir = self.plugins_dir / f".{plugin_id}.old"
+        
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        self.plugins_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            extract_archive(zip_path, staging_dir, checksum,
+                            self.max_member_size, self.max_extracted_size)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        
+        shutil.rmtree(backup_dir, ignore_errors=True)
+        if target_dir.exists():
+            os.replace(target_dir, backup_dir)
+        os.replace(staging_dir, target_dir)
+        shutil.rmtree(backup_dir, ignore_errors=True)
+        return target_dir
+    
+    def install(self, plugin: Dict[str, Any]) -> Path:
+        """下载（或从缓存获取）并安装单个插件，返回安装目录"""
+        zip_path = self.download(plugin)
+        target_dir = self.extract(zip_path, plugin['id'])
+        self.logger.info(f"插件 {plugin['id']} {plugin.get('version', '')} 安装完成")
+        return target_dir
+    
+    def install_file(self, zip_path: Union[str, Path], plugin: Dict[str, Any]) -> Path:
+        """安装本地的发布包文件，按目录中的 checksum 校验后解压"""
+        target_dir = self.extract(zip_path, plugin['id'], plugin.get('checksum'))
+        self.logger.info(f"插件 {plugin['id']} {plugin.get('version', '')} 安装完成")
+        return target_dir
+    
+    def install_plan(self, plan) -> Dict[str, Union[Path, Exception]]:
+        """按 dependency_resolver.InstallPlan 安装插件
+        
+        所有发布包先并行下载；之后逐阶段安装，依赖安装失败的插件不再安装。
+        返回 插件ID -> 安装目录或异常。
+        """
+        results = self.download_many(plan.plugins[plugin_id] for plugin_id in plan.order)
+        failed = {plugin_id for plugin_id, result in results.items() if isinstance(result, Exception)}
+        
+        for stage in plan.stages:
+            for plugin_id in stage:
+                if plugin_id in failed:
+                    continue
+                dependencies = plan.plugins[plugin_id].get('dependencies', [])
+                if any(parse_requirement(d)[0] in failed for d in dependencies):
+                    results[plugin_id] = InstallError(f"插件 {plugin_id} 的依赖安装失败")
+                    failed.add(plugin_id)
+                    continue
+                try:
+                    results[plugin_id] = self.extract(results[plugin_id], plugin_id)
+                    self.logger.info(f"插件 {plugin_id} 安装完成")
+                except Exception as e:
+                    self.logger.error(f"安装插件 {plugin_id} 失败: {e}")
+                    results[plugin_id] = e
+                    failed.add(plugin_id)
+        
+        return results
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+插件加载器
+启动时只读取每个插件的manifest.json来列出和描述插件，不导入plugin.py；
+插件被激活时才导入模块、调用create_plugin()，组件在第一次get_widget()时才创建。
+插件通过 timenest_plugins.<id> 包导入，宿主的 core 包通过 meta path finder 提供，
+加载任意数量的插件都不会向 sys.path 添加条目
+"""
+
+import sys
+import json
+import types
+import logging
+import importlib
+from contextlib import nullcontext
+from importlib.abc import MetaPathFinder
+from importlib.machinery import PathFinder
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Union
+
+from manifest_schema import compile_settings_schema, validate_manifest
+
+
+# 插件模块的顶层包名，插件 <id> 的主模块为 timenest_plugins.<id>.plugin
+PLUGIN_PACKAGE = "timenest_plugins"
+PLUGIN_MODULE = "plugin"
+
+# 插件可以导入的宿主应用顶层包
+HOST_PACKAGES = ('core',)
+
+
+class PluginLoadError(Exception):
+    """插件导入、创建、初始化或激活失败"""
+
+
+class HostModuleFinder(MetaPathFinder):
+    """只在宿主应用目录中查找指定的顶层包（如 core），不修改 sys.path
+    
+    子模块（如 core.plugin_base）由顶层包的 __path__ 按常规方式查找。
+    """
+    
+    def __init__(self, app_dir: Union[str, Path], packages: Iterable[str] = HOST_PACKAGES):
+        self.app_dir = str(app_dir)
+        self.packages = frozenset(packages)
+    
+    def find_spec(self, fullname, path=None, target=None):
+        if '.' in fullname or fullname not in self.packages:
+            return None
+        return PathFinder.find_spec(fullname, [self.app_dir], target)
+
+
+def install_host_finder(app_dir: Union[str, Path],
+                        packages: Iterable[str] = HOST_PACKAGES) -> HostModuleFinder:
+    """注册宿主包查找器，同一目录只注册一次"""
+    app_dir = str(Path(app_dir).resolve())
+    for finder in sys.meta_path:
+        if isinstance(finder, HostModuleFinder) and finder.app_dir == app_dir:
+            return finder
+    
+    finder = HostModuleFinder(app_dir, packages)
+    sys.meta_path.append(finder)
+    return finder
+
+
+class PluginDescriptor:
+    """已安装插件的描述，全部信息来自manifest.json
+    
+    instance 在插件第一次激活前为 None；widget_requested 记录是否已调用过 get_widget()。
+    """
+    
+    __slots__ = ('plugin_dir', 'manifest', 'instance', 'widget_requested')
+    
+    def __init__(self, plugin_dir: Path, manifest: Dict[str, Any]):
+        self.plugin_dir = plugin_dir
+        self.manifest = manifest
+        self.instance = None
+        self.widget_requested = False
+    
+    @property
+    def id(self) -> str:
+        return self.manifest['id']
+    
+    @property
+    def name(self) -> str:
+        return self.manifest.get('name', self.id)
+    
+    @property
+    def version(self) -> str:
+        return self.manifest.get('version', '')
+    
+    @property
+    def description(self) -> str:
+        return self.manifest.get('description', '')
+    
+    @property
+    def plugin_type(self) -> str:
+        return self.manifest.get('plugin_type', '')
+    
+    @property
+    def module_name(self) -> str:
+        return f"{PLUGIN_PACKAGE}.{self.id}.{PLUGIN_MODULE}"
+    
+    @property
+    def loaded(self) -> bool:
+        return self.instance is not None
+    
+    def __repr__(self):
+        return f"PluginDescriptor({self.id!r}, version={self.version!r}, loaded={self.loaded})"
+
+
+class PluginLoader:
+    """按需加载插件
+    
+    discover() 只解析manifest.json，启动耗时和空闲内存与已安装插件的代码量无关；
+    activate() 时才导入插件模块并创建实例；deactivate() 保留实例，unload() 释放实例和模块。
+    """
+    
+    def __init__(self, plugins_dir: Union[str, Path], plugin_manager=None,
+                 app_dir: Optional[Union[str, Path]] = None, profiler=None):
+        """
+        Args:
+            plugins_dir: 已安装插件的目录
+            plugin_manager: 传给插件 initialize() 的插件管理器
+            app_dir: 宿主应用目录，提供时从这里导入 core 包；
+                     宿主进程中 core 已可导入时不需要
+            profiler: plugin_profiler.PluginProfiler，提供时记录每个插件各加载阶段的开销
+        """
+        self.logger = logging.getLogger(f'{__name__}.PluginLoader')
+        self.plugins_dir = Path(plugins_dir)
+        self.plugin_manager = plugin_manager
+        self.plugins: Dict[str, PluginDescriptor] = {}
+        self.profiler = profiler
+        if app_dir is not None:
+            install_host_finder(app_dir)
+    
+    def _measure(self, plugin_id: str, phase: str):
+        """返回测量某个加载阶段的上下文，未启用性能分析时不做任何事"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.measure(plugin_id, phase)
+    
+    def discover(self) -> List[PluginDescriptor]:
+        """扫描插件目录，读取所有插件的manifest.json，清单不合法的插件被跳过"""
+        plugins = {}
+        for plugin_dir in sorted(self.plugins_dir.iterdir()):
+            manifest_path = plugin_dir / "manifest.json"
+            if not manifest_path.is_file():
+                continue
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.error(f"读取插件清单失败 {manifest_path}: {e}")
+                continue
+            
+            errors = validate_manifest(manifest, plugin_dir.name)
+            if errors:
+                self.logger.error(f"插件 {plugin_dir.name} 的清单不合法: {'; '.join(errors)}")
+                continue
+            
+            # 已加载的插件保留原有实例
+            previous = self.plugins.get(plugin_dir.name)
+            if previous and previous.loaded:
+                plugins[plugin_dir.name] = previous
+            else:
+                plugins[plugin_dir.name] = PluginDescriptor(plugin_dir, manifest)
+        
+        self.plugins = plugins
+        return list(plugins.values())
+    
+    def get(self, plugin_id: str) -> Optional[PluginDescriptor]:
+        """按ID获取插件描述"""
+        return self.plugins.get(plugin_id)
+    
+    def _ensure_package(self, descriptor: PluginDescriptor):
+        """为插件目录注册包 timenest_plugins.<id>，插件之间的模块互不冲突，插件内可以使用相对导入"""
+        if PLUGIN_PACKAGE not in sys.modules:
+            root = types.ModuleType(PLUGIN_PACKAGE)
+            root.__path__ = []
+            sys.modules[PLUGIN_PACKAGE] = root
+        
+        package_name = f"{PLUGIN_PACKAGE}.{descriptor.id}"
+        if package_name not in sys.modules:
+            package = types.ModuleType(package_name)
+            package.__path__ = [str(descriptor.plugin_dir)]
+            package.__package__ = package_name
+            sys.modules[package_name] = package
+    
+    def import_plugin(self, descriptor: PluginDescriptor) -> types.ModuleType:
+        """导入插件的主模块"""
+        self._ensure_package(descriptor)
+        try:
+            with self._measure(descriptor.id, 'import'):
+                return importlib.import_module(descriptor.module_name)
+        except Exception as e:
+            raise PluginLoadError(f"导入插件 {descriptor.id} 失败: {e}") from e
+    
+    def import_plugin_module(self, descriptor: PluginDescriptor, name: str) -> types.ModuleType:
+        """导入插件目录中的某个模块（timenest_plugins.<id>.<name>），不导入主模块、不创建实例"""
+        self._ensure_package(descriptor)
+        try:
+            return importlib.import_module(f"{PLUGIN_PACKAGE}.{descriptor.id}.{name}")
+        except Exception as e:
+            raise PluginLoadError(f"导入插件 {descriptor.id} 的模块 {name} 失败: {e}") from e
+    
+    def create(self, descriptor: PluginDescriptor):
+        """导入插件并创建、初始化实例，已创建时直接返回"""
+        if descriptor.instance is not None:
+            return descriptor.instance
+        
+        module = self.import_plugin(descriptor)
+        try:
+            with self._measure(descriptor.id, 'create_plugin'):
+                instance = module.create_plugin()
+        except Exception as e:
+            raise PluginLoadError(f"创建插件 {descriptor.id} 失败: {e}") from e
+        
+        # 设置校验器在插件加载时编译一次
+        if hasattr(instance, 'settings_validator'):
+            instance.settings_validator = compile_settings_schema(descriptor.manifest.get('settings', {}))
+        
+        with self._measure(descriptor.id, 'initialize'):
+            initialized = instance.initialize(self.plugin_manager)
+        if not initialized:
+            raise PluginLoadError(f"插件 {descriptor.id} 初始化失败")
+        
+        descriptor.instance = instance
+        return instance
+    
+    def activate(self, plugin_id: str):
+        """激活插件，第一次激活时才导入模块并调用create_plugin()，返回插件实例"""
+        descriptor = self.plugins.get(plugin_id)
+        if descriptor is None:
+            raise PluginLoadError(f"插件 {plugin_id} 未安装")
+        
+        instance = self.create(descriptor)
+        with self._measure(plugin_id, 'activate'):
+            activated = instance.activate()
+        if not activated:
+            raise PluginLoadError(f"插件 {plugin_id} 激活失败")
+        
+        self.logger.info(f"插件 {plugin_id} 已激活")
+        return instance
+    
+    def deactivate(self, plugin_id: str) -> bool:
+        """停用插件，实例保留以便再次激活"""
+        descriptor = self.plugins.get(plugin_id)
+        if descriptor is None or descriptor.instance is None:
+            return False
+        return descriptor.instance.deactivate()
+    
+    def unload(self, plugin_id: str) -> bool:
+        """清理插件实例并移除插件模块，下次激活时重新导入"""
+        descriptor = self.plugins.get(plugin_id)
+        if descriptor is None or descriptor.instance is None:
+            return False
+        
+        try:
+            descriptor.instance.cleanup()
+        except Exception as e:
+            self.logger.error(f"清理插件 {plugin_id} 失败: {e}")
+        descriptor.instance = None
+        descriptor.widget_requested = False
+        
+        package_name = f"{PLUGIN_PACKAGE}.{plugin_id}"
+        for module_name in [name for name in sys.modules
+                            if name == package_name or name.startswith(package_name + '.')]:
+            del sys.modules[module_name]
+        return True
+    
+    def get_widget(self, plugin_id: str):
+        """获取已激活插件的组件，插件在这时才创建组件；未加载的插件返回 None"""
+        descriptor = self.plugins.get(plugin_id)
+        if descriptor is None or descriptor.instance is None:
+            return None
+        if descriptor.widget_requested:
+            return descriptor.instance.get_widget()
+        
+        descriptor.widget_requested = True
+        with self._measure(plugin_id, 'first_get_widget'):
+            return descriptor.instance.get_widget()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+插件加载性能分析
+记录每个插件在导入、create_plugin()、initialize()、activate() 和第一次 get_widget()
+各阶段的耗时、CPU时间和内存分配，生成结构化报告，用于找出拖慢启动的插件
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Union
+
+
+# 按加载顺序排列的阶段
+PHASES = ('import', 'create_plugin', 'initialize', 'activate', 'first_get_widget')
+
+
+class PhaseRecord:
+    """一个插件在一个阶段的测量结果
+    
+    Attributes:
+        wall_ms: 实际耗时（毫秒）
+        cpu_ms: 进程CPU时间（毫秒），远小于 wall_ms 时说明在等待I/O或网络
+        allocated_kib: 阶段结束时仍被占用的新增内存（KiB），未开启内存跟踪时为 None
+        peak_kib: 阶段内相对开始时的内存峰值增量（KiB），未开启内存跟踪时为 None
+        ok: 阶段是否正常完成（未抛出异常）
+    """
+    
+    __slots__ = ('plugin_id', 'phase', 'wall_ms', 'cpu_ms', 'allocated_kib', 'peak_kib', 'ok')
+    
+    def __init__(self, plugin_id: str, phase: str, wall_ms: float, cpu_ms: float,
+                 allocated_kib=None, peak_kib=None, ok: bool = True):
+        self.plugin_id = plugin_id
+        self.phase = phase
+        self.wall_ms = wall_ms
+        self.cpu_ms = cpu_ms
+        self.allocated_kib = allocated_kib
+        self.peak_kib = peak_kib
+        self.ok = ok
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'wall_ms': round(self.wall_ms, 3),
+            'cpu_ms': round(self.cpu_ms, 3),
+            'allocated_kib': None if self.allocated_kib is None else round(self.allocated_kib, 1),
+            'peak_kib': None if self.peak_kib is None else round(self.peak_kib, 1),
+            'ok': self.ok
+        }
+
+
+class PluginProfiler:
+    """插件加载性能分析器
+    
+    传给 PluginLoader(profiler=...) 后，加载器会在每个阶段调用 measure()。
+    内存跟踪使用 tracemalloc，会让被测代码明显变慢，只适合诊断时开启；
+    trace_allocations=False 时只记录耗时和CPU时间。
+    """
+    
+    def __init__(self, trace_allocations: bool = True):
+        self.trace_allocations = trace_allocations
+        self.records: List[PhaseRecord] = []
+        self._started_tracing = False
+    
+    def start(self):
+        """开始内存跟踪（measure() 会自动调用）"""
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+    
+    def stop(self):
+        """停止由分析器开启的内存跟踪"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+    
+    @contextmanager
+    def measure(self, plugin_id: str, phase: str):
+        """测量一个阶段，阶段内抛出的异常会被记录并继续抛出"""
+        self.start()
+        tracing = self.trace_allocations and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        
+        ok = False
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+            ok = True
+        finally:
+            wall_ms = (time.perf_counter() - wall_start) * 1000
+            cpu_ms = (time.process_time() - cpu_start) * 1000
+            allocated_kib = peak_kib = None
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                allocated_kib = (current - memory_before) / 1024
+                peak_kib = (peak - memory_before) / 1024
+            self.records.append(PhaseRecord(plugin_id, phase, wall_ms, cpu_ms,
+                                            allocated_kib, peak_kib, ok))
+    
+    def clear(self):
+        """清空已记录的结果"""
+        self.records.clear()
+    
+    def report(self) -> Dict[str, Any]:
+        """生成结构化报告
+        
+        返回 {'phases': [...], 'plugins': {插件ID: {阶段: 结果, 'total': 合计}},
+        'slowest': [按总耗时从高到低排列的插件ID]}。
+        同一插件同一阶段测量多次时（如停用后重新激活）取最近一次。
+        """
+        plugins: Dict[str, Dict[str, Any]] = {}
+        for record in self.records:
+            plugins.setdefault(record.plugin_id, {})[record.phase] = record
+        
+        result = {}
+        for plugin_id, phases in plugins.items():
+            entry = {phase: phases[phase].to_dict() for phase in PHASES if phase in phases}
+            entry['total'] = {
+                'wall_ms': round(sum(r.wall_ms for r in phases.values()), 3),
+                'cpu_ms': round(sum(r.cpu_ms for r in phases.values()), 3),
+                'allocated_kib': (None if any(r.allocated_kib is None for r in phases.values())
+                                  else round(sum(r.allocated_kib for r in phases.values()), 1)),
+                'ok': all(r.ok for r in phases.values())
+            }
+            result[plugin_id] = entry
+        
+        slowest = sorted(result, key=lambda plugin_id: result[plugin_id]['total']['wall_ms'], reverse=True)
+        return {'phases': list(PHASES), 'plugins': result, 'slowest': slowest}
+    
+    def save_report(self, path: Union[str, Path]):
+        """把报告保存为JSON文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+    
+    def format_report(self) -> str:
+        """把报告格式化为按总耗时排序的文本表格，每个单元格为 耗时ms/CPU ms/分配KiB"""
+        report = self.report()
+        lines = [f"{'插件':<24}" + ''.join(f"{phase:>22}" for phase in PHASES) + f"{'total':>22}"]
+        for plugin_id in report['slowest']:
+            entry = report['plugins'][plugin_id]
+            cells = []
+            for phase in PHASES + ('total',):
+                data = entry.get(phase)
+                if data is None:
+                    cells.append(f"{'-':>22}")
+                    continue
+                allocated = '-' if data['allocated_kib'] is None else f"{data['allocated_kib']:.0f}"
+                mark = '' if data['ok'] else '!'
+                cells.append(f"{mark}{data['wall_ms']:.1f}/{data['cpu_ms']:.1f}/{allocated}".rjust(22))
+            lines.append(f"{plugin_id:<24}" + ''.join(cells))
+        return '\n'.join(lines)
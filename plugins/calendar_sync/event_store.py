@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日历事件存储
+按开始时间排序保存所有已同步的事件，用二分查找回答"正在进行"、"接下来N个"和
+"M分钟内开始"的查询，同步时只调整发生变化的事件，不再每次全量扫描和排序
+"""
+
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+
+# 单次更新的变化超过存储大小的这个比例时，整体重新排序比逐个插入更快
+REBUILD_RATIO = 0.125
+
+# 时长超过这个值的事件另外索引，重叠查询只需从 (时刻 - LONG_EVENT) 开始扫描主索引
+LONG_EVENT = timedelta(days=1)
+
+# datetime 的最小精度，(t + RESOLUTION,) 在索引中排在所有开始于 t 的项之后
+RESOLUTION = timedelta(microseconds=1)
+
+
+def event_key(event: Dict[str, Any]) -> str:
+    """事件的唯一标识，优先使用数据源提供的 id"""
+    key = event.get('id')
+    if key:
+        return str(key)
+    return f"{event.get('title', '')}@{event['start_datetime'].isoformat()}"
+
+
+def is_long(event: Dict[str, Any]) -> bool:
+    """事件时长是否超过 LONG_EVENT"""
+    return event['end_datetime'] - event['start_datetime'] > LONG_EVENT
+
+
+class EventDiff:
+    """事件的变化：新增、修改和删除的事件"""
+    
+    __slots__ = ('added', 'changed', 'removed')
+    
+    def __init__(self, added: Optional[List[Dict[str, Any]]] = None,
+                 changed: Optional[List[Dict[str, Any]]] = None,
+                 removed: Optional[List[Dict[str, Any]]] = None):
+        self.added = added or []
+        self.changed = changed or []
+        self.removed = removed or []
+    
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+    
+    def __repr__(self) -> str:
+        return f"EventDiff(added={len(self.added)}, changed={len(self.changed)}, removed={len(self.removed)})"
+    
+    def extend(self, other: 'EventDiff'):
+        """合并另一组变化"""
+        self.added.extend(other.added)
+        self.changed.extend(other.changed)
+        self.removed.extend(other.removed)
+
+
+def diff_events(old: Iterable[Dict[str, Any]], new: Iterable[Dict[str, Any]]) -> EventDiff:
+    """按事件标识比较两组事件"""
+    old_events = {event_key(event): event for event in old}
+    diff = EventDiff()
+    for event in new:
+        previous = old_events.pop(event_key(event), None)
+        if previous is None:
+            diff.added.append(event)
+        elif previous != event:
+            diff.changed.append(event)
+    diff.removed.extend(old_events.values())
+    return diff
+
+
+class EventStore:
+    """按开始时间索引的事件存储
+    
+    事件为包含 start_datetime、end_datetime 的字典，以 event_key() 为标识。
+    _index 是按 (开始时间, 标识) 排序的列表。时长不超过 LONG_EVENT 的进行中事件一定在
+    (时刻 - LONG_EVENT, 时刻] 范围内开始，因此重叠查询只需二分定位后扫描这一小段；
+    更早开始的长事件（跨多天的事件）另外记录在同样排序的 _long 中，通常只有几项。
+    """
+    
+    def __init__(self, events: Iterable[Dict[str, Any]] = ()):
+        self._events: Dict[str, Dict[str, Any]] = {}
+        self._index: List[Tuple[datetime, str]] = []
+        self._long: List[Tuple[datetime, str]] = []
+        self.replace_all(events)
+    
+    def __len__(self) -> int:
+        return len(self._events)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._events
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """按开始时间顺序遍历所有事件"""
+        for _, key in self._index:
+            yield self._events[key]
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """按标识获取事件"""
+        return self._events.get(key)
+    
+    def items(self):
+        """(标识, 事件) 视图，不按时间排序"""
+        return self._events.items()
+    
+    def clear(self):
+        """清空存储"""
+        self._events.clear()
+        self._index.clear()
+        self._long.clear()
+    
+    def replace_all(self, events: Iterable[Dict[str, Any]]):
+        """用给定的事件替换全部内容"""
+        self._events = {event_key(event): event for event in events}
+        self._rebuild()
+    
+    def update(self, events: Iterable[Dict[str, Any]]) -> int:
+        """新增或更新事件，返回位置发生变化的事件数
+        
+        开始时间未变的事件只替换数据，不调整索引。
+        """
+        moved = []
+        for event in events:
+            key = event_key(event)
+            old = self._events.get(key)
+            self._events[key] = event
+            if old is None:
+                self._track_long(key, None, event)
+                moved.append((None, key, event))
+            elif old['start_datetime'] != event['start_datetime']:
+                self._track_long(key, old, event)
+                moved.append((old['start_datetime'], key, event))
+            elif old['end_datetime'] != event['end_datetime']:
+                self._track_long(key, old, event)
+        
+        if len(moved) > len(self._index) * REBUILD_RATIO:
+            self._rebuild()
+        else:
+            for old_start, key, event in moved:
+                if old_start is not None:
+                    self._remove_index(old_start, key)
+                insort(self._index, (event['start_datetime'], key))
+        return len(moved)
+    
+    def remove(self, keys: Iterable[str]) -> List[Dict[str, Any]]:
+        """按标识删除事件，返回被删除的事件"""
+        removed = []
+        for key in keys:
+            event = self._events.pop(key, None)
+            if event is not None:
+                self._track_long(key, event, None)
+                removed.append(event)
+        
+        if len(removed) > len(self._index) * REBUILD_RATIO:
+            self._rebuild()
+        else:
+            for event in removed:
+                self._remove_index(event['start_datetime'], event_key(event))
+        return removed
+    
+    def apply_changes(self, source_id: str, events: Iterable[Dict[str, Any]],
+                      removed: Iterable[str] = (), full: bool = False) -> EventDiff:
+        """合并一个数据源的同步结果，返回实际发生的变化
+        
+        full 为 True 时 events 是该数据源的全部事件，存储中该数据源的其他事件会被删除。
+        与已保存内容相同的事件不计入变化，也不更新。
+        """
+        diff = EventDiff()
+        incoming = {}
+        for event in events:
+            event.setdefault('source', source_id)
+            key = event_key(event)
+            incoming[key] = event
+            previous = self._events.get(key)
+            if previous is None:
+                diff.added.append(event)
+            elif previous != event:
+                diff.changed.append(event)
+        
+        removed_keys = list(removed)
+        if full:
+            removed_keys.extend(key for key, event in self._events.items()
+                                if event.get('source') == source_id and key not in incoming)
+        
+        if diff.added or diff.changed:
+            self.update(diff.added + diff.changed)
+        diff.removed = self.remove(removed_keys)
+        return diff
+    
+    def overlapping(self, start: datetime, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """返回与 [start, end) 重叠的事件，省略 end 时返回在 start 时刻正在进行的事件"""
+        if end is None:
+            end = start + RESOLUTION
+        cutoff = start - LONG_EVENT
+        first = bisect_left(self._index, (cutoff,))
+        last = bisect_left(self._index, (end,))
+        candidates = chain(self._earlier_long(cutoff), self._index[first:last])
+        return [self._events[key] for _, key in candidates
+                if self._events[key]['end_datetime'] > start]
+    
+    def upcoming(self, now: datetime, count: int, include_all_day: bool = True) -> List[Dict[str, Any]]:
+        """返回尚未结束的前 count 个事件（含正在进行的），按开始时间排序"""
+        result = []
+        if count <= 0:
+            return result
+        
+        # 先取更早开始的长事件，再从主索引逐项向后取，不复制索引的剩余部分
+        cutoff = now - LONG_EVENT
+        keys = chain((key for _, key in self._earlier_long(cutoff)),
+                     (self._index[position][1]
+                      for position in range(bisect_left(self._index, (cutoff,)), len(self._index))))
+        for key in keys:
+            event = self._events[key]
+            if event['end_datetime'] <= now:
+                continue
+            if not include_all_day and event.get('all_day', False):
+                continue
+            result.append(event)
+            if len(result) >= count:
+                break
+        return result
+    
+    def starting_within(self, now: datetime, minutes: float, include_all_day: bool = True) -> List[Dict[str, Any]]:
+        """返回在 [now, now + minutes分钟] 内开始的事件"""
+        first = bisect_left(self._index, (now,))
+        last = bisect_left(self._index, (now + timedelta(minutes=minutes) + RESOLUTION,))
+        events = [self._events[key] for _, key in self._index[first:last]]
+        if not include_all_day:
+            events = [event for event in events if not event.get('all_day', False)]
+        return events
+    
+    def _earlier_long(self, cutoff: datetime) -> List[Tuple[datetime, str]]:
+        """在 cutoff 之前开始的长事件，主索引的扫描从 cutoff 开始，不会与这些重复"""
+        return self._long[:bisect_left(self._long, (cutoff,))]
+    
+    def _track_long(self, key: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        """事件新增、修改或删除时维护长事件索引"""
+        if old is not None and is_long(old):
+            self._remove_index(old['start_datetime'], key, self._long)
+        if new is not None and is_long(new):
+            insort(self._long, (new['start_datetime'], key))
+    
+    def _remove_index(self, start: datetime, key: str, index: Optional[List[Tuple[datetime, str]]] = None):
+        """从索引（默认为主索引）中删除一项"""
+        if index is None:
+            index = self._index
+        position = bisect_left(index, (start, key))
+        if position < len(index) and index[position] == (start, key):
+            del index[position]
+    
+    def _rebuild(self):
+        """重新排序整个索引"""
+        self._index = sorted((event['start_datetime'], key) for key, event in self._events.items())
+        self._long = [entry for entry in self._index if is_long(self._events[entry[1]])]
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+后台获取日历数据源
+所有数据源在线程池中并发调用 fetch_changes()，每个数据源有自己的时限；
+结果通过排队连接的信号回到GUI线程，GUI线程只负责合并和刷新界面，网络请求和解析不会卡住窗口
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List, Tuple
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from .sources import CalendarSource, SourceChanges
+
+
+# 同步线程数，不少于可同时启用的数据源数量，所有数据源可以同时开始
+SYNC_WORKERS = 4
+
+# 数据源没有设置 timeout 属性时的同步时限（秒）
+SOURCE_TIMEOUT = 60
+
+
+class FetchResult:
+    """一次同步所有数据源的结果
+    
+    Attributes:
+        changes: 成功的数据源及其变化，按数据源的顺序排列
+        errors: 失败的数据源ID -> 错误说明（包括超时）
+        elapsed: 同步耗时（秒）
+    """
+    
+    __slots__ = ('changes', 'errors', 'elapsed')
+    
+    def __init__(self):
+        self.changes: List[Tuple[CalendarSource, SourceChanges]] = []
+        self.errors: Dict[str, str] = {}
+        self.elapsed = 0.0
+    
+    def __repr__(self) -> str:
+        return f"FetchResult(ok={len(self.changes)}, failed={len(self.errors)}, elapsed={self.elapsed:.3f}s)"
+
+
+def fetch_all(sources: List[CalendarSource], tokens: Dict[str, Optional[str]]) -> FetchResult:
+    """在当前线程中逐个获取数据源，用于不需要后台同步的场合（如脚本和基准测试）"""
+    result = FetchResult()
+    started = time.perf_counter()
+    for source in sources:
+        try:
+            result.changes.append((source, source.fetch_changes(tokens.get(source.source_id))))
+        except Exception as e:
+            result.errors[source.source_id] = str(e)
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+class SourceFetcher(QObject):
+    """在线程池中并发获取数据源
+    
+    start() 立即返回，所有数据源完成或超时后在GUI线程发出 finished(FetchResult)。
+    同一时刻只进行一次同步；超时的数据源仍在后台运行，在它返回之前不会再次获取，
+    它返回的结果会被丢弃，下次同步时继续使用原令牌。
+    """
+    
+    finished = pyqtSignal(object)  # FetchResult
+    
+    # 工作线程发出，排队送到GUI线程：批次编号, 数据源, 变化, 错误
+    source_done = pyqtSignal(int, object, object, object)
+    
+    def __init__(self, max_workers: int = SYNC_WORKERS, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.logger = logging.getLogger(f'{__name__}.SourceFetcher')
+        self.max_workers = max_workers
+        self.executor = None
+        
+        # 当前批次：编号、按顺序排列的数据源、尚未完成的数据源 -> 截止时间
+        self.generation = 0
+        self.sources: List[CalendarSource] = []
+        self.pending: Dict[CalendarSource, float] = {}
+        self.result = None
+        self.started = 0.0
+        
+        # 仍在工作线程中运行的数据源，包括已超时的
+        self.running = set()
+        
+        self.deadline_timer = QTimer(self)
+        self.deadline_timer.setSingleShot(True)
+        self.deadline_timer.timeout.connect(self.expire_overdue)
+        
+        self.source_done.connect(self.on_source_done)
+    
+    @property
+    def busy(self) -> bool:
+        """是否有正在进行的同步"""
+        return self.result is not None
+    
+    def start(self, sources: List[CalendarSource], tokens: Dict[str, Optional[str]]) -> bool:
+        """开始同步，已有同步在进行时返回 False"""
+        if self.busy:
+            return False
+        
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                               thread_name_prefix='calendar-sync')
+        
+        self.generation += 1
+        self.sources = list(sources)
+        self.pending = {}
+        self.result = FetchResult()
+        self.started = time.perf_counter()
+        
+        for source in self.sources:
+            if source in self.running:
+                self.result.errors[source.source_id] = "上次同步尚未结束"
+                continue
+            
+            timeout = getattr(source, 'timeout', None) or SOURCE_TIMEOUT
+            self.pending[source] = self.started + timeout
+            self.running.add(source)
+            self.executor.submit(self.fetch, self.generation, source, tokens.get(source.source_id))
+        
+        self.schedule_deadline()
+        return True
+    
+    def fetch(self, generation: int, source: CalendarSource, token: Optional[str]):
+        """在工作线程中运行"""
+        changes = error = None
+        try:
+            changes = source.fetch_changes(token)
+        except Exception as e:
+            error = e
+        
+        try:
+            self.source_done.emit(generation, source, changes, error)
+        except RuntimeError:
+            # 获取器已被删除（插件已卸载）
+            pass
+    
+    def on_source_done(self, generation: int, source: CalendarSource,
+                       changes: Optional[SourceChanges], error: Optional[Exception]):
+        """在GUI线程中接收一个数据源的结果"""
+        self.running.discard(source)
+        if generation != self.generation or source not in self.pending:
+            self.logger.debug(f"丢弃数据源 {source.source_id} 过期的同步结果")
+            return
+        
+        del self.pending[source]
+        if error is not None:
+            self.result.errors[source.source_id] = str(error)
+        else:
+            self.result.changes.append((source, changes))
+        
+        if self.pending:
+            self.schedule_deadline()
+        else:
+            self.finish()
+    
+    def schedule_deadline(self):
+        """在最早的截止时间检查超时"""
+        if not self.pending:
+            self.finish()
+            return
+        
+        remaining = min(self.pending.values()) - time.perf_counter()
+        self.deadline_timer.start(max(0, int(remaining * 1000) + 1))
+    
+    def expire_overdue(self):
+        """把已过截止时间的数据源记为失败"""
+        if not self.busy:
+            return
+        
+        now = time.perf_counter()
+        for source, deadline in list(self.pending.items()):
+            if deadline <= now:
+                del self.pending[source]
+                self.result.errors[source.source_id] = f"超时（{deadline - self.started:.0f}秒）"
+                self.logger.warning(f"数据源 {source.source_id} 同步超时")
+        
+        self.schedule_deadline()
+    
+    def finish(self):
+        """结束当前批次并发出结果"""
+        self.deadline_timer.stop()
+        result, self.result = self.result, None
+        if result is None:
+            return
+        
+        # 成功的结果按数据源原来的顺序合并，与完成的先后无关
+        order = {source: position for position, source in enumerate(self.sources)}
+        result.changes.sort(key=lambda item: order[item[0]])
+        result.elapsed = time.perf_counter() - self.started
+        self.sources = []
+        self.finished.emit(result)
+    
+    def cancel(self):
+        """放弃当前批次，之后到达的结果都会被丢弃"""
+        self.deadline_timer.stop()
+        self.generation += 1
+        self.sources = []
+        self.pending = {}
+        self.result = None
+    
+    def shutdown(self):
+        """放弃当前批次并关闭线程池，不等待正在运行的数据源"""
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+iCalendar (.ics) 解析
+逐行流式读取，不把整个文件读入内存，只保留尚未结束的事件的主记录；
+重复事件（RRULE、RDATE、EXDATE）在查询时只展开到给定的时间范围内，
+一学期的每周课表不会变成几千个事件。
+
+带时区的时间（UTC 或 TZID）保持为带时区的 datetime，重复规则在 DTSTART 自己的时区中展开，
+EXDATE 和 RECURRENCE-ID 也在该时区中比较，跨越夏令时切换时每次发生的墙上时间不变；
+只有展开的结果由调用方通过 to_local() 换算为本地时间。浮动时间和日期为不带时区的 datetime。
+"""
+
+import re
+import logging
+from datetime import datetime, date, timedelta, timezone
+from typing import Dict, Optional, List, Iterable, Iterator, Tuple
+from zoneinfo import ZoneInfo
+
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+
+# 单次展开最多检查的重复周期数，防止异常的规则导致死循环
+MAX_PERIODS = 10000
+
+DURATION_PATTERN = re.compile(
+    r'^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$'
+)
+
+BYDAY_PATTERN = re.compile(r'^(?P<ordinal>[+-]?\d{1,2})?(?P<weekday>MO|TU|WE|TH|FR|SA|SU)$')
+
+
+class IcsError(ValueError):
+    """iCalendar 内容格式错误"""
+
+
+def unfold_lines(stream: Iterable[str]) -> Iterator[str]:
+    """逐行读取并合并折行（以空格或制表符开头的行接在上一行后面）"""
+    pending = None
+    for raw in stream:
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and pending is not None:
+            pending += line[1:]
+            continue
+        if pending:
+            yield pending
+        pending = line
+    if pending:
+        yield pending
+
+
+def split_unquoted(text: str, separator: str) -> List[str]:
+    """按不在双引号内的分隔符拆分"""
+    parts, start, quoted = [], 0, False
+    for index, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif char == separator and not quoted:
+            parts.append(text[start:index])
+            start = index + 1
+    parts.append(text[start:])
+    return parts
+
+
+def parse_content_line(line: str) -> Tuple[str, Dict[str, str], str]:
+    """解析内容行，返回 (属性名, 参数, 值)"""
+    index = line.find(':')
+    if index < 0:
+        raise IcsError(f"缺少属性值: {line[:60]}")
+    
+    head = line[:index]
+    if ';' not in head:
+        # 大多数内容行没有参数
+        return head.upper(), {}, line[index + 1:]
+    
+    if '"' in head:
+        # 参数值带引号时其中可以出现冒号，逐个字符查找
+        quoted = False
+        for index, char in enumerate(line):
+            if char == '"':
+                quoted = not quoted
+            elif char == ':' and not quoted:
+                break
+        else:
+            raise IcsError(f"缺少属性值: {line[:60]}")
+        head = line[:index]
+    
+    value = line[index + 1:]
+    parts = split_unquoted(head, ';')
+    params = {}
+    for part in parts[1:]:
+        key, _, param_value = part.partition('=')
+        params[key.upper()] = param_value.strip('"')
+    return parts[0].upper(), params, value
+
+
+def unescape_text(value: str) -> str:
+    """还原 TEXT 类型值中的转义字符"""
+    if '\\' not in value:
+        return value
+    
+    result, index = [], 0
+    while index < len(value):
+        char = value[index]
+        if char == '\\' and index + 1 < len(value):
+            following = value[index + 1]
+            result.append('\n' if following in 'nN' else following)
+            index += 2
+        else:
+            result.append(char)
+            index += 1
+    return ''.join(result)
+
+
+def parse_date_value(value: str, params: Dict[str, str]) -> Tuple[datetime, bool]:
+    """解析 DATE 或 DATE-TIME 值，返回 (时间, 是否为日期)
+    
+    UTC 时间和可识别的 TZID 返回带时区的 datetime，日期和浮动时间返回不带时区的 datetime。
+    """
+    value = value.strip()
+    try:
+        if params.get('VALUE') == 'DATE' or len(value) == 8:
+            return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8])), True
+        
+        parsed = datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]),
+                          int(value[9:11]), int(value[11:13]), int(value[13:15]))
+    except (ValueError, IndexError):
+        raise IcsError(f"无效的时间: {value}")
+    
+    if value.endswith('Z'):
+        return parsed.replace(tzinfo=timezone.utc), False
+    
+    tzid = params.get('TZID')
+    if tzid:
+        try:
+            zone = ZoneInfo(tzid)
+        except (KeyError, ValueError):
+            # 非IANA时区名（如Outlook导出的Windows时区名）按本地时间处理
+            zone = None
+        if zone is not None:
+            return parsed.replace(tzinfo=zone), False
+    
+    # 浮动时间按本地时间处理
+    return parsed, False
+
+
+def in_zone(value: datetime, zone) -> datetime:
+    """把时间换算到 zone 时区，zone 为 None 表示浮动时间（本地时间）
+    
+    不带时区的值视为本地时间。
+    """
+    if zone is None:
+        if value.tzinfo is None:
+            return value
+        return value.astimezone().replace(tzinfo=None)
+    return value.astimezone(zone)
+
+
+def to_local(value: datetime) -> datetime:
+    """换算为不带时区的本地时间"""
+    return in_zone(value, None)
+
+
+def instance_key(value: datetime) -> str:
+    """重复事件中一次发生的标识：带时区的时间按UTC表示，与使用哪个时区书写无关"""
+    if value.tzinfo is None:
+        return value.strftime('%Y%m%dT%H%M%S')
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def parse_duration(value: str) -> timedelta:
+    """解析 DURATION 值，如 PT1H30M、P1D、-PT15M"""
+    match = DURATION_PATTERN.match(value.strip())
+    if not match:
+        raise IcsError(f"无效的时长: {value}")
+    
+    duration = timedelta(
+        weeks=int(match.group('weeks') or 0),
+        days=int(match.group('days') or 0),
+        hours=int(match.group('hours') or 0),
+        minutes=int(match.group('minutes') or 0),
+        seconds=int(match.group('seconds') or 0)
+    )
+    return -duration if match.group('sign') == '-' else duration
+
+
+def month_days(year: int, month: int) -> int:
+    """某月的天数"""
+    if month == 12:
+        return 31
+    return (date(year, month + 1, 1) - date(year, month, 1)).days
+
+
+class RecurrenceRule:
+    """RRULE 重复规则
+    
+    支持 FREQ（DAILY、WEEKLY、MONTHLY、YEARLY）、INTERVAL、COUNT、UNTIL、
+    BYDAY（MONTHLY、YEARLY 中可带序号，如 1MO、-1FR）、BYMONTHDAY 和 BYMONTH，
+    这覆盖了课表、例会、纪念日等常见日历的导出内容；不支持的部分会被忽略。
+    """
+    
+    __slots__ = ('freq', 'interval', 'count', 'until', 'by_day', 'by_month_day', 'by_month')
+    
+    def __init__(self, freq: str, interval: int = 1, count: Optional[int] = None,
+                 until: Optional[datetime] = None, by_day: Optional[List[Tuple[Optional[int], int]]] = None,
+                 by_month_day: Optional[List[int]] = None, by_month: Optional[List[int]] = None):
+        self.freq = freq
+        self.interval = max(interval, 1)
+        self.count = count
+        self.until = until
+        self.by_day = by_day or []
+        self.by_month_day = by_month_day or []
+        self.by_month = by_month or []
+    
+    @classmethod
+    def parse(cls, value: str) -> 'RecurrenceRule':
+        """解析 RRULE 的值"""
+        parts = {}
+        for part in value.split(';'):
+            key, _, part_value = part.partition('=')
+            parts[key.upper()] = part_value.upper()
+        
+        freq = parts.get('FREQ')
+        if freq not in FREQUENCIES:
+            raise IcsError(f"不支持的重复频率: {freq}")
+        
+        until = None
+        if 'UNTIL' in parts:
+            until, is_date = parse_date_value(parts['UNTIL'], {})
+            if is_date:
+                # 日期形式的 UNTIL 包含当天
+                until += timedelta(days=1) - timedelta(microseconds=1)
+        
+        by_day = []
+        for item in filter(None, parts.get('BYDAY', '').split(',')):
+            match = BYDAY_PATTERN.match(item)
+            if not match:
+                raise IcsError(f"无效的BYDAY: {item}")
+            ordinal = match.group('ordinal')
+            by_day.append((int(ordinal) if ordinal else None, WEEKDAYS[match.group('weekday')]))
+        
+        def int_list(key):
+            return [int(item) for item in parts.get(key, '').split(',') if item]
+        
+        try:
+            return cls(freq, int(parts.get('INTERVAL', 1)),
+                       int(parts['COUNT']) if 'COUNT' in parts else None,
+                       until, by_day, int_list('BYMONTHDAY'), int_list('BYMONTH'))
+        except ValueError:
+            raise IcsError(f"无效的重复规则: {value}")
+    
+    def iter_starts(self, dtstart: datetime, not_before: Optional[datetime] = None) -> Iterator[datetime]:
+        """按时间顺序生成每次重复的开始时间
+        
+        开始时间与 dtstart 使用同一时区（墙上时间相同）；not_before 和 UNTIL 先换算到该时区。
+        没有 COUNT 时直接跳到 not_before 附近的周期开始，不从 dtstart 逐个计算。
+        """
+        zone = dtstart.tzinfo
+        until = None if self.until is None else in_zone(self.until, zone)
+        skip = 0
+        if not_before is not None and self.count is None:
+            not_before = in_zone(not_before, zone)
+            if not_before > dtstart:
+                skip = max(self._periods_between(dtstart, not_before) - 1, 0)
+        
+        produced = 0
+        for period in range(skip, skip + MAX_PERIODS):
+            try:
+                starts = self._period_starts(dtstart, period)
+            except (ValueError, OverflowError):
+                # 超出 datetime 可表示的范围
+                return
+            for start in starts:
+                if start < dtstart:
+                    continue
+                if until is not None and start > until:
+                    return
+                produced += 1
+                if self.count is not None and produced > self.count:
+                    return
+                yield start
+        logger.warning(f"重复规则展开超过 {MAX_PERIODS} 个周期，已停止")
+    
+    def _periods_between(self, dtstart: datetime, moment: datetime) -> int:
+        """dtstart 到 moment 之间完整的重复周期数"""
+        if self.freq == 'DAILY':
+            return (moment - dtstart).days // self.interval
+        if self.freq == 'WEEKLY':
+            return (moment - dtstart).days // (7 * self.interval)
+        months = (moment.year - dtstart.year) * 12 + moment.month - dtstart.month
+        if self.freq == 'MONTHLY':
+            return months // self.interval
+        return months // 12 // self.interval
+    
+    def _period_starts(self, dtstart: datetime, period: int) -> List[datetime]:
+        """第 period 个周期内的所有开始时间，按时间排序
+        
+        带时区的 dtstart 按墙上时间计算，datetime 加减 timedelta 也保持墙上时间不变。
+        """
+        clock = dtstart.timetz()
+        if self.freq == 'DAILY':
+            day = dtstart + timedelta(days=period * self.interval)
+            if self.by_month and day.month not in self.by_month:
+                return []
+            if self.by_day and day.weekday() not in {weekday for _, weekday in self.by_day}:
+                return []
+            return [day]
+        
+        if self.freq == 'WEEKLY':
+            week_start = dtstart.date() - timedelta(days=dtstart.weekday()) + timedelta(weeks=period * self.interval)
+            weekdays = sorted({weekday for _, weekday in self.by_day}) or [dtstart.weekday()]
+            return [datetime.combine(week_start + timedelta(days=weekday), clock) for weekday in weekdays]
+        
+        if self.freq == 'MONTHLY':
+            month_index = dtstart.month - 1 + period * self.interval
+            months = [(dtstart.year + month_index // 12, month_index % 12 + 1)]
+            if self.by_month and months[0][1] not in self.by_month:
+                return []
+        else:
+            year = dtstart.year + period * self.interval
+            if self.by_day and not self.by_month and not self.by_month_day:
+                # 没有 BYMONTH 时，BYDAY 的序号按全年计算，如 20MO 为一年中的第20个星期一
+                return [datetime.combine(day, clock) for day in self._year_days(year)]
+            if self.by_month:
+                months = [(year, month) for month in sorted(self.by_month)]
+            elif self.by_month_day:
+                months = [(year, month) for month in range(1, 13)]
+            else:
+                months = [(year, dtstart.month)]
+        
+        starts = []
+        for year, month in months:
+            for day in self._month_days(year, month, dtstart.day):
+                starts.append(datetime.combine(date(year, month, day), clock))
+        return sorted(starts)
+    
+    def _year_days(self, year: int) -> List[date]:
+        """一年中符合 BYDAY 的日期"""
+        first = date(year, 1, 1)
+        length = (date(year + 1, 1, 1) - first).days if year < 9999 else 365
+        days = set()
+        for ordinal, weekday in self.by_day:
+            offset = (weekday - first.weekday()) % 7
+            matching = range(offset, length, 7)
+            if ordinal is None:
+                days.update(first + timedelta(days=day) for day in matching)
+            elif -len(matching) <= ordinal <= len(matching) and ordinal != 0:
+                days.add(first + timedelta(days=matching[ordinal - 1 if ordinal > 0 else ordinal]))
+        return sorted(days)
+    
+    def _month_days(self, year: int, month: int, default_day: int) -> List[int]:
+        """某月中符合 BYMONTHDAY / BYDAY 的日期"""
+        length = month_days(year, month)
+        if self.by_month_day:
+            days = [day if day > 0 else length + day + 1 for day in self.by_month_day]
+        elif self.by_day:
+            first_weekday = date(year, month, 1).weekday()
+            days = []
+            for ordinal, weekday in self.by_day:
+                matching = list(range((weekday - first_weekday) % 7 + 1, length + 1, 7))
+                if ordinal is None:
+                    days.extend(matching)
+                elif -len(matching) <= ordinal <= len(matching) and ordinal != 0:
+                    days.append(matching[ordinal - 1 if ordinal > 0 else ordinal])
+        else:
+            days = [default_day]
+        # 不存在的日期（如2月30日）跳过
+        return sorted({day for day in days if 1 <= day <= length})
+
+
+class IcsEvent:
+    """一个 VEVENT，重复事件只保存主记录"""
+    
+    __slots__ = ('uid', 'summary', 'start', 'end', 'all_day', 'rule', 'rdates', 'exdates',
+                 'recurrence_id', 'cancelled')
+    
+    def __init__(self, uid: str, summary: str, start: datetime, end: datetime, all_day: bool = False,
+                 rule: Optional[RecurrenceRule] = None, rdates: Optional[List[datetime]] = None,
+                 exdates: Optional[set] = None, recurrence_id: Optional[datetime] = None,
+                 cancelled: bool = False):
+        self.uid = uid
+        self.summary = summary
+        self.start = start
+        self.end = end
+        self.all_day = all_day
+        self.rule = rule
+        self.rdates = rdates or []
+        self.exdates = exdates or set()
+        self.recurrence_id = recurrence_id
+        self.cancelled = cancelled
+    
+    @property
+    def recurring(self) -> bool:
+        return self.rule is not None or bool(self.rdates)
+    
+    @property
+    def duration(self) -> timedelta:
+        return self.end - self.start
+    
+    def occurrence_id(self, start: datetime) -> str:
+        """某次发生的标识，被单独修改的实例（RECURRENCE-ID）与原实例标识相同"""
+        if self.recurrence_id is not None:
+            return f"{self.uid}@{instance_key(self.recurrence_id)}"
+        if self.recurring:
+            return f"{self.uid}@{instance_key(start)}"
+        return self.uid
+    
+    def may_occur_after(self, moment: datetime) -> bool:
+        """事件是否可能在 moment 之后仍在进行，用于加载时丢弃已经结束的事件"""
+        moment = in_zone(moment, self.start.tzinfo)
+        if self.end > moment:
+            return True
+        if self.rule is not None:
+            return self.rule.until is None or self.rule.until + self.duration > moment
+        return any(rdate + self.duration > moment for rdate in self.rdates)
+    
+    def occurrences(self, window_start: datetime, window_end: datetime,
+                    skip: Iterable[datetime] = ()) -> Iterator[datetime]:
+        """生成与 [window_start, window_end) 重叠的每次发生的开始时间
+        
+        时间范围和 skip 可以使用任意时区，生成的开始时间使用事件自己的时区。
+        """
+        zone = self.start.tzinfo
+        window_start, window_end = in_zone(window_start, zone), in_zone(window_end, zone)
+        duration = self.duration
+        if not self.recurring:
+            if self.start < window_end and self.end > window_start:
+                yield self.start
+            return
+        
+        excluded = self.exdates.union(in_zone(value, zone) for value in skip)
+        not_before = window_start - duration
+        starts = self.rule.iter_starts(self.start, not_before) if self.rule else iter([self.start])
+        extra = sorted(rdate for rdate in self.rdates if rdate >= not_before)
+        
+        for start in merge_sorted(starts, extra):
+            if start >= window_end:
+                return
+            if start + duration <= window_start or start in excluded:
+                continue
+            yield start
+
+
+def merge_sorted(first: Iterator[datetime], second: List[datetime]) -> Iterator[datetime]:
+    """合并两个已排序的时间序列并去重"""
+    position, previous = 0, None
+    for value in first:
+        while position < len(second) and second[position] < value:
+            if second[position] != previous:
+                previous = second[position]
+                yield previous
+            position += 1
+        if value != previous:
+            previous = value
+            yield value
+    for value in second[position:]:
+        if value != previous:
+            previous = value
+            yield value
+
+
+class IcsCalendar:
+    """解析后的日历
+    
+    events 保存普通事件和重复事件的主记录；overrides 保存被单独修改或取消的实例，
+    按 UID 和 RECURRENCE-ID 索引，展开主记录时跳过这些实例。
+    """
+    
+    def __init__(self):
+        self.events: List[IcsEvent] = []
+        self.overrides: Dict[str, Dict[datetime, IcsEvent]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.events)
+    
+    @classmethod
+    def parse(cls, stream: Iterable[str], not_before: Optional[datetime] = None) -> 'IcsCalendar':
+        """从逐行读取的文本流解析日历
+        
+        not_before 之前已经结束的事件在解析时直接丢弃，不占用内存。
+        格式错误的事件会被跳过并记录日志。
+        """
+        calendar = cls()
+        properties = None
+        depth = 0
+        for line in unfold_lines(stream):
+            prefix = line[:6].upper()
+            if prefix == 'BEGIN:':
+                if properties is not None:
+                    # VEVENT 中嵌套的组件（如 VALARM）忽略
+                    depth += 1
+                elif line.upper() == 'BEGIN:VEVENT':
+                    properties = {}
+                continue
+            if prefix[:4] == 'END:' and properties is not None:
+                if depth:
+                    depth -= 1
+                    continue
+                calendar._add(properties, not_before)
+                properties = None
+                continue
+            if properties is None or depth:
+                continue
+            
+            try:
+                name, params, value = parse_content_line(line)
+            except IcsError as e:
+                logger.warning(f"跳过无效的内容行: {e}")
+                continue
+            properties.setdefault(name, []).append((params, value))
+        return calendar
+    
+    def _add(self, properties: Dict[str, List[Tuple[Dict[str, str], str]]], not_before: Optional[datetime]):
+        """由属性构建事件并保存"""
+        try:
+            event = build_event(properties)
+        except (IcsError, KeyError) as e:
+            logger.warning(f"跳过无效的事件: {e}")
+            return
+        
+        if event.recurrence_id is not None:
+            self.overrides.setdefault(event.uid, {})[event.recurrence_id] = event
+            if event.cancelled:
+                return
+        if event.cancelled or (not_before is not None and not event.may_occur_after(not_before)):
+            return
+        self.events.append(event)
+    
+    def expand(self, window_start: datetime, window_end: datetime) -> Iterator[Tuple[IcsEvent, datetime, datetime]]:
+        """生成与 [window_start, window_end) 重叠的所有事件实例 (事件, 开始时间, 结束时间)
+        
+        开始和结束时间使用事件自己的时区，显示前用 to_local() 换算为本地时间。
+        """
+        for event in self.events:
+            skip = ()
+            if event.recurring and event.recurrence_id is None:
+                skip = self.overrides.get(event.uid, {}).keys()
+            duration = event.duration
+            for start in event.occurrences(window_start, window_end, skip):
+                yield event, start, start + duration
+
+
+def build_event(properties: Dict[str, List[Tuple[Dict[str, str], str]]]) -> IcsEvent:
+    """由一个 VEVENT 的属性构建事件"""
+    def first(name):
+        values = properties.get(name)
+        return values[0] if values else None
+    
+    def date_list(name):
+        result = []
+        for params, value in properties.get(name, []):
+            if params.get('VALUE') == 'PERIOD':
+                continue
+            for item in value.split(','):
+                result.append(parse_date_value(item, params)[0])
+        return result
+    
+    dtstart = first('DTSTART')
+    if dtstart is None:
+        raise IcsError("事件缺少DTSTART")
+    start, all_day = parse_date_value(dtstart[1], dtstart[0])
+    
+    # 其他时间都换算到 DTSTART 的时区，重复规则在这个时区中展开和比较
+    zone = start.tzinfo
+    
+    def zoned_list(name):
+        return [in_zone(value, zone) for value in date_list(name)]
+    
+    dtend, duration = first('DTEND'), first('DURATION')
+    if dtend is not None:
+        end = in_zone(parse_date_value(dtend[1], dtend[0])[0], zone)
+    elif duration is not None:
+        end = start + parse_duration(duration[1])
+    else:
+        # 没有结束时间时，全天事件持续一天，其他事件没有时长
+        end = start + timedelta(days=1) if all_day else start
+    if end < start:
+        end = start
+    
+    rrule = first('RRULE')
+    recurrence_id = first('RECURRENCE-ID')
+    summary = first('SUMMARY')
+    status = first('STATUS')
+    uid = first('UID')
+    
+    rule = RecurrenceRule.parse(rrule[1]) if rrule else None
+    if rule is not None and rule.until is not None:
+        rule.until = in_zone(rule.until, zone)
+    
+    return IcsEvent(
+        uid=uid[1] if uid else f"{start.isoformat()}-{summary[1] if summary else ''}",
+        summary=unescape_text(summary[1]) if summary else '无标题',
+        start=start,
+        end=end,
+        all_day=all_day,
+        rule=rule,
+        rdates=sorted(zoned_list('RDATE')),
+        exdates=set(zoned_list('EXDATE')),
+        recurrence_id=in_zone(parse_date_value(recurrence_id[1], recurrence_id[0])[0], zone) if recurrence_id else None,
+        cancelled=bool(status and status[1].upper() == 'CANCELLED')
+    )
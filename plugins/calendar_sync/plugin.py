@@ -13,21 +13,36 @@ from PyQt6.QtCore import QTimer, pyqtSignal, Qt
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QScrollArea, 
                             QFrame, QHBoxLayout)
 
-# 导入插件基类
-import sys
-import os
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
-
+# 导入插件基类，core 包由宿主应用提供
 from core.plugin_base import IPlugin, PluginStatus
 
+from .event_store import EventStore, EventDiff, diff_events, event_key
+from .fetcher import SourceFetcher, FetchResult, fetch_all
+from .sources import (CalendarSource, SampleSource, GoogleCalendarSource, OutlookSource,
+                      IcsSource, make_event)
+
+# 修改后需要重新全量同步的设置
+SOURCE_SETTINGS = ('google_calendar_enabled', 'google_api_key', 'google_calendar_id',
+                   'outlook_enabled', 'outlook_client_id', 'ics_url')
+
+
+# 状态指示器的文字和样式，其他状态不显示
+STATUS_LABELS = {
+    'ongoing': ("进行中", "font-size: 8px; color: #e74c3c; font-weight: bold;"),
+    'soon': ("即将开始", "font-size: 8px; color: #f39c12; font-weight: bold;")
+}
+
 
 class EventWidget(QFrame):
-    """事件显示组件"""
+    """事件显示组件，可以通过 set_event() 改为显示另一个事件"""
     
-    def __init__(self, event_data: Dict[str, Any]):
+    def __init__(self, event_data: Optional[Dict[str, Any]] = None):
         super().__init__()
-        self.event_data = event_data
+        self.event_data = None
+        self.status = None
         self.setup_ui()
+        if event_data is not None:
+            self.set_event(event_data)
     
     def setup_ui(self):
         """设置界面"""
@@ -47,40 +62,49 @@ class EventWidget(QFrame):
         layout.setContentsMargins(6, 4, 6, 4)
         
         # 事件标题
-        title_label = QLabel(self.event_data.get('title', '无标题'))
-        title_label.setStyleSheet("font-weight: bold; font-size: 11px; color: #333;")
-        layout.addWidget(title_label)
+        self.title_label = QLabel()
+        self.title_label.setStyleSheet("font-weight: bold; font-size: 11px; color: #333;")
+        layout.addWidget(self.title_label)
         
         # 时间信息
         time_layout = QHBoxLayout()
         
-        start_time = self.event_data.get('start_time', '')
-        end_time = self.event_data.get('end_time', '')
-        
-        if self.event_data.get('all_day', False):
-            time_text = "全天"
-        else:
-            time_text = f"{start_time} - {end_time}"
-        
-        time_label = QLabel(time_text)
-        time_label.setStyleSheet("font-size: 9px; color: #666;")
-        time_layout.addWidget(time_label)
+        self.time_label = QLabel()
+        self.time_label.setStyleSheet("font-size: 9px; color: #666;")
+        time_layout.addWidget(self.time_label)
         
         # 状态指示器
-        status = self.event_data.get('status', 'upcoming')
-        if status == 'ongoing':
-            status_label = QLabel("进行中")
-            status_label.setStyleSheet("font-size: 8px; color: #e74c3c; font-weight: bold;")
-        elif status == 'soon':
-            status_label = QLabel("即将开始")
-            status_label.setStyleSheet("font-size: 8px; color: #f39c12; font-weight: bold;")
-        else:
-            status_label = QLabel("")
-        
-        time_layout.addWidget(status_label)
+        self.status_label = QLabel()
+        time_layout.addWidget(self.status_label)
         time_layout.addStretch()
         
         layout.addLayout(time_layout)
+    
+    def set_event(self, event_data: Dict[str, Any]):
+        """显示给定的事件，只更新内容发生变化的标签"""
+        self.event_data = event_data
+        
+        self.set_label_text(self.title_label, event_data.get('title', '无标题'))
+        
+        if event_data.get('all_day', False):
+            time_text = "全天"
+        else:
+            time_text = f"{event_data.get('start_time', '')} - {event_data.get('end_time', '')}"
+        self.set_label_text(self.time_label, time_text)
+        
+        # 状态变化时才重新设置样式表，样式表会触发样式重新计算
+        status = event_data.get('status', 'upcoming')
+        if status != self.status:
+            text, style = STATUS_LABELS.get(status, ("", ""))
+            self.status_label.setText(text)
+            self.status_label.setStyleSheet(style)
+            self.status = status
+    
+    @staticmethod
+    def set_label_text(label: QLabel, text: str):
+        """文字不同时才设置，相同的文字也会让标签重新计算尺寸和重绘"""
+        if label.text() != text:
+            label.setText(text)
 
 
 class CalendarWidget(QWidget):
@@ -121,6 +145,17 @@ class CalendarWidget(QWidget):
         self.events_layout.setSpacing(2)
         self.events_layout.setContentsMargins(0, 0, 0, 0)
         
+        # 事件组件按事件标识保存，排在"无日程"提示和弹性空间之前；
+        # 不再显示的组件隐藏后放回 spare_widgets，之后显示新事件时复用，不再创建和删除组件
+        self.event_widgets: Dict[str, EventWidget] = {}
+        self.spare_widgets: List[EventWidget] = []
+        
+        self.no_events_label = QLabel("今日无日程安排")
+        self.no_events_label.setStyleSheet("font-size: 10px; color: #666; text-align: center;")
+        self.no_events_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.events_layout.addWidget(self.no_events_label)
+        self.events_layout.addStretch()
+        
         scroll_area.setWidget(self.events_widget)
         layout.addWidget(scroll_area)
         
@@ -131,28 +166,49 @@ class CalendarWidget(QWidget):
     
     def update_events(self, events: List[Dict[str, Any]], sync_status: str):
         """更新事件显示"""
-        # 清空现有事件
-        for i in reversed(range(self.events_layout.count())):
-            child = self.events_layout.itemAt(i).widget()
-            if child:
-                child.deleteLater()
-        
-        if not events:
-            no_events_label = QLabel("今日无日程安排")
-            no_events_label.setStyleSheet("font-size: 10px; color: #666; text-align: center;")
-            no_events_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.events_layout.addWidget(no_events_label)
-        else:
-            # 添加事件
-            for event in events:
-                event_widget = EventWidget(event)
-                self.events_layout.addWidget(event_widget)
+        current = [widget.event_data for widget in self.event_widgets.values()]
+        self.apply_changes(diff_events(current, events), sync_status)
+    
+    def apply_changes(self, diff: EventDiff, sync_status: str):
+        """按变化更新事件显示，未变化的事件组件保持不动，修改的事件就地更新标签"""
+        for event in diff.removed:
+            widget = self.event_widgets.pop(event_key(event), None)
+            if widget:
+                widget.hide()
+                self.spare_widgets.append(widget)
         
-        # 添加弹性空间
-        self.events_layout.addStretch()
+        for event in diff.changed:
+            widget = self.event_widgets.get(event_key(event))
+            if widget:
+                widget.set_event(event)
+            else:
+                self.event_widgets[event_key(event)] = self.take_widget(event)
+        
+        for event in diff.added:
+            self.event_widgets[event_key(event)] = self.take_widget(event)
+        
+        # 按开始时间排列在最前面，隐藏的备用组件留在后面；只移动位置不对的组件
+        ordered = sorted(self.event_widgets.items(),
+                         key=lambda item: (item[1].event_data['start_datetime'], item[0]))
+        for index, (_, widget) in enumerate(ordered):
+            if self.events_layout.indexOf(widget) != index:
+                self.events_layout.removeWidget(widget)
+                self.events_layout.insertWidget(index, widget)
+        
+        self.no_events_label.setVisible(not self.event_widgets)
         
         # 更新状态
         self.status_label.setText(sync_status)
+    
+    def take_widget(self, event: Dict[str, Any]) -> EventWidget:
+        """取一个备用组件显示事件，没有备用组件时创建，由 apply_changes() 放入布局"""
+        if not self.spare_widgets:
+            return EventWidget(event)
+        
+        widget = self.spare_widgets.pop()
+        widget.set_event(event)
+        widget.show()
+        return widget
 
 
 class CalendarSyncPlugin(IPlugin):
@@ -160,6 +216,7 @@ class CalendarSyncPlugin(IPlugin):
     
     # 定义信号
     events_updated = pyqtSignal(list, str)  # events, sync_status
+    events_changed = pyqtSignal(object, str)  # EventDiff, sync_status
     
     def __init__(self):
         super().__init__()
@@ -173,9 +230,27 @@ class CalendarSyncPlugin(IPlugin):
         self.sync_timer = None
         self.plugin_manager = None
         
-        # 数据
+        # 数据，events 为当前显示的事件，所有已同步的事件保存在 event_store 中
         self.events = []
+        self.event_store = EventStore()
         self.last_sync_time = None
+        self.sync_status = None
+        
+        # 数据源和各数据源的同步令牌，令牌为 None 时下次全量同步
+        self.sources = None
+        # 已启用但无法创建的数据源的说明，显示在同步状态中
+        self.source_warnings: List[str] = []
+        self.sync_tokens: Dict[str, Optional[str]] = {}
+        
+        # 后台获取数据源，同步进行中再次请求同步时记下，完成后再同步一次
+        self.fetcher = None
+        self.sync_requested = False
+        
+        # 获取Outlook访问令牌的函数，由宿主应用的OAuth流程注入
+        self.outlook_token_provider = None
+        
+        # 设置校验器，由插件管理器根据manifest.json中的settings编译后注入
+        self.settings_validator = None
         
         # 设置
         self.settings = {
@@ -183,8 +258,10 @@ class CalendarSyncPlugin(IPlugin):
             'sync_interval': 15,
             'google_calendar_enabled': False,
             'google_api_key': '',
+            'google_calendar_id': '',
             'outlook_enabled': False,
             'outlook_client_id': '',
+            'ics_url': '',
             'show_upcoming_events': 3,
             'event_reminder': True,
             'reminder_minutes': 15,
@@ -198,15 +275,13 @@ class CalendarSyncPlugin(IPlugin):
             self.plugin_manager = plugin_manager
             self.logger.info("日历同步插件初始化开始")
             
-            # 创建日历组件
-            self.calendar_widget = CalendarWidget(self)
-            
-            # 创建同步定时器
+            # 创建同步定时器，日历组件在第一次获取时才创建
             self.sync_timer = QTimer()
             self.sync_timer.timeout.connect(self.sync_calendars)
             
-            # 连接信号
-            self.events_updated.connect(self.calendar_widget.update_events)
+            # 数据源在后台线程中获取，结果回到GUI线程合并
+            self.fetcher = SourceFetcher()
+            self.fetcher.finished.connect(self.merge_sync_result)
             
             self.status = PluginStatus.INITIALIZED
             self.logger.info("日历同步插件初始化完成")
@@ -271,6 +346,12 @@ class CalendarSyncPlugin(IPlugin):
                 self.sync_timer.deleteLater()
                 self.sync_timer = None
             
+            # 不等待仍在运行的数据源，它们的结果会被丢弃
+            if self.fetcher:
+                self.fetcher.shutdown()
+                self.fetcher.deleteLater()
+                self.fetcher = None
+            
             self.status = PluginStatus.UNLOADED
             self.logger.info("日历同步插件资源清理完成")
             return True
@@ -279,32 +360,118 @@ class CalendarSyncPlugin(IPlugin):
             self.logger.error(f"插件清理失败: {e}")
             return False
     
-    def sync_calendars(self):
-        """同步日历"""
+    def sync_calendars(self, background: bool = True) -> bool:
+        """同步日历
+        
+        background 为 True 时所有数据源在后台线程中并发获取，方法立即返回，
+        结果在GUI线程中合并并通过 events_updated 发出；同步进行中再次调用时，
+        本次完成后再同步一次。background 为 False 时在当前线程中完成同步。
+        返回是否开始了同步。
+        """
         try:
+            if self.fetcher and self.fetcher.busy:
+                self.sync_requested = True
+                return False
+            
             self.logger.info("开始同步日历")
+            self.sync_requested = False
+            sources = self.get_sources()
+            tokens = dict(self.sync_tokens)
+            
+            if background and self.fetcher:
+                return self.fetcher.start(sources, tokens)
+            
+            self.merge_sync_result(fetch_all(sources, tokens))
+            return True
             
-            # 模拟同步过程（实际应用中应该调用真实的API）
-            events = self.generate_sample_events()
+        except Exception as e:
+            self.sync_failed(e)
+            return False
+    
+    def merge_sync_result(self, result: FetchResult):
+        """合并各数据源的变化，刷新显示的事件并检查提醒"""
+        try:
+            # 各数据源只带来上次同步之后的变化，失败的数据源保留原令牌，下次继续增量同步
+            for source_id, error in result.errors.items():
+                self.logger.error(f"同步数据源 {source_id} 失败: {error}")
             
-            # 过滤和排序事件
-            filtered_events = self.filter_events(events)
+            for source, changes in result.changes:
+                diff = self.event_store.apply_changes(source.source_id, changes.events,
+                                                      changes.removed, changes.full)
+                self.sync_tokens[source.source_id] = changes.token
+                self.logger.debug(f"数据源 {source.source_id} 同步完成: {diff}")
             
-            self.events = filtered_events
+            # 查询即将到来的事件，组件只接收显示内容的变化
+            events = self.filter_events()
+            display_diff = diff_events(self.events, events)
+            
+            self.events = events
             self.last_sync_time = datetime.now()
             
             # 更新显示
-            sync_status = f"最后同步: {self.last_sync_time.strftime('%H:%M')}"
-            self.events_updated.emit(self.events, sync_status)
+            self.sync_status = f"最后同步: {self.last_sync_time.strftime('%H:%M')}"
+            notes = list(self.source_warnings)
+            if result.errors:
+                notes.insert(0, f"{len(result.errors)} 个日历同步失败")
+            if notes:
+                self.sync_status += f"（{'，'.join(notes)}）"
+            self.events_updated.emit(self.events, self.sync_status)
+            self.events_changed.emit(display_diff, self.sync_status)
             
             # 检查提醒
             self.check_reminders()
             
-            self.logger.info(f"日历同步完成，获取到 {len(self.events)} 个事件")
+            self.logger.info(f"日历同步完成，显示 {len(self.events)} 个事件，变化: {display_diff}，"
+                             f"耗时 {result.elapsed:.2f} 秒")
             
         except Exception as e:
-            self.logger.error(f"同步日历失败: {e}")
-            self.events_updated.emit([], f"同步失败: {str(e)}")
+            self.sync_failed(e)
+        
+        # 同步期间收到的同步请求
+        if self.sync_requested:
+            self.sync_calendars()
+    
+    def sync_failed(self, error: Exception):
+        """同步失败时保留已同步的事件，只更新状态"""
+        self.logger.error(f"同步日历失败: {error}")
+        self.sync_status = f"同步失败: {str(error)}"
+        self.events_updated.emit(self.events, self.sync_status)
+        self.events_changed.emit(EventDiff(), self.sync_status)
+    
+    def get_sources(self) -> List[CalendarSource]:
+        """根据设置创建数据源，没有启用任何日历服务时使用示例数据
+        
+        启用了 Outlook 但宿主应用还没有提供访问令牌时不使用示例数据，
+        而是在同步状态中提示未登录。
+        """
+        if self.sources is None:
+            sources = []
+            warnings = []
+            if self.settings['google_calendar_enabled'] and self.settings['google_api_key'] \
+                    and self.settings['google_calendar_id']:
+                sources.append(GoogleCalendarSource(self.settings['google_api_key'],
+                                                    self.settings['google_calendar_id']))
+            if self.settings['outlook_enabled']:
+                if self.outlook_token_provider:
+                    sources.append(OutlookSource(self.outlook_token_provider))
+                else:
+                    warnings.append("Outlook 未登录")
+            if self.settings['ics_url']:
+                sources.append(IcsSource(self.settings['ics_url']))
+            if not sources and not warnings:
+                sources.append(SampleSource(self.generate_sample_events))
+            self.sources = sources
+            self.source_warnings = warnings
+        return self.sources
+    
+    def reset_sources(self):
+        """丢弃数据源、同步令牌和已同步的事件，下次同步时全量同步"""
+        # 正在进行的同步属于旧的数据源，结果不再合并
+        if self.fetcher:
+            self.fetcher.cancel()
+        self.sources = None
+        self.sync_tokens.clear()
+        self.event_store.clear()
     
     def generate_sample_events(self) -> List[Dict[str, Any]]:
         """生成示例事件（模拟API调用）"""
@@ -314,24 +481,28 @@ class CalendarSyncPlugin(IPlugin):
         # 示例事件
         sample_events = [
             {
+                'id': 'sample-team-meeting',
                 'title': '团队会议',
                 'start': now + timedelta(hours=1),
                 'end': now + timedelta(hours=2),
                 'all_day': False
             },
             {
+                'id': 'sample-project-review',
                 'title': '项目评审',
                 'start': now + timedelta(hours=3),
                 'end': now + timedelta(hours=4),
                 'all_day': False
             },
             {
+                'id': 'sample-client-visit',
                 'title': '客户拜访',
                 'start': now + timedelta(hours=5),
                 'end': now + timedelta(hours=6),
                 'all_day': False
             },
             {
+                'id': 'sample-birthday-party',
                 'title': '生日聚会',
                 'start': now.replace(hour=0, minute=0, second=0, microsecond=0),
                 'end': now.replace(hour=23, minute=59, second=59, microsecond=0),
@@ -340,47 +511,41 @@ class CalendarSyncPlugin(IPlugin):
         ]
         
         for event in sample_events:
-            # 格式化时间
-            time_format = '%H:%M' if self.settings['time_format'] == '24h' else '%I:%M %p'
-            
-            event_data = {
-                'title': event['title'],
-                'start_time': event['start'].strftime(time_format),
-                'end_time': event['end'].strftime(time_format),
-                'all_day': event['all_day'],
-                'start_datetime': event['start'],
-                'end_datetime': event['end']
-            }
-            
-            # 判断事件状态
-            if event['start'] <= now <= event['end']:
-                event_data['status'] = 'ongoing'
-            elif event['start'] <= now + timedelta(minutes=30):
-                event_data['status'] = 'soon'
-            else:
-                event_data['status'] = 'upcoming'
-            
-            events.append(event_data)
+            events.append(make_event(event['id'], event['title'], event['start'],
+                                     event['end'], event['all_day']))
         
         return events
     
-    def filter_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """过滤和排序事件"""
-        filtered = []
-        
-        for event in events:
-            # 过滤全天事件
-            if not self.settings['show_all_day_events'] and event['all_day']:
-                continue
-            
-            filtered.append(event)
+    def filter_events(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """从事件存储中取出即将到来的事件（含正在进行的），按开始时间排序"""
+        now = now or datetime.now()
         
-        # 按开始时间排序
-        filtered.sort(key=lambda x: x['start_datetime'])
+        events = self.event_store.upcoming(
+            now,
+            self.settings['show_upcoming_events'],
+            include_all_day=self.settings['show_all_day_events']
+        )
         
-        # 限制显示数量
-        max_events = self.settings['show_upcoming_events']
-        return filtered[:max_events]
+        # 时间文字和状态在显示前生成，不修改存储中的事件
+        return [
+            dict(event,
+                 start_time=self.format_time(event['start_datetime']),
+                 end_time=self.format_time(event['end_datetime']),
+                 status=self.get_event_status(event, now))
+            for event in events
+        ]
+    
+    def format_time(self, value: datetime) -> str:
+        """按时间格式设置格式化时间"""
+        return value.strftime('%H:%M' if self.settings['time_format'] == '24h' else '%I:%M %p')
+    
+    def get_event_status(self, event: Dict[str, Any], now: datetime) -> str:
+        """判断事件状态"""
+        if event['start_datetime'] <= now <= event['end_datetime']:
+            return 'ongoing'
+        if event['start_datetime'] <= now + timedelta(minutes=30):
+            return 'soon'
+        return 'upcoming'
     
     def check_reminders(self):
         """检查事件提醒"""
@@ -391,13 +556,10 @@ class CalendarSyncPlugin(IPlugin):
             now = datetime.now()
             reminder_minutes = self.settings['reminder_minutes']
             
-            for event in self.events:
-                start_time = event['start_datetime']
-                time_diff = (start_time - now).total_seconds() / 60
-                
-                # 如果事件在提醒时间范围内
-                if 0 <= time_diff <= reminder_minutes:
-                    self.send_reminder(event)
+            # 只查询在提醒时间范围内开始的事件，与显示一样排除被隐藏的全天事件
+            for event in self.event_store.starting_within(now, reminder_minutes,
+                                                          self.settings['show_all_day_events']):
+                self.send_reminder(event)
             
         except Exception as e:
             self.logger.error(f"检查提醒失败: {e}")
@@ -406,7 +568,7 @@ class CalendarSyncPlugin(IPlugin):
         """发送事件提醒"""
         try:
             title = "日程提醒"
-            message = f"'{event['title']}' 即将在 {event['start_time']} 开始"
+            message = f"'{event['title']}' 即将在 {self.format_time(event['start_datetime'])} 开始"
             
             # 这里应该调用通知管理器发送通知
             self.logger.info(f"提醒: {title} - {message}")
@@ -415,7 +577,15 @@ class CalendarSyncPlugin(IPlugin):
             self.logger.error(f"发送提醒失败: {e}")
     
     def get_widget(self) -> Optional[QWidget]:
-        """获取插件组件"""
+        """获取插件组件，第一次调用时才创建"""
+        if self.calendar_widget is None:
+            self.calendar_widget = CalendarWidget(self)
+            self.events_changed.connect(self.calendar_widget.apply_changes)
+            
+            # 显示创建组件之前已同步的结果
+            if self.sync_status is not None:
+                self.calendar_widget.update_events(self.events, self.sync_status)
+        
         return self.calendar_widget
     
     def get_settings(self) -> Dict[str, Any]:
@@ -425,11 +595,20 @@ class CalendarSyncPlugin(IPlugin):
     def update_settings(self, new_settings: Dict[str, Any]) -> bool:
         """更新插件设置"""
         try:
+            # 先校验，校验失败时不修改任何设置
+            if self.settings_validator:
+                self.settings_validator(new_settings)
+            
             old_sync_enabled = self.settings['sync_enabled']
             old_sync_interval = self.settings['sync_interval']
+            old_source_settings = [self.settings[key] for key in SOURCE_SETTINGS]
             
             self.settings.update(new_settings)
             
+            # 日历服务设置变化时重新创建数据源并全量同步
+            if [self.settings[key] for key in SOURCE_SETTINGS] != old_source_settings:
+                self.reset_sources()
+            
             # 更新同步定时器
             if self.settings['sync_enabled'] != old_sync_enabled or \
                self.settings['sync_interval'] != old_sync_interval:
@@ -457,7 +636,7 @@ class CalendarSyncPlugin(IPlugin):
         return {
             'id': 'calendar_sync',
             'name': '日历同步插件',
-            'version': '1.3.1',
+            'version': '1.4.0',
             'description': '与主流日历服务同步',
             'author': 'Sync Solutions',
             'status': self.status.value,
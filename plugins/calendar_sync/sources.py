@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日历数据源
+每个数据源保存自己的同步令牌，fetch_changes() 只返回上次同步之后新增、修改和删除的事件；
+令牌失效或第一次同步时返回全部事件（full=True）
+"""
+
+import io
+import os
+import json
+import logging
+from datetime import datetime, date, timedelta, timezone
+from typing import Dict, Any, Optional, List, Callable
+from urllib.error import HTTPError
+from urllib.parse import urlencode, quote
+from urllib.request import Request, urlopen
+
+from .ics import IcsCalendar, to_local
+
+
+class SyncError(Exception):
+    """同步数据源失败"""
+
+
+class SourceChanges:
+    """一次同步得到的变化
+    
+    Attributes:
+        events: 新增或修改的事件；full 为 True 时是该数据源的全部事件
+        removed: 被删除的事件ID
+        token: 下次同步使用的令牌，为 None 时下次重新全量同步
+        full: 是否为全量同步
+    """
+    
+    __slots__ = ('events', 'removed', 'token', 'full')
+    
+    def __init__(self, events: List[Dict[str, Any]], removed: Optional[List[str]] = None,
+                 token: Optional[str] = None, full: bool = False):
+        self.events = events
+        self.removed = removed or []
+        self.token = token
+        self.full = full
+
+
+def make_event(event_id: str, title: str, start: datetime, end: datetime, all_day: bool = False) -> Dict[str, Any]:
+    """创建存储使用的事件字典，显示用的时间文字和状态由插件在显示前生成"""
+    return {
+        'id': event_id,
+        'title': title,
+        'all_day': all_day,
+        'start_datetime': start,
+        'end_datetime': end
+    }
+
+
+def parse_datetime(value: str) -> datetime:
+    """解析 RFC 3339 时间，转换为不带时区的本地时间"""
+    value = value.replace('Z', '+00:00')
+    # Microsoft Graph 返回7位小数，fromisoformat 最多接受6位
+    if '.' in value:
+        head, tail = value.split('.', 1)
+        digits = len(tail) - len(tail.lstrip('0123456789'))
+        value = f"{head}.{tail[:min(digits, 6)]}{tail[digits:]}"
+    
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+class CalendarSource:
+    """日历数据源基类"""
+    
+    # 数据源标识，同时作为事件ID的前缀
+    source_id = 'source'
+    
+    def fetch_changes(self, sync_token: Optional[str] = None) -> SourceChanges:
+        """获取 sync_token 之后的变化，sync_token 为 None 时全量同步"""
+        raise NotImplementedError
+
+
+class SampleSource(CalendarSource):
+    """示例数据源，没有配置任何日历服务时使用，每次都返回全部事件"""
+    
+    source_id = 'sample'
+    
+    def __init__(self, generate_events: Callable[[], List[Dict[str, Any]]]):
+        self.generate_events = generate_events
+    
+    def fetch_changes(self, sync_token: Optional[str] = None) -> SourceChanges:
+        return SourceChanges(self.generate_events(), full=True)
+
+
+class HttpSource(CalendarSource):
+    """通过HTTP JSON接口同步的数据源"""
+    
+    def __init__(self, base_url: str, timeout: float = 30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.logger = logging.getLogger(f'{__name__}.{type(self).__name__}')
+    
+    def request_headers(self) -> Dict[str, str]:
+        """请求头，子类可添加认证信息"""
+        return {'Accept': 'application/json'}
+    
+    def get_json(self, url: str) -> Dict[str, Any]:
+        """请求并解析JSON，HTTP错误原样抛出供子类判断令牌是否失效"""
+        request = Request(url, headers=self.request_headers())
+        with urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+
+class GoogleCalendarSource(HttpSource):
+    """Google 日历数据源，使用 events.list 的 syncToken 增量同步
+    
+    只使用API密钥认证，因此只能读取公开的日历，需要给出日历ID；
+    'primary' 指向用户自己的日历，必须经过OAuth认证，API密钥请求会被拒绝。
+    """
+    
+    source_id = 'google'
+    API_URL = "https://www.googleapis.com/calendar/v3"
+    
+    def __init__(self, api_key: str, calendar_id: str,
+                 base_url: str = API_URL, timeout: float = 30, page_size: int = 250):
+        if not calendar_id or calendar_id == 'primary':
+            raise ValueError("Google日历需要公开日历的日历ID，API密钥不能读取 primary 日历")
+        super().__init__(base_url, timeout)
+        self.api_key = api_key
+        self.calendar_id = calendar_id
+        self.page_size = page_size
+    
+    def fetch_changes(self, sync_token: Optional[str] = None) -> SourceChanges:
+        try:
+            return self._fetch(sync_token)
+        except HTTPError as e:
+            # 410 表示同步令牌已失效，需要全量同步
+            if e.code == 410 and sync_token is not None:
+                self.logger.info("Google日历同步令牌已失效，重新全量同步")
+                return self._fetch(None)
+            raise SyncError(f"Google日历同步失败: HTTP {e.code}") from e
+    
+    def _fetch(self, sync_token: Optional[str]) -> SourceChanges:
+        url = f"{self.base_url}/calendars/{quote(self.calendar_id, safe='')}/events"
+        params = {'key': self.api_key, 'maxResults': self.page_size, 'singleEvents': 'true'}
+        if sync_token:
+            params['syncToken'] = sync_token
+        
+        events, removed = [], []
+        page_token = None
+        while True:
+            page_params = dict(params, pageToken=page_token) if page_token else params
+            data = self.get_json(f"{url}?{urlencode(page_params)}")
+            for item in data.get('items', []):
+                event_id = f"{self.source_id}:{item['id']}"
+                if item.get('status') == 'cancelled':
+                    removed.append(event_id)
+                else:
+                    events.append(self.convert_event(event_id, item))
+            
+            page_token = data.get('nextPageToken')
+            if not page_token:
+                return SourceChanges(events, removed, data.get('nextSyncToken'), full=not sync_token)
+    
+    def convert_event(self, event_id: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        """把 Google 日历的事件转换为存储使用的格式"""
+        start, end = item.get('start', {}), item.get('end', {})
+        if 'date' in start:
+            # 全天事件的结束日期不包含在内
+            start_time = datetime.combine(date.fromisoformat(start['date']), datetime.min.time())
+            end_time = datetime.combine(date.fromisoformat(end.get('date', start['date'])), datetime.min.time())
+            return make_event(event_id, item.get('summary', '无标题'), start_time, end_time, all_day=True)
+        
+        start_time = parse_datetime(start['dateTime'])
+        end_time = parse_datetime(end['dateTime']) if 'dateTime' in end else start_time
+        return make_event(event_id, item.get('summary', '无标题'), start_time, end_time)
+
+
+class OutlookSource(HttpSource):
+    """Outlook 日历数据源，使用 Microsoft Graph 的 calendarView delta 增量同步
+    
+    同步令牌为上次返回的 @odata.deltaLink。访问令牌由 token_provider 提供，
+    插件本身不包含OAuth流程。
+    """
+    
+    source_id = 'outlook'
+    API_URL = "https://graph.microsoft.com/v1.0"
+    
+    def __init__(self, token_provider: Callable[[], str], base_url: str = API_URL,
+                 timeout: float = 30, past_days: int = 30, future_days: int = 365):
+        super().__init__(base_url, timeout)
+        self.token_provider = token_provider
+        self.past_days = past_days
+        self.future_days = future_days
+    
+    def request_headers(self) -> Dict[str, str]:
+        headers = super().request_headers()
+        headers['Authorization'] = f"Bearer {self.token_provider()}"
+        headers['Prefer'] = 'outlook.timezone="UTC"'
+        return headers
+    
+    def fetch_changes(self, sync_token: Optional[str] = None) -> SourceChanges:
+        try:
+            return self._fetch(sync_token)
+        except HTTPError as e:
+            if e.code == 410 and sync_token is not None:
+                self.logger.info("Outlook同步令牌已失效，重新全量同步")
+                return self._fetch(None)
+            raise SyncError(f"Outlook日历同步失败: HTTP {e.code}") from e
+    
+    def _fetch(self, sync_token: Optional[str]) -> SourceChanges:
+        if sync_token:
+            url = sync_token
+        else:
+            now = datetime.now(timezone.utc)
+            params = {
+                'startDateTime': (now - timedelta(days=self.past_days)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'endDateTime': (now + timedelta(days=self.future_days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+            }
+            url = f"{self.base_url}/me/calendarView/delta?{urlencode(params)}"
+        
+        events, removed = [], []
+        while True:
+            data = self.get_json(url)
+            for item in data.get('value', []):
+                event_id = f"{self.source_id}:{item['id']}"
+                if '@removed' in item or item.get('isCancelled'):
+                    removed.append(event_id)
+                else:
+                    events.append(self.convert_event(event_id, item))
+            
+            url = data.get('@odata.nextLink')
+            if not url:
+                return SourceChanges(events, removed, data.get('@odata.deltaLink'), full=not sync_token)
+    
+    def convert_event(self, event_id: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        """把 Graph 的事件转换为存储使用的格式，时间为UTC"""
+        start = parse_datetime(item['start']['dateTime'] + 'Z')
+        end = parse_datetime(item['end']['dateTime'] + 'Z')
+        all_day = item.get('isAllDay', False)
+        if all_day:
+            # 全天事件按日历日期显示，不做时区转换
+            start = datetime.fromisoformat(item['start']['dateTime'][:10])
+            end = datetime.fromisoformat(item['end']['dateTime'][:10])
+        return make_event(event_id, item.get('subject', '无标题'), start, end, all_day)
+
+
+class IcsSource(CalendarSource):
+    """iCalendar 订阅地址或本地 .ics 文件
+    
+    ICS没有增量接口：订阅地址使用 ETag/Last-Modified 条件请求，本地文件比较修改时间和大小，
+    内容未变化时不重新下载和解析。每次同步把重复事件展开到 [现在 - past_days, 现在 + future_days]，
+    由事件存储比较出实际的变化。
+    """
+    
+    source_id = 'ics'
+    
+    def __init__(self, location: str, source_id: str = 'ics', timeout: float = 30,
+                 past_days: int = 1, future_days: int = 30):
+        self.location = location
+        self.source_id = source_id
+        self.timeout = timeout
+        self.past_days = past_days
+        self.future_days = future_days
+        self.calendar: Optional[IcsCalendar] = None
+        self.logger = logging.getLogger(f'{__name__}.IcsSource')
+    
+    @property
+    def is_remote(self) -> bool:
+        return '://' in self.location and not self.location.startswith('file://')
+    
+    def fetch_changes(self, sync_token: Optional[str] = None) -> SourceChanges:
+        now = datetime.now()
+        window_start = now - timedelta(days=self.past_days)
+        
+        if sync_token is None:
+            self.calendar = None
+        try:
+            if self.is_remote:
+                token = self._load_remote(sync_token, window_start)
+            else:
+                token = self._load_file(sync_token, window_start)
+        except HTTPError as e:
+            raise SyncError(f"iCalendar订阅同步失败: HTTP {e.code}") from e
+        except OSError as e:
+            raise SyncError(f"读取iCalendar失败: {e}") from e
+        
+        # 展开在各事件自己的时区中进行，得到的时间再换算为本地时间
+        events = [
+            make_event(f"{self.source_id}:{event.occurrence_id(start)}", event.summary,
+                       to_local(start), to_local(end), event.all_day)
+            for event, start, end in self.calendar.expand(window_start, now + timedelta(days=self.future_days))
+        ]
+        return SourceChanges(events, token=token, full=True)
+    
+    def _load_remote(self, sync_token: Optional[str], not_before: datetime) -> str:
+        """下载并流式解析订阅内容，返回由 ETag/Last-Modified 组成的令牌"""
+        url = self.location
+        if url.startswith('webcal://'):
+            url = 'https://' + url[len('webcal://'):]
+        
+        headers = {}
+        if self.calendar is not None and sync_token:
+            validators = json.loads(sync_token)
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        
+        try:
+            response = urlopen(Request(url, headers=headers), timeout=self.timeout)
+        except HTTPError as e:
+            if e.code == 304:
+                return sync_token
+            raise
+        
+        with response:
+            stream = io.TextIOWrapper(response, encoding='utf-8', errors='replace')
+            self.calendar = IcsCalendar.parse(stream, not_before)
+            token = json.dumps({
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            })
+        self.logger.info(f"已解析iCalendar订阅，保留 {len(self.calendar)} 个事件")
+        return token
+    
+    def _load_file(self, sync_token: Optional[str], not_before: datetime) -> str:
+        """流式解析本地文件，返回由修改时间和大小组成的令牌"""
+        path = self.location[len('file://'):] if self.location.startswith('file://') else self.location
+        stat = os.stat(path)
+        token = f"{stat.st_mtime_ns}:{stat.st_size}"
+        if self.calendar is not None and token == sync_token:
+            return token
+        
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            self.calendar = IcsCalendar.parse(f, not_before)
+        self.logger.info(f"已解析iCalendar文件，保留 {len(self.calendar)} 个事件")
+        return token
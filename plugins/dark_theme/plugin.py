@@ -12,11 +12,7 @@ from typing import Dict, Any, Optional
 from PyQt6.QtCore import QTimer, pyqtSignal
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel
 
-# 导入插件基类
-import sys
-import os
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
-
+# 导入插件基类，core 包由宿主应用提供
 from core.plugin_base import IPlugin, PluginStatus
 
 
@@ -37,6 +33,9 @@ class DarkThemePlugin(IPlugin):
         self.auto_switch_timer = None
         self.plugin_manager = None
         
+        # 设置校验器，由插件管理器根据manifest.json中的settings编译后注入
+        self.settings_validator = None
+        
         # 设置
         self.settings = {
             'theme_variant': 'midnight',
@@ -382,6 +381,10 @@ class DarkThemePlugin(IPlugin):
     def update_settings(self, new_settings: Dict[str, Any]) -> bool:
         """更新插件设置"""
         try:
+            # 先校验，校验失败时不修改任何设置
+            if self.settings_validator:
+                self.settings_validator(new_settings)
+            
             old_auto_switch = self.settings['auto_switch']
             self.settings.update(new_settings)
             
@@ -418,7 +421,7 @@ class DarkThemePlugin(IPlugin):
         return {
             'id': 'dark_theme',
             'name': '深色主题包',
-            'version': '1.5.2',
+            'version': '1.5.3',
             'description': '精美的深色主题集合',
             'author': 'Design Studio',
             'status': self.status.value,
@@ -13,11 +13,7 @@ from PyQt6.QtCore import QTimer, pyqtSignal, Qt
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                             QPushButton, QProgressBar)
 
-# 导入插件基类
-import sys
-import os
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
-
+# 导入插件基类，core 包由宿主应用提供
 from core.plugin_base import IPlugin, PluginStatus
 
 
@@ -201,6 +197,9 @@ class PomodoroTimerPlugin(IPlugin):
         self.total_time = 0
         self.cycle_count = 0
         
+        # 设置校验器，由插件管理器根据manifest.json中的settings编译后注入
+        self.settings_validator = None
+        
         # 设置
         self.settings = {
             'work_duration': 25,
@@ -220,16 +219,10 @@ class PomodoroTimerPlugin(IPlugin):
             self.plugin_manager = plugin_manager
             self.logger.info("番茄钟插件初始化开始")
             
-            # 创建计时器组件
-            self.timer_widget = PomodoroWidget(self)
-            
-            # 创建定时器
+            # 创建定时器，计时器组件在第一次获取时才创建
             self.timer = QTimer()
             self.timer.timeout.connect(self.update_timer)
             
-            # 连接信号
-            self.timer_updated.connect(self.timer_widget.update_display)
-            
             # 初始化计时器
             self.reset_timer()
             
@@ -404,7 +397,14 @@ class PomodoroTimerPlugin(IPlugin):
             self.logger.error(f"发送通知失败: {e}")
     
     def get_widget(self) -> Optional[QWidget]:
-        """获取插件组件"""
+        """获取插件组件，第一次调用时才创建"""
+        if self.timer_widget is None:
+            self.timer_widget = PomodoroWidget(self)
+            self.timer_updated.connect(self.timer_widget.update_display)
+            
+            # 显示当前的计时状态
+            self.update_display()
+        
         return self.timer_widget
     
     def get_settings(self) -> Dict[str, Any]:
@@ -414,6 +414,10 @@ class PomodoroTimerPlugin(IPlugin):
     def update_settings(self, new_settings: Dict[str, Any]) -> bool:
         """更新插件设置"""
         try:
+            # 先校验，校验失败时不修改任何设置
+            if self.settings_validator:
+                self.settings_validator(new_settings)
+            
             self.settings.update(new_settings)
             
             # 如果当前不在运行，重置计时器以应用新设置
@@ -432,7 +436,7 @@ class PomodoroTimerPlugin(IPlugin):
         return {
             'id': 'pomodoro_timer',
             'name': '番茄钟插件',
-            'version': '2.1.0',
+            'version': '2.1.1',
             'description': '专业的番茄工作法计时器',
             'author': 'Productivity Team',
             'status': self.status.value,
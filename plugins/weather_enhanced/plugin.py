@@ -13,11 +13,7 @@ from typing import Dict, Any, Optional
 from PyQt6.QtCore import QTimer, pyqtSignal
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout
 
-# 导入插件基类
-import sys
-import os
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
-
+# 导入插件基类，core 包由宿主应用提供
 from core.plugin_base import IPlugin, PluginStatus, PluginMetadata, PluginType
 
 
@@ -124,6 +120,9 @@ class WeatherEnhancedPlugin(IPlugin):
         self.update_timer = None
         self.plugin_manager = None
         
+        # 设置校验器，由插件管理器根据manifest.json中的settings编译后注入
+        self.settings_validator = None
+        
         # 设置
         self.settings = {
             'api_key': '',
@@ -143,16 +142,10 @@ class WeatherEnhancedPlugin(IPlugin):
             self.plugin_manager = plugin_manager
             self.logger.info("增强天气插件初始化开始")
             
-            # 创建天气组件
-            self.weather_widget = WeatherWidget(self)
-            
-            # 创建更新定时器
+            # 创建更新定时器，天气组件在第一次获取时才创建
             self.update_timer = QTimer()
             self.update_timer.timeout.connect(self.update_weather)
             
-            # 连接信号
-            self.weather_updated.connect(self.weather_widget.update_weather_display)
-            
             self.status = PluginStatus.INITIALIZED
             self.logger.info("增强天气插件初始化完成")
             return True
@@ -247,7 +240,15 @@ class WeatherEnhancedPlugin(IPlugin):
             self.logger.error(f"更新天气信息失败: {e}")
     
     def get_widget(self) -> Optional[QWidget]:
-        """获取插件组件"""
+        """获取插件组件，第一次调用时才创建"""
+        if self.weather_widget is None:
+            self.weather_widget = WeatherWidget(self)
+            self.weather_updated.connect(self.weather_widget.update_weather_display)
+            
+            # 显示创建组件之前已获取的天气
+            if self.current_weather:
+                self.weather_widget.update_weather_display(self.current_weather)
+        
         return self.weather_widget
     
     def get_settings(self) -> Dict[str, Any]:
@@ -257,6 +258,10 @@ class WeatherEnhancedPlugin(IPlugin):
     def update_settings(self, new_settings: Dict[str, Any]) -> bool:
         """更新插件设置"""
         try:
+            # 先校验，校验失败时不修改任何设置
+            if self.settings_validator:
+                self.settings_validator(new_settings)
+            
             self.settings.update(new_settings)
             
             # 更新定时器间隔
@@ -280,7 +285,7 @@ class WeatherEnhancedPlugin(IPlugin):
         return {
             'id': 'weather_enhanced',
             'name': '增强天气插件',
-            'version': '1.0.0',
+            'version': '1.0.1',
             'description': '提供详细的天气信息显示',
             'author': 'TimeNest Team',
             'status': self.status.value,
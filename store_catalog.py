@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+插件商城目录客户端工具
+在本地缓存的目录上应用增量更新，避免每次刷新都下载完整的plugins.json；
+并把目录加载为带索引的内存结构，支持按标签、分类和关键词查询
+"""
+
+import re
+import json
+import heapq
+from bisect import bisect_left
+from typing import Dict, Any, Optional, Callable, Tuple, List, Iterable, Set
+
+
+# 相对于商城仓库根目录的路径
+FULL_CATALOG_PATH = "plugins.json"
+DELTAS_DIR = "catalog/deltas"
+DELTA_INDEX_PATH = f"{DELTAS_DIR}/index.json"
+
+
+class CatalogDeltaError(ValueError):
+    """增量更新与本地缓存的目录版本不匹配"""
+
+
+def delta_key(last_updated: str) -> str:
+    """把目录版本（last_updated）转换为可以用作文件名的形式"""
+    return last_updated.replace(':', '-')
+
+
+def delta_path(last_updated: str) -> str:
+    """从指定目录版本更新到最新版本的增量文件路径"""
+    return f"{DELTAS_DIR}/{delta_key(last_updated)}.json"
+
+
+def apply_catalog_delta(catalog: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """在本地缓存的目录上应用增量更新，返回新的目录，不修改传入的目录
+    
+    增量中的插件条目替换同ID的旧条目，新插件追加到末尾，removed 中的插件被删除，
+    其余插件保持原有顺序。顶层字段（featured、categories 等）以增量中的为准。
+    """
+    if catalog.get('last_updated') != delta.get('from'):
+        raise CatalogDeltaError(
+            f"增量更新基于版本 {delta.get('from')}，本地目录版本为 {catalog.get('last_updated')}"
+        )
+    
+    changed = {plugin['id']: plugin for plugin in delta.get('plugins', [])}
+    removed = set(delta.get('removed', []))
+    
+    plugins = []
+    for plugin in catalog.get('plugins', []):
+        plugin_id = plugin.get('id')
+        if plugin_id in removed:
+            continue
+        plugins.append(changed.pop(plugin_id, plugin))
+    plugins.extend(changed.values())
+    
+    updated = dict(delta.get('catalog', {}))
+    updated['last_updated'] = delta['to']
+    updated['plugins'] = plugins
+    return updated
+
+
+def refresh_catalog(cached_catalog: Optional[Dict[str, Any]],
+                    fetch_json: Callable[[str], Optional[Dict[str, Any]]]
+                    ) -> Tuple[Dict[str, Any], str]:
+    """刷新本地缓存的目录
+    
+    fetch_json 接收相对于商城仓库根目录的路径，返回解析后的JSON，文件不存在时返回 None。
+    优先使用增量更新，本地版本过旧或增量不可用时才下载完整目录。
+    
+    返回 (最新目录, 获取方式)，获取方式为 'unchanged'、'delta' 或 'full'。
+    """
+    if cached_catalog is not None:
+        cached_version = cached_catalog.get('last_updated')
+        delta_index = fetch_json(DELTA_INDEX_PATH)
+        
+        if delta_index:
+            if delta_index.get('latest') == cached_version:
+                return cached_catalog, 'unchanged'
+            
+            if cached_version in delta_index.get('versions', []):
+                delta = fetch_json(delta_path(cached_version))
+                if delta:
+                    try:
+                        return apply_catalog_delta(cached_catalog, delta), 'delta'
+                    except CatalogDeltaError:
+                        pass
+    
+    return fetch_json(FULL_CATALOG_PATH), 'full'
+
+
+# 中日韩统一表意文字及扩展A区、兼容表意文字
+_CJK_RANGES = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_TOKEN_PATTERN = re.compile(rf'[{_CJK_RANGES}]+|[0-9a-z]+')
+_CJK_PATTERN = re.compile(rf'[{_CJK_RANGES}]')
+
+# 关键词在不同字段中命中时的权重
+NAME_WEIGHT = 3
+TAG_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+SORT_KEYS = ('relevance', 'downloads', 'rating', 'updated')
+
+
+def tokenize(text: str) -> List[str]:
+    """把文本切分为索引词
+    
+    英文和数字按连续的字母数字切分并转为小写；中文没有空格分词，
+    连续的汉字切分为单字和相邻两字（bigram），查询任意长度的中文片段都能命中。
+    """
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if _CJK_PATTERN.match(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def query_tokens(text: str) -> List[str]:
+    """把查询文本切分为需要同时命中的索引词
+    
+    中文片段使用相邻两字（单字片段使用单字），比逐字匹配更精确。
+    """
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if _CJK_PATTERN.match(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return list(dict.fromkeys(tokens))
+
+
+class CatalogIndex:
+    """插件目录的内存索引
+    
+    加载时一次性建立标签、分类的倒排索引，名称、标签和描述的分词索引，
+    以及按下载量、评分和更新时间的排序位置，之后的查询只做集合运算和排序。
+    """
+    
+    def __init__(self, catalog: Dict[str, Any]):
+        self.catalog = catalog
+        self.plugins: List[Dict[str, Any]] = list(catalog.get('plugins', []))
+        self.positions: Dict[str, int] = {}
+        self.tag_index: Dict[str, Set[int]] = {}
+        self.category_index: Dict[str, Set[int]] = {}
+        # 分词 -> {插件位置: 权重}
+        self.token_index: Dict[str, Dict[int, int]] = {}
+        
+        for position, plugin in enumerate(self.plugins):
+            self.positions[plugin['id']] = position
+            
+            for tag in plugin.get('tags', []):
+                self.tag_index.setdefault(tag.lower(), set()).add(position)
+            category = plugin.get('category')
+            if category:
+                self.category_index.setdefault(category, set()).add(position)
+            
+            self._index_text(position, plugin.get('name', ''), NAME_WEIGHT)
+            self._index_text(position, ' '.join(plugin.get('tags', [])), TAG_WEIGHT)
+            self._index_text(position, plugin.get('description', ''), DESCRIPTION_WEIGHT)
+        
+        # 有序词表，用于英文前缀匹配
+        self.vocabulary = sorted(self.token_index)
+        
+        # 每种排序方式下插件的名次，名次越小越靠前
+        self.ranks: Dict[str, List[int]] = {}
+        for sort_key, value in (
+            ('downloads', lambda p: p.get('downloads', 0)),
+            ('rating', lambda p: p.get('rating', 0)),
+            ('updated', lambda p: p.get('updated_at', '')),
+        ):
+            order = sorted(range(len(self.plugins)), key=lambda i: value(self.plugins[i]), reverse=True)
+            rank = [0] * len(order)
+            for position_rank, position in enumerate(order):
+                rank[position] = position_rank
+            self.ranks[sort_key] = rank
+    
+    @classmethod
+    def from_file(cls, path) -> 'CatalogIndex':
+        """从plugins.json文件建立索引"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+    
+    def _index_text(self, position: int, text: str, weight: int):
+        """把一段文本的分词加入索引，同一插件取各字段中的最高权重"""
+        for token in tokenize(text):
+            postings = self.token_index.setdefault(token, {})
+            if postings.get(position, 0) < weight:
+                postings[position] = weight
+    
+    def _match_token(self, token: str, prefix: bool) -> Dict[int, int]:
+        """返回命中某个查询词的插件及权重；英文词允许前缀匹配"""
+        postings = self.token_index.get(token, {})
+        if not prefix or _CJK_PATTERN.match(token):
+            return postings
+        
+        matched = dict(postings)
+        start = bisect_left(self.vocabulary, token)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(token):
+                break
+            for position, weight in self.token_index[word].items():
+                if matched.get(position, 0) < weight:
+                    matched[position] = weight
+        return matched
+    
+    def get(self, plugin_id: str) -> Optional[Dict[str, Any]]:
+        """按ID获取插件条目"""
+        position = self.positions.get(plugin_id)
+        return self.plugins[position] if position is not None else None
+    
+    def featured(self) -> List[Dict[str, Any]]:
+        """推荐插件列表"""
+        return [self.plugins[self.positions[plugin_id]]
+                for plugin_id in self.catalog.get('featured', [])
+                if plugin_id in self.positions]
+    
+    def category_counts(self) -> Dict[str, int]:
+        """每个分类下的插件数量"""
+        return {category: len(positions) for category, positions in self.category_index.items()}
+    
+    def search(self, text: str = '', tags: Iterable[str] = (), category: Optional[str] = None,
+               sort: str = 'relevance', limit: Optional[int] = None, offset: int = 0,
+               prefix: bool = True) -> List[Dict[str, Any]]:
+        """查询插件
+        
+        Args:
+            text: 关键词，匹配名称、标签和描述，所有关键词都必须命中
+            tags: 必须同时包含的标签
+            category: 分类ID
+            sort: 排序方式，'relevance'（相关度，无关键词时按下载量）、'downloads'、'rating' 或 'updated'
+            limit, offset: 分页
+            prefix: 英文关键词是否允许前缀匹配（输入中的 "wea" 命中 "weather"）
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"未知的排序方式: {sort}")
+        
+        candidates: Optional[Set[int]] = None
+        
+        # 先取最小的集合，再逐个求交集
+        filters = [self.tag_index.get(tag.lower(), set()) for tag in tags]
+        if category is not None:
+            filters.append(self.category_index.get(category, set()))
+        for positions in sorted(filters, key=len):
+            candidates = set(positions) if candidates is None else candidates & positions
+            if not candidates:
+                return []
+        
+        matches = []
+        for token in query_tokens(text):
+            matched = self._match_token(token, prefix)
+            if candidates is None:
+                candidates = set(matched)
+            else:
+                candidates &= matched.keys()
+            if not candidates:
+                return []
+            matches.append(matched)
+        
+        if candidates is None:
+            candidates = range(len(self.plugins))
+        
+        if sort == 'relevance' and matches:
+            downloads_rank = self.ranks['downloads']
+            
+            def sort_key(position):
+                return (-sum(matched[position] for matched in matches), downloads_rank[position])
+        else:
+            sort_key = self.ranks['downloads' if sort == 'relevance' else sort].__getitem__
+        
+        # 分页查询只需要前 offset + limit 个结果，用堆代替完整排序
+        if limit is not None:
+            ordered = heapq.nsmallest(offset + limit, candidates, key=sort_key)
+            return [self.plugins[position] for position in ordered[offset:]]
+        
+        ordered = sorted(candidates, key=sort_key)
+        return [self.plugins[position] for position in ordered[offset:]]
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+功能测试的公共配置
+网络相关的测试使用本地的 http.server 替身，不访问外部服务；
+需要Qt的测试在 offscreen 平台下运行，core.plugin_base 使用 plugin_host_stub 中的最小替身实现，缺少 PyQt6 时跳过；
+插件中的模块通过 plugin_module 夹具由 plugin_loader 导入，与宿主中的加载方式一致
+"""
+
+import os
+import sys
+import types
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+# 必须在导入 PyQt6 之前设置
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+STORE_DIR = Path(__file__).resolve().parent.parent
+PLUGINS_DIR = STORE_DIR / "plugins"
+
+sys.path.insert(0, str(STORE_DIR))
+
+from plugin_loader import PluginLoader
+from plugin_host_stub import install_plugin_base_stub, process_deferred_deletes
+
+
+@pytest.fixture(scope='session')
+def plugin_loader():
+    """读取仓库中插件清单的加载器"""
+    loader = PluginLoader(PLUGINS_DIR)
+    loader.discover()
+    return loader
+
+
+@pytest.fixture(scope='session')
+def plugin_module(plugin_loader):
+    """按宿主加载插件时的包名导入插件中的模块，如 plugin_module('calendar_sync', 'event_store')
+    
+    只导入给定的模块，不依赖 PyQt6 的模块可以在没有Qt的环境中测试。
+    """
+    def load(plugin_id: str, name: str) -> types.ModuleType:
+        return plugin_loader.import_plugin_module(plugin_loader.plugins[plugin_id], name)
+    return load
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    """整个测试会话共用的 QApplication，缺少 PyQt6 时跳过测试"""
+    pytest.importorskip('PyQt6')
+    from PyQt6.QtWidgets import QApplication
+    install_plugin_base_stub()
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def calendar_plugin(qapp, plugin_loader):
+    """已初始化的日历同步插件，测试结束后清理"""
+    plugin = plugin_loader.import_plugin(plugin_loader.plugins['calendar_sync']).create_plugin()
+    assert plugin.initialize(None)
+    yield plugin
+    plugin.cleanup()
+    process_deferred_deletes()
+
+
+class MockRequest:
+    """替身服务器收到的请求"""
+    
+    def __init__(self, handler: BaseHTTPRequestHandler):
+        parts = urlsplit(handler.path)
+        self.path = parts.path
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.headers = handler.headers
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    """本地HTTP替身
+    
+    routes 把路径映射到处理函数 handler(MockRequest) -> (状态码, 响应头, 内容)，
+    收到的请求按顺序记录在 requests 中。
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), MockRequestHandler)
+        self.routes: Dict[str, Callable[[MockRequest], Tuple[int, Dict[str, str], bytes]]] = {}
+        self.requests: List[MockRequest] = []
+    
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+    
+    def requests_to(self, path: str) -> List[MockRequest]:
+        return [request for request in self.requests if request.path == path]
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """把请求交给 MockHTTPServer.routes 中的处理函数"""
+    
+    def do_GET(self):
+        request = MockRequest(self)
+        self.server.requests.append(request)
+        route = self.server.routes.get(request.path)
+        if route is None:
+            status, headers, body = 404, {}, b''
+        else:
+            status, headers, body = route(request)
+        
+        # 处理函数给出的 Content-Length 优先，大于实际内容时模拟传输中途断开连接
+        headers = dict({'Content-Length': str(len(body))}, **headers)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """在临时端口上运行的HTTP替身"""
+    server = MockHTTPServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+发布包构建测试：增量构建、发布包的内容和大小、plugins.json 和目录文件的生成
+插件和发布目录都在临时目录中生成，不修改仓库中的发布包
+"""
+
+import hashlib
+import json
+import os
+import zipfile
+
+import pytest
+
+import build_releases
+from build_releases import (create_plugin_release, build_releases as build_all, scan_plugin_files,
+                            is_plugin_unchanged, load_build_manifest, save_build_manifest, update_plugins_json,
+                            write_catalog_shards, check_consistency)
+
+
+def make_plugin(root, plugin_id='demo', version='1.0.0', contents=None, **manifest_fields):
+    """在 root 下创建插件目录，contents 为 包内路径 -> 内容（str 或 bytes）"""
+    plugin_dir = root / plugin_id
+    plugin_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {'id': plugin_id, 'name': plugin_id, 'version': version, **manifest_fields}
+    (plugin_dir / 'manifest.json').write_text(json.dumps(manifest), encoding='utf-8')
+    
+    if contents is None:
+        contents = {'plugin.py': "class DemoPlugin:\n    pass\n", 'README.md': "# 示例插件\n"}
+    for arcname, content in contents.items():
+        path = plugin_dir / arcname
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content, encoding='utf-8')
+    return plugin_dir
+
+
+def build(plugin_dir, releases_dir, **options):
+    """构建发布包，构建报告不输出"""
+    return create_plugin_release(plugin_dir, releases_dir, log=lambda message: None, **options)
+
+
+@pytest.fixture
+def releases_dir(tmp_path):
+    path = tmp_path / 'releases'
+    path.mkdir()
+    return path
+
+
+class TestIncrementalBuild:
+    
+    def test_unchanged_files_are_not_rehashed(self, tmp_path, monkeypatch):
+        plugin_dir = make_plugin(tmp_path)
+        files = scan_plugin_files(plugin_dir)
+        
+        hashed = []
+        calculate_sha256 = build_releases.calculate_sha256
+        monkeypatch.setattr(build_releases, 'calculate_sha256',
+                            lambda path: hashed.append(path.name) or calculate_sha256(path))
+        (plugin_dir / 'README.md').write_text("# 修改后的说明\n", encoding='utf-8')
+        
+        rescanned = scan_plugin_files(plugin_dir, files)
+        
+        assert hashed == ['README.md']
+        assert rescanned['plugin.py'] == files['plugin.py']
+        assert rescanned['README.md']['sha256'] != files['README.md']['sha256']
+    
+    def test_plugin_is_unchanged_until_a_file_or_release_changes(self, tmp_path, releases_dir):
+        plugin_dir = make_plugin(tmp_path)
+        entry = {'files': scan_plugin_files(plugin_dir), 'release': build(plugin_dir, releases_dir)}
+        
+        assert is_plugin_unchanged(entry, scan_plugin_files(plugin_dir, entry['files']), releases_dir)
+        
+        (plugin_dir / 'icon.png').write_bytes(b'\x89PNG')
+        assert not is_plugin_unchanged(entry, scan_plugin_files(plugin_dir, entry['files']), releases_dir)
+        
+        (plugin_dir / 'icon.png').unlink()
+        (releases_dir / entry['release']['filename']).unlink()
+        assert not is_plugin_unchanged(entry, scan_plugin_files(plugin_dir, entry['files']), releases_dir)
+    
+    def test_build_manifest_is_dropped_when_options_change(self, releases_dir):
+        options = {'deterministic': True, 'size_budget': None}
+        save_build_manifest({'demo': {'files': {}}}, releases_dir, options)
+        
+        assert load_build_manifest(releases_dir, options) == {'demo': {'files': {}}}
+        assert load_build_manifest(releases_dir, dict(options, size_budget=1024)) == {}
+        
+        (releases_dir / build_releases.BUILD_MANIFEST_NAME).write_text('{', encoding='utf-8')
+        assert load_build_manifest(releases_dir, options) == {}
+
+
+class TestParallelBuild:
+    
+    def test_results_and_reports_follow_submission_order(self, tmp_path, releases_dir, capsys):
+        plugin_dirs = [make_plugin(tmp_path / 'plugins', plugin_id) for plugin_id in ('zeta', 'alpha', 'mid')]
+        plugin_dirs.append(tmp_path / 'plugins' / 'empty')
+        plugin_dirs[-1].mkdir()
+        
+        serial = build_all(plugin_dirs, releases_dir, jobs=1)
+        serial_output = capsys.readouterr().out
+        parallel = build_all(plugin_dirs, releases_dir, jobs=3)
+        
+        assert [info and info['plugin_id'] for info in parallel] == ['zeta', 'alpha', 'mid', None]
+        assert parallel == serial
+        assert capsys.readouterr().out == serial_output
+
+
+def test_checksum_and_size_describe_the_written_file(tmp_path, releases_dir):
+    info = build(make_plugin(tmp_path), releases_dir)
+    release_path = releases_dir / info['filename']
+    
+    assert info['filename'] == 'demo_v1.0.0.zip'
+    assert info['size'] == release_path.stat().st_size
+    assert info['checksum'] == 'sha256:' + hashlib.sha256(release_path.read_bytes()).hexdigest()
+    assert not list(releases_dir.glob('*.tmp'))
+
+
+class TestReproducibleBuild:
+    
+    FILES = {'plugin.py': "print('hello')\n", 'README.md': "# 示例\n", 'assets/icon.png': b'\x89PNG\r\n'}
+    
+    def test_rebuild_is_byte_identical(self, tmp_path, releases_dir):
+        plugin_dir = make_plugin(tmp_path, contents=self.FILES)
+        first = (releases_dir / build(plugin_dir, releases_dir)['filename']).read_bytes()
+        
+        # 修改时间、权限和创建顺序都不影响发布包内容
+        for path in plugin_dir.rglob('*'):
+            os.utime(path, (1700000000, 1700000000))
+        (plugin_dir / 'README.md').chmod(0o600)
+        copy_dir = make_plugin(tmp_path / 'copy', contents=dict(reversed(list(self.FILES.items()))))
+        
+        assert (releases_dir / build(plugin_dir, releases_dir)['filename']).read_bytes() == first
+        other_releases = tmp_path / 'other_releases'
+        other_releases.mkdir()
+        assert (other_releases / build(copy_dir, other_releases)['filename']).read_bytes() == first
+    
+    def test_entries_use_fixed_timestamp_and_mode(self, tmp_path, releases_dir):
+        plugin_dir = make_plugin(tmp_path, contents=self.FILES)
+        (plugin_dir / 'plugin.py').chmod(0o775)
+        
+        with zipfile.ZipFile(releases_dir / build(plugin_dir, releases_dir)['filename']) as zipf:
+            infos = zipf.infolist()
+        
+        assert [info.filename for info in infos] == ['README.md', 'assets/icon.png', 'manifest.json', 'plugin.py']
+        assert {info.date_time for info in infos} == {build_releases.ZIP_EPOCH}
+        assert {info.filename: info.external_attr >> 16 & 0o777 for info in infos} == {
+            'README.md': 0o644, 'assets/icon.png': 0o644, 'manifest.json': 0o644, 'plugin.py': 0o755}
+    
+    def test_source_date_epoch(self, tmp_path, releases_dir, monkeypatch):
+        monkeypatch.setenv('SOURCE_DATE_EPOCH', '1736899200')  # 2025-01-15 00:00:00 UTC
+        
+        with zipfile.ZipFile(releases_dir / build(make_plugin(tmp_path), releases_dir)['filename']) as zipf:
+            assert {info.date_time for info in zipf.infolist()} == {(2025, 1, 15, 0, 0, 0)}
+
+
+def test_compression_follows_file_type(tmp_path, releases_dir):
+    text = "颜色: #1e1e1e;\n" * 200
+    plugin_dir = make_plugin(tmp_path, contents={
+        'plugin.py': text, 'theme.qss': text, 'data.bin': text, 'icon.png': text.encode('utf-8')})
+    info = build(plugin_dir, releases_dir)
+    
+    with zipfile.ZipFile(releases_dir / info['filename']) as zipf:
+        infos = {entry.filename: entry for entry in zipf.infolist()}
+    
+    assert infos['icon.png'].compress_type == zipfile.ZIP_STORED
+    assert infos['icon.png'].compress_size == infos['icon.png'].file_size
+    for name in ('plugin.py', 'theme.qss', 'data.bin'):
+        assert infos[name].compress_type == zipfile.ZIP_DEFLATED
+        assert infos[name].compress_size < infos[name].file_size
+    
+    compression = info['compression']
+    assert compression['stored_files'] == 1
+    assert compression['original_size'] == sum(entry.file_size for entry in infos.values())
+    assert compression['saved_bytes'] == compression['original_size'] - compression['compressed_size']
+
+
+class TestFileSelection:
+    
+    FILES = {
+        'plugin.py': "", 'README.md': "", 'dev_notes.md': "",
+        'screenshots/main.png': b'', 'screenshots/main.psd': b'',
+        '__pycache__/plugin.cpython-311.pyc': b'', 'helpers/util.pyc': b'', 'plugin.py~': "", '.DS_Store': b'',
+    }
+    
+    def packaged(self, tmp_path, releases_dir, **manifest_fields):
+        plugin_dir = make_plugin(tmp_path, contents=self.FILES, **manifest_fields)
+        with zipfile.ZipFile(releases_dir / build(plugin_dir, releases_dir)['filename']) as zipf:
+            return zipf.namelist()
+    
+    def test_default_exclusions(self, tmp_path, releases_dir):
+        assert self.packaged(tmp_path, releases_dir) == [
+            'README.md', 'dev_notes.md', 'manifest.json', 'plugin.py', 'screenshots/main.png', 'screenshots/main.psd']
+    
+    def test_files_and_exclude(self, tmp_path, releases_dir):
+        assert self.packaged(tmp_path, releases_dir, files=['plugin.py', 'README.md', 'screenshots/'],
+                             exclude=['screenshots/*.psd']) == [
+            'README.md', 'manifest.json', 'plugin.py', 'screenshots/main.png']
+    
+    def test_exclude_matches_any_path_component(self, tmp_path, releases_dir):
+        assert self.packaged(tmp_path, releases_dir, exclude=['screenshots', '*.md']) == ['manifest.json', 'plugin.py']
+
+
+class TestSizeBudget:
+    
+    def test_oversized_release_fails_and_keeps_previous_release(self, tmp_path, releases_dir):
+        plugin_dir = make_plugin(tmp_path)
+        previous = (releases_dir / build(plugin_dir, releases_dir)['filename']).read_bytes()
+        (plugin_dir / 'data.bin').write_bytes(os.urandom(4096))
+        
+        assert build(plugin_dir, releases_dir, size_budget=2048) is None
+        assert (releases_dir / 'demo_v1.0.0.zip').read_bytes() == previous
+        assert sorted(path.name for path in releases_dir.iterdir()) == ['demo_v1.0.0.zip']
+    
+    def test_manifest_budget_overrides_default(self, tmp_path, releases_dir):
+        plugin_dir = make_plugin(tmp_path, contents={'data.bin': os.urandom(4096)}, max_release_size=8192)
+        
+        assert build(plugin_dir, releases_dir, size_budget=1024) is not None
+        make_plugin(tmp_path, max_release_size=1024, contents={})
+        messages = []
+        assert create_plugin_release(plugin_dir, releases_dir, log=messages.append) is None
+        assert messages[-1].startswith("❌ 创建 demo 发布包失败: 发布包大小")
+
+
+def test_plugins_json_is_rewritten_only_when_release_info_changes(tmp_path, releases_dir):
+    info = build(make_plugin(tmp_path), releases_dir)
+    plugins_json = tmp_path / 'plugins.json'
+    plugins_json.write_text(json.dumps({'plugins': [{'id': 'demo', 'name': "示例"}, {'id': 'other'}]}),
+                            encoding='utf-8')
+    
+    assert update_plugins_json([info], plugins_json)
+    entry = json.loads(plugins_json.read_text(encoding='utf-8'))['plugins'][0]
+    assert entry == {
+        'id': 'demo',
+        'name': "示例",
+        'download_url': f"{build_releases.RELEASE_BASE_URL}/v1.0.0/demo_v1.0.0.zip",
+        'size': info['size'],
+        'checksum': info['checksum'],
+        'version': '1.0.0'
+    }
+    
+    written = plugins_json.read_bytes()
+    os.utime(plugins_json, (1700000000, 1700000000))
+    assert not update_plugins_json([info], plugins_json)
+    assert plugins_json.read_bytes() == written
+    assert plugins_json.stat().st_mtime == 1700000000
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == '.tmp'] == []
+
+
+def test_catalog_shards(tmp_path):
+    catalog_dir = tmp_path / 'catalog'
+    plugins_data = {
+        'version': '1.0.0',
+        'last_updated': '2025-01-15T00:00:00Z',
+        'featured': ['b', 'missing'],
+        'categories': [{'id': 'utility', 'name': "实用工具"}, {'id': 'theme', 'name': "主题"}],
+        'plugins': [
+            {'id': 'a', 'name': "A", 'version': '1.0', 'category': 'utility', 'checksum': 'sha256:a', 'size': 1,
+             'changelog': "很长的更新日志"},
+            {'id': 'b', 'name': "B", 'version': '2.0', 'category': 'utility', 'checksum': 'sha256:b', 'size': 2},
+        ]
+    }
+    
+    def read(path):
+        return json.loads((catalog_dir / path).read_text(encoding='utf-8'))
+    
+    assert write_catalog_shards(plugins_data, catalog_dir) == 5
+    index = read('index.json')
+    summary_b = {'id': 'b', 'name': "B", 'version': '2.0', 'category': 'utility', 'checksum': 'sha256:b', 'size': 2}
+    assert index['last_updated'] == '2025-01-15T00:00:00Z'
+    assert index['featured'] == [summary_b]
+    assert index['plugins'][1] == summary_b
+    assert [(category['id'], category['count']) for category in index['categories']] == [('utility', 2), ('theme', 0)]
+    assert read('categories/utility.json')['plugins'] == plugins_data['plugins']
+    assert read('categories/theme.json')['plugins'] == []
+    assert read('plugins/a.json') == plugins_data['plugins'][0]
+    
+    # 内容未变化的分片不重写，已删除插件的分片被清理
+    assert write_catalog_shards(plugins_data, catalog_dir) == 0
+    del plugins_data['plugins'][0]
+    assert write_catalog_shards(plugins_data, catalog_dir) == 3
+    assert sorted(path.name for path in (catalog_dir / 'plugins').iterdir()) == ['b.json']
+
+
+class TestReleaseDelta:
+    
+    @staticmethod
+    def members(zip_path):
+        with zipfile.ZipFile(zip_path) as zipf:
+            return {name: zipf.read(name) for name in zipf.namelist()}
+    
+    @staticmethod
+    def apply_delta(installed, delta_path):
+        """按 releases/README.md 中描述的方式在已安装的文件上应用增量包"""
+        files = dict(installed)
+        with zipfile.ZipFile(delta_path) as zipf:
+            delta = json.loads(zipf.read(build_releases.DELTA_MANIFEST_NAME))
+            for entry in delta['changed'] + delta['added']:
+                content = zipf.read(entry['path'])
+                assert hashlib.sha256(content).hexdigest() == entry['sha256']
+                files[entry['path']] = content
+        for name in delta['removed']:
+            del files[name]
+        return delta, files
+    
+    def test_delta_round_trip(self, tmp_path, releases_dir):
+        assets = os.urandom(32 * 1024)
+        plugin_dir = make_plugin(tmp_path, contents={
+            'plugin.py': "VERSION = 1\n", 'old.txt': "旧文件\n", 'assets/data.bin': assets})
+        old = build(plugin_dir, releases_dir)
+        assert 'delta' not in old
+        
+        make_plugin(tmp_path, version='1.1.0', contents={'plugin.py': "VERSION = 2\n", 'new.txt': "新文件\n"})
+        (plugin_dir / 'old.txt').unlink()
+        new = build(plugin_dir, releases_dir)
+        
+        info = new['delta']
+        assert info['filename'] == 'demo_v1.0.0_to_v1.1.0.delta.zip'
+        assert (info['from_version'], info['changed'], info['added'], info['removed']) == ('1.0.0', 2, 1, 1)
+        assert info['size'] < new['size'] / 4
+        
+        delta_path = releases_dir / info['filename']
+        assert info['checksum'] == 'sha256:' + hashlib.sha256(delta_path.read_bytes()).hexdigest()
+        delta, files = self.apply_delta(self.members(releases_dir / old['filename']), delta_path)
+        assert (delta['base_checksum'], delta['target_checksum']) == (old['checksum'], new['checksum'])
+        assert files == self.members(releases_dir / new['filename'])
+    
+    def test_no_delta_when_not_smaller_than_release(self, tmp_path, releases_dir):
+        plugin_dir = make_plugin(tmp_path, contents={'plugin.py': "VERSION = 1\n"})
+        build(plugin_dir, releases_dir)
+        make_plugin(tmp_path, version='1.1.0', contents={'plugin.py': "VERSION = 2\n"})
+        
+        assert 'delta' not in build(plugin_dir, releases_dir)
+        assert not list(releases_dir.glob('*.delta.zip*'))
+
+
+class TestConsistencyCheck:
+    
+    PLUGIN_PY = """
+class DemoPlugin:
+    def get_info(self):
+        return {
+            'name': 'demo',
+            'version': '1.0.0',
+            'description': "界面上的简短说明",
+            'status': self.status,
+        }
+"""
+    
+    @pytest.fixture
+    def store(self, tmp_path, releases_dir):
+        plugin_dir = make_plugin(tmp_path / 'plugins', description="完整描述", author="TimeNest",
+                                 contents={'plugin.py': self.PLUGIN_PY})
+        info = build(plugin_dir, releases_dir)
+        plugins_json = tmp_path / 'plugins.json'
+        entry = {'id': 'demo', 'name': 'demo', 'description': "完整描述", 'author': "TimeNest"}
+        build_releases.apply_release_info(entry, info)
+        plugins_json.write_text(json.dumps({'plugins': [entry]}), encoding='utf-8')
+        return tmp_path / 'plugins', releases_dir, plugins_json
+    
+    @staticmethod
+    def edit_catalog(plugins_json, **fields):
+        data = json.loads(plugins_json.read_text(encoding='utf-8'))
+        data['plugins'][0].update(fields)
+        plugins_json.write_text(json.dumps(data), encoding='utf-8')
+    
+    def test_consistent_store(self, store):
+        assert check_consistency(*store) == []
+        # 构建时没有记录哈希，检查后缓存起来供下次使用
+        assert 'demo_v1.0.0.zip' in build_releases.load_release_hashes(store[1])
+    
+    def test_reports_catalog_and_get_info_mismatches(self, store):
+        plugins_dir, releases_dir, plugins_json = store
+        self.edit_catalog(plugins_json, author="someone")
+        (plugins_dir / 'demo' / 'plugin.py').write_text(self.PLUGIN_PY.replace("'1.0.0'", "'0.9.0'"),
+                                                        encoding='utf-8')
+        
+        assert check_consistency(*store) == [
+            ('demo', "get_info() 中的 version 为 '0.9.0'，manifest.json 中为 '1.0.0'"),
+            ('demo', "plugins.json 中的 author 为 'someone'，manifest.json 中为 'TimeNest'"),
+        ]
+    
+    def test_reports_release_problems(self, store):
+        plugins_dir, releases_dir, plugins_json = store
+        self.edit_catalog(plugins_json, checksum='sha256:0')
+        assert check_consistency(*store) == [('demo', "plugins.json 中的 checksum 与 demo_v1.0.0.zip 不一致")]
+        
+        (releases_dir / 'demo_v1.0.0.zip').unlink()
+        assert check_consistency(*store) == [('demo', "发布包不存在: releases/demo_v1.0.0.zip")]
+    
+    def test_reports_missing_entries(self, store):
+        plugins_dir, releases_dir, plugins_json = store
+        make_plugin(plugins_dir, 'extra')
+        
+        assert check_consistency(*store) == [('extra', "插件目录存在，但plugins.json中没有对应条目")]
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日历事件存储测试：增量合并和按时间的查询边界
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+NOW = datetime(2026, 3, 2, 10, 0)
+
+
+def event(key, start, minutes=60, source=None, all_day=False, title=None):
+    """开始于 NOW + start 分钟的事件"""
+    data = {
+        'id': key,
+        'title': title or key,
+        'start_datetime': NOW + timedelta(minutes=start),
+        'end_datetime': NOW + timedelta(minutes=start + minutes),
+        'all_day': all_day
+    }
+    if source:
+        data['source'] = source
+    return data
+
+
+def keys(events):
+    return [item['id'] for item in events]
+
+
+@pytest.fixture(scope='module')
+def event_store(plugin_module):
+    return plugin_module('calendar_sync', 'event_store')
+
+
+def test_iterates_in_start_order(event_store):
+    store = event_store.EventStore([event('c', 30), event('a', -30), event('b', 0)])
+    
+    assert keys(store) == ['a', 'b', 'c']
+    assert len(store) == 3 and 'b' in store and store.get('missing') is None
+
+
+def test_event_key_without_id(event_store):
+    data = event('x', 0)
+    del data['id']
+    
+    assert event_store.event_key(data) == f"x@{NOW.isoformat()}"
+
+
+def test_update_moves_rescheduled_events(event_store):
+    store = event_store.EventStore([event('a', 0), event('b', 60), event('c', 120)])
+    
+    moved = store.update([event('a', 180), event('b', 60, title='renamed')])
+    
+    assert moved == 1
+    assert keys(store) == ['b', 'c', 'a']
+    assert store.get('b')['title'] == 'renamed'
+
+
+def test_large_update_rebuilds_index(event_store):
+    store = event_store.EventStore(event(str(index), index) for index in range(100))
+    
+    store.update(event(str(index), -index) for index in range(50))
+    
+    starts = [item['start_datetime'] for item in store]
+    assert starts == sorted(starts)
+    assert len(store) == 100
+
+
+def test_remove_returns_removed_events(event_store):
+    store = event_store.EventStore([event('a', 0), event('b', 60)])
+    
+    removed = store.remove(['a', 'missing'])
+    
+    assert keys(removed) == ['a']
+    assert keys(store) == ['b']
+    assert store.overlapping(NOW) == []
+
+
+class TestApplyChanges:
+    
+    def test_full_sync_replaces_only_that_source(self, event_store):
+        store = event_store.EventStore()
+        store.apply_changes('google', [event('g1', 0), event('g2', 60)], full=True)
+        store.apply_changes('ics', [event('i1', 30)], full=True)
+        
+        diff = store.apply_changes('google', [event('g1', 0), event('g3', 90)], full=True)
+        
+        assert keys(diff.added) == ['g3']
+        assert diff.changed == []
+        assert keys(diff.removed) == ['g2']
+        assert keys(store) == ['g1', 'i1', 'g3']
+    
+    def test_partial_sync_applies_changes_and_removals(self, event_store):
+        store = event_store.EventStore()
+        store.apply_changes('google', [event('g1', 0), event('g2', 60), event('g3', 120)], full=True)
+        
+        diff = store.apply_changes('google', [event('g2', 60, title='moved room'), event('g4', 30)],
+                                   removed=['g3'])
+        
+        assert keys(diff.added) == ['g4']
+        assert keys(diff.changed) == ['g2']
+        assert keys(diff.removed) == ['g3']
+        assert keys(store) == ['g1', 'g4', 'g2']
+        assert store.get('g2')['title'] == 'moved room'
+    
+    def test_unchanged_events_are_not_reported(self, event_store):
+        store = event_store.EventStore()
+        store.apply_changes('google', [event('g1', 0)], full=True)
+        
+        diff = store.apply_changes('google', [event('g1', 0)], full=True)
+        
+        assert not diff
+        assert repr(diff) == "EventDiff(added=0, changed=0, removed=0)"
+    
+    def test_tags_events_with_source(self, event_store):
+        store = event_store.EventStore()
+        store.apply_changes('ics', [event('i1', 0)])
+        
+        assert store.get('i1')['source'] == 'ics'
+
+
+def test_diff_events(event_store):
+    diff = event_store.diff_events([event('a', 0), event('b', 60)],
+                                   [event('b', 90), event('c', 120)])
+    
+    assert (keys(diff.added), keys(diff.changed), keys(diff.removed)) == (['c'], ['b'], ['a'])
+
+
+class TestOverlapping:
+    
+    @pytest.fixture
+    def store(self, event_store):
+        # a: [10:00, 11:00)，long: 前一天开始持续到 10:30
+        return event_store.EventStore([event('a', 0), event('long', -24 * 60, minutes=24 * 60 + 30)])
+    
+    @pytest.mark.parametrize('moment, expected', [
+        (NOW - timedelta(microseconds=1), ['long']),
+        (NOW, ['long', 'a']),
+        (NOW + timedelta(minutes=30), ['a']),
+        (NOW + timedelta(minutes=60) - timedelta(microseconds=1), ['a']),
+        (NOW + timedelta(minutes=60), []),
+    ])
+    def test_at_moment(self, store, moment, expected):
+        assert keys(store.overlapping(moment)) == expected
+    
+    def test_range_end_is_exclusive(self, store):
+        assert keys(store.overlapping(NOW + timedelta(minutes=40), NOW + timedelta(minutes=60))) == ['a']
+        assert keys(store.overlapping(NOW - timedelta(minutes=10), NOW)) == ['long']
+        assert keys(store.overlapping(NOW - timedelta(minutes=10), NOW + timedelta(microseconds=1))) == ['long', 'a']
+
+
+class TestLongEvents:
+    
+    @pytest.fixture
+    def store(self, event_store):
+        # trip: 一周前开始的多天事件，持续到 NOW + 1 小时
+        return event_store.EventStore([
+            event('trip', -7 * 24 * 60, minutes=7 * 24 * 60 + 60),
+            event('old', -3 * 24 * 60),
+            event('a', 0),
+        ])
+    
+    def test_found_by_overlap_and_upcoming(self, store):
+        assert keys(store.overlapping(NOW)) == ['trip', 'a']
+        assert keys(store.upcoming(NOW, 10)) == ['trip', 'a']
+        assert keys(store.overlapping(NOW - timedelta(days=3), NOW)) == ['trip', 'old']
+    
+    def test_tracked_through_updates_and_removal(self, store):
+        store.update([event('trip', -7 * 24 * 60, minutes=30)])
+        assert keys(store.overlapping(NOW)) == ['a']
+        assert store._long == []
+        
+        store.update([event('trip', -2 * 24 * 60, minutes=3 * 24 * 60)])
+        assert keys(store.upcoming(NOW, 10)) == ['trip', 'a']
+        
+        store.remove(['trip'])
+        assert keys(store.overlapping(NOW)) == ['a']
+        assert store._long == []
+    
+    def test_all_day_events_are_not_long(self, event_store):
+        store = event_store.EventStore([event('holiday', -600, minutes=24 * 60, all_day=True)])
+        assert store._long == []
+        assert keys(store.overlapping(NOW)) == ['holiday']
+
+
+class TestUpcoming:
+    
+    @pytest.fixture
+    def store(self, event_store):
+        return event_store.EventStore([
+            event('ended', -60),            # 恰好在 NOW 结束
+            event('ongoing', -30),
+            event('holiday', -600, minutes=24 * 60, all_day=True),
+            event('next', 15),
+            event('later', 120),
+        ])
+    
+    def test_includes_ongoing_and_skips_ended(self, store):
+        assert keys(store.upcoming(NOW, 10)) == ['holiday', 'ongoing', 'next', 'later']
+    
+    def test_limits_count(self, store):
+        assert keys(store.upcoming(NOW, 2)) == ['holiday', 'ongoing']
+        assert store.upcoming(NOW, 0) == []
+    
+    def test_excludes_all_day_events(self, store):
+        assert keys(store.upcoming(NOW, 2, include_all_day=False)) == ['ongoing', 'next']
+
+
+class TestStartingWithin:
+    
+    @pytest.fixture
+    def store(self, event_store):
+        return event_store.EventStore([
+            event('started', -1),
+            event('now', 0),
+            event('edge', 15),
+            event('after', 16),
+            event('all-day', 5, all_day=True),
+        ])
+    
+    def test_bounds_are_inclusive(self, store):
+        assert keys(store.starting_within(NOW, 15)) == ['now', 'all-day', 'edge']
+    
+    def test_excludes_all_day_events(self, store):
+        assert keys(store.starting_within(NOW, 15, include_all_day=False)) == ['now', 'edge']
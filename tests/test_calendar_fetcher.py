@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+后台获取测试：数据源并发获取、按顺序合并、超时、丢弃过期批次的结果，以及插件合并同步请求
+"""
+
+import functools
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('PyQt6')
+from PyQt6.QtCore import QCoreApplication
+
+
+@pytest.fixture(scope='module')
+def fetcher_module(plugin_module):
+    return plugin_module('calendar_sync', 'fetcher')
+
+
+@pytest.fixture(scope='module')
+def sources(plugin_module):
+    return plugin_module('calendar_sync', 'sources')
+
+
+class FakeSource:
+    """可控的数据源（接口与 CalendarSource 相同）：可以等待 gate、在 barrier 处与其他数据源会合，或者失败"""
+    
+    def __init__(self, sources, source_id, timeout=None, gate=None, barrier=None, delay=0.0, error=None):
+        self.sources = sources
+        self.source_id = source_id
+        self.timeout = timeout
+        self.gate = gate
+        self.barrier = barrier
+        self.delay = delay
+        self.error = error
+        self.calls = []
+    
+    def fetch_changes(self, sync_token=None):
+        self.calls.append(sync_token)
+        if self.barrier is not None:
+            self.barrier.wait(5)
+        if self.gate is not None:
+            self.gate.wait(5)
+        time.sleep(self.delay)
+        sources = self.sources
+        if self.error:
+            raise sources.SyncError(self.error)
+        event = sources.make_event(f"{self.source_id}:1", self.source_id,
+                                   datetime(2026, 3, 2, 9), datetime(2026, 3, 2, 10))
+        return sources.SourceChanges([event], token=f"{self.source_id}-{len(self.calls)}", full=True)
+
+
+def process_until(predicate, timeout=5.0):
+    """处理Qt事件直到 predicate() 为真，超时返回 False"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        QCoreApplication.processEvents()
+        time.sleep(0.005)
+    return True
+
+
+@pytest.fixture
+def make_source(sources):
+    """创建 FakeSource，返回的变化使用插件自己的 SourceChanges"""
+    return functools.partial(FakeSource, sources)
+
+
+@pytest.fixture
+def gate():
+    """阻塞数据源的开关，测试结束时打开，避免工作线程一直等待"""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+@pytest.fixture
+def fetcher(qapp, fetcher_module):
+    fetcher = fetcher_module.SourceFetcher()
+    results = []
+    fetcher.finished.connect(results.append)
+    fetcher.results = results
+    yield fetcher
+    fetcher.shutdown()
+    fetcher.deleteLater()
+
+
+class TestSourceFetcher:
+    
+    def test_fetches_concurrently_and_keeps_source_order(self, fetcher, make_source):
+        # 三个数据源必须同时运行才能通过 barrier；最先开始的数据源最后完成
+        barrier = threading.Barrier(3)
+        first = make_source('first', barrier=barrier, delay=0.1)
+        second = make_source('second', barrier=barrier)
+        third = make_source('third', barrier=barrier, error="HTTP 500")
+        
+        assert fetcher.start([first, second, third], {'first': 'token-1'})
+        assert fetcher.busy
+        assert process_until(lambda: fetcher.results)
+        
+        result, = fetcher.results
+        assert [source.source_id for source, changes in result.changes] == ['first', 'second']
+        assert result.errors == {'third': "HTTP 500"}
+        assert first.calls == ['token-1'] and second.calls == [None]
+        assert not fetcher.busy and not fetcher.running
+    
+    def test_rejects_start_while_busy(self, fetcher, gate, make_source):
+        source = make_source('slow', gate=gate)
+        assert fetcher.start([source], {})
+        
+        assert not fetcher.start([make_source('other')], {})
+        
+        gate.set()
+        assert process_until(lambda: fetcher.results)
+        assert len(fetcher.results) == 1
+    
+    def test_timeout_does_not_wait_for_slow_source(self, fetcher, gate, make_source):
+        slow = make_source('slow', timeout=0.1, gate=gate)
+        fast = make_source('fast')
+        
+        fetcher.start([slow, fast], {})
+        assert process_until(lambda: fetcher.results, timeout=2)
+        
+        result, = fetcher.results
+        assert result.errors['slow'].startswith("超时")
+        assert [source.source_id for source, changes in result.changes] == ['fast']
+        assert slow in fetcher.running
+        
+        # 超时的数据源仍在运行，下一批次不会再次获取它
+        fetcher.start([slow, fast], {})
+        assert process_until(lambda: len(fetcher.results) == 2)
+        assert fetcher.results[1].errors == {'slow': "上次同步尚未结束"}
+        assert len(slow.calls) == 1
+        
+        # 迟到的结果被丢弃，不会产生新的批次结果
+        gate.set()
+        assert process_until(lambda: slow not in fetcher.running)
+        QCoreApplication.processEvents()
+        assert len(fetcher.results) == 2
+    
+    def test_cancel_discards_pending_results(self, fetcher, gate, make_source):
+        source = make_source('slow', gate=gate)
+        fetcher.start([source], {})
+        
+        fetcher.cancel()
+        assert not fetcher.busy
+        gate.set()
+        assert process_until(lambda: not fetcher.running)
+        QCoreApplication.processEvents()
+        
+        assert fetcher.results == []
+        # 取消后可以立即开始新的批次
+        assert fetcher.start([make_source('next')], {})
+        assert process_until(lambda: fetcher.results)
+
+
+def test_fetch_all_runs_in_current_thread(fetcher_module, make_source):
+    result = fetcher_module.fetch_all([make_source('a'), make_source('b', error="失败")], {'a': 'old'})
+    
+    assert [(source.source_id, changes.token) for source, changes in result.changes] == [('a', 'a-1')]
+    assert result.errors == {'b': "失败"}
+
+
+class TestPluginBackgroundSync:
+    
+    def test_sync_requests_during_sync_are_coalesced(self, calendar_plugin, gate, make_source):
+        source = make_source('calendar', gate=gate)
+        calendar_plugin.sources = [source]
+        statuses = []
+        calendar_plugin.events_updated.connect(lambda events, status: statuses.append(status))
+        
+        assert calendar_plugin.sync_calendars()
+        assert not calendar_plugin.sync_calendars()
+        assert not calendar_plugin.sync_calendars()
+        assert calendar_plugin.sync_requested
+        
+        gate.set()
+        assert process_until(lambda: len(statuses) == 2 and not calendar_plugin.fetcher.busy)
+        
+        # 同步期间的多次请求只在结束后再同步一次，并使用第一次同步得到的令牌
+        assert source.calls == [None, 'calendar-1']
+        assert calendar_plugin.sync_tokens == {'calendar': 'calendar-2'}
+        assert not calendar_plugin.sync_requested
+    
+    def test_reset_sources_discards_running_sync(self, calendar_plugin, gate, make_source):
+        old = make_source('old', gate=gate)
+        calendar_plugin.sources = [old]
+        calendar_plugin.sync_calendars()
+        
+        calendar_plugin.reset_sources()
+        calendar_plugin.sources = [make_source('new')]
+        assert calendar_plugin.sync_calendars()
+        assert process_until(lambda: calendar_plugin.sync_tokens)
+        gate.set()
+        assert process_until(lambda: not calendar_plugin.fetcher.running)
+        QCoreApplication.processEvents()
+        
+        assert calendar_plugin.sync_tokens == {'new': 'new-1'}
+        assert 'old:1' not in calendar_plugin.event_store
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+iCalendar 解析和重复事件展开测试：RRULE、EXDATE、RECURRENCE-ID、时区和夏令时，以及 IcsSource 的令牌
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+@pytest.fixture(scope='module')
+def ics(plugin_module):
+    return plugin_module('calendar_sync', 'ics')
+
+
+@pytest.fixture(scope='module')
+def sources(plugin_module):
+    return plugin_module('calendar_sync', 'sources')
+
+
+def calendar_lines(*events: str):
+    """把 VEVENT 正文包装为完整日历的行"""
+    text = "BEGIN:VCALENDAR\nVERSION:2.0\n"
+    for body in events:
+        text += "BEGIN:VEVENT\n" + body.strip() + "\nEND:VEVENT\n"
+    text += "END:VCALENDAR\n"
+    return text.splitlines(keepends=True)
+
+
+@pytest.fixture
+def expand_local(ics):
+    """展开并换算为本地时间，按开始时间排序：[(标题, 开始, 结束, 实例标识)]"""
+    def expand(calendar, window_start, window_end):
+        instances = [
+            (event.summary, ics.to_local(start), ics.to_local(end), event.occurrence_id(start))
+            for event, start, end in calendar.expand(window_start, window_end)
+        ]
+        return sorted(instances, key=lambda instance: instance[1])
+    return expand
+
+
+@pytest.fixture
+def starts(ics, expand_local):
+    """解析 VEVENT 正文，返回时间范围内每次发生的本地开始时间"""
+    def expand(*events, window=(datetime(2026, 1, 1), datetime(2027, 1, 1))):
+        calendar = ics.IcsCalendar.parse(calendar_lines(*events))
+        return [instance[1] for instance in expand_local(calendar, *window)]
+    return expand
+
+
+@pytest.fixture
+def local_zone(monkeypatch):
+    """切换进程的本地时区，测试结束后恢复"""
+    if not hasattr(time, 'tzset'):
+        pytest.skip("当前平台不能切换本地时区")
+    
+    def use(name):
+        monkeypatch.setenv('TZ', name)
+        time.tzset()
+    
+    yield use
+    monkeypatch.undo()
+    time.tzset()
+
+
+class TestRecurrenceRule:
+    """浮动时间（不带时区）的重复规则，与本地时区无关"""
+    
+    def test_weekly_count_and_interval(self, starts):
+        assert starts("""
+UID:a
+DTSTART:20260302T090000
+DTEND:20260302T100000
+RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;COUNT=5
+""") == [datetime(2026, 3, 2, 9), datetime(2026, 3, 4, 9), datetime(2026, 3, 16, 9),
+         datetime(2026, 3, 18, 9), datetime(2026, 3, 30, 9)]
+    
+    def test_daily_until_is_inclusive(self, starts):
+        assert starts("""
+UID:a
+DTSTART:20260302T090000
+RRULE:FREQ=DAILY;UNTIL=20260304T090000
+""") == [datetime(2026, 3, 2, 9), datetime(2026, 3, 3, 9), datetime(2026, 3, 4, 9)]
+    
+    def test_monthly_last_friday(self, starts):
+        assert starts("""
+UID:a
+DTSTART:20260130T170000
+RRULE:FREQ=MONTHLY;BYDAY=-1FR;COUNT=4
+""") == [datetime(2026, 1, 30, 17), datetime(2026, 2, 27, 17), datetime(2026, 3, 27, 17),
+         datetime(2026, 4, 24, 17)]
+    
+    def test_monthly_last_day(self, starts):
+        assert starts("""
+UID:a
+DTSTART:20260131T120000
+RRULE:FREQ=MONTHLY;BYMONTHDAY=-1;COUNT=3
+""") == [datetime(2026, 1, 31, 12), datetime(2026, 2, 28, 12), datetime(2026, 3, 31, 12)]
+    
+    def test_yearly_skips_missing_dates(self, starts):
+        assert starts("""
+UID:a
+DTSTART:20240229T080000
+RRULE:FREQ=YEARLY;COUNT=2
+""", window=(datetime(2024, 1, 1), datetime(2030, 1, 1))) == [datetime(2024, 2, 29, 8), datetime(2028, 2, 29, 8)]
+    
+    def test_window_far_from_dtstart(self, starts):
+        # 没有 COUNT 时直接跳到时间范围附近，不从 DTSTART 逐个计算
+        assert starts("""
+UID:a
+DTSTART:20000103T090000
+DTEND:20000103T100000
+RRULE:FREQ=WEEKLY
+""", window=(datetime(2026, 3, 2), datetime(2026, 3, 16))) == [datetime(2026, 3, 2, 9), datetime(2026, 3, 9, 9)]
+    
+    def test_occurrence_overlapping_window_start(self, starts):
+        assert starts("""
+UID:a
+DTSTART:20260301T230000
+DTEND:20260302T010000
+RRULE:FREQ=DAILY;COUNT=3
+""", window=(datetime(2026, 3, 2), datetime(2026, 3, 3))) == [datetime(2026, 3, 1, 23), datetime(2026, 3, 2, 23)]
+    
+    def test_invalid_rule(self, ics):
+        with pytest.raises(ics.IcsError):
+            ics.RecurrenceRule.parse('FREQ=HOURLY')
+
+
+class TestExceptions:
+    
+    def test_exdate_and_rdate(self, starts):
+        assert starts("""
+UID:a
+DTSTART:20260302T090000
+RRULE:FREQ=DAILY;COUNT=4
+EXDATE:20260303T090000,20260304T090000
+RDATE:20260310T140000
+""") == [datetime(2026, 3, 2, 9), datetime(2026, 3, 5, 9), datetime(2026, 3, 10, 14)]
+    
+    def test_recurrence_id_replaces_instance(self, expand_local, ics):
+        calendar = ics.IcsCalendar.parse(calendar_lines("""
+UID:a
+SUMMARY:例会
+DTSTART:20260302T090000
+DTEND:20260302T100000
+RRULE:FREQ=DAILY;COUNT=3
+""", """
+UID:a
+SUMMARY:例会（改期）
+RECURRENCE-ID:20260303T090000
+DTSTART:20260303T150000
+DTEND:20260303T160000
+""", """
+UID:a
+RECURRENCE-ID:20260304T090000
+DTSTART:20260304T090000
+STATUS:CANCELLED
+"""))
+        
+        instances = expand_local(calendar, datetime(2026, 3, 1), datetime(2026, 3, 10))
+        
+        assert [(summary, start) for summary, start, end, key in instances] == [
+            ('例会', datetime(2026, 3, 2, 9)), ('例会（改期）', datetime(2026, 3, 3, 15))]
+        # 修改后的实例与原实例标识相同，事件存储把它当作同一事件的修改
+        assert instances[1][3] == 'a@20260303T090000'
+    
+    def test_cancelled_event_is_dropped(self, starts):
+        assert starts("""
+UID:a
+DTSTART:20260302T090000
+STATUS:CANCELLED
+""") == []
+
+
+class TestParsing:
+    
+    def test_folding_escapes_and_nested_components(self, ics):
+        calendar = ics.IcsCalendar.parse(calendar_lines("""
+UID:a
+SUMMARY:第一行\\n第二行\\, 含逗号\\;分号 和一个很长的
+  折行标题
+DTSTART:20260302T090000
+BEGIN:VALARM
+TRIGGER:-PT15M
+SUMMARY:提醒
+END:VALARM
+DURATION:PT1H30M
+"""))
+        
+        event, = calendar.events
+        assert event.summary == "第一行\n第二行, 含逗号;分号 和一个很长的 折行标题"
+        assert event.end == datetime(2026, 3, 2, 10, 30)
+    
+    def test_all_day_events(self, ics):
+        calendar = ics.IcsCalendar.parse(calendar_lines("""
+UID:a
+DTSTART;VALUE=DATE:20260302
+"""))
+        
+        event, = calendar.events
+        assert event.all_day
+        assert (event.start, event.end) == (datetime(2026, 3, 2), datetime(2026, 3, 3))
+    
+    def test_invalid_event_is_skipped(self, ics):
+        calendar = ics.IcsCalendar.parse(calendar_lines("""
+UID:broken
+DTSTART:not-a-date
+""", """
+UID:ok
+DTSTART:20260302T090000
+"""))
+        
+        assert [event.uid for event in calendar.events] == ['ok']
+    
+    def test_not_before_drops_finished_events(self, ics):
+        calendar = ics.IcsCalendar.parse(calendar_lines("""
+UID:past
+DTSTART:20250101T090000
+""", """
+UID:finished-series
+DTSTART:20250101T090000
+RRULE:FREQ=DAILY;UNTIL=20250110T090000
+""", """
+UID:running-series
+DTSTART:20250101T090000
+RRULE:FREQ=WEEKLY
+""", """
+UID:future
+DTSTART:20260401T090000
+"""), not_before=datetime(2026, 3, 1))
+        
+        assert [event.uid for event in calendar.events] == ['running-series', 'future']
+
+
+class TestTimeZones:
+    """带时区的重复事件在 DTSTART 的时区中展开，换算为本地时间后才会体现夏令时的差别"""
+    
+    def test_utc_series_across_local_dst(self, local_zone, expand_local, ics):
+        local_zone('Europe/Berlin')
+        calendar = ics.IcsCalendar.parse(calendar_lines("""
+UID:u
+SUMMARY:UTC 周会
+DTSTART:20260316T080000Z
+DTEND:20260316T090000Z
+RRULE:FREQ=WEEKLY;COUNT=4
+EXDATE:20260406T080000Z
+"""))
+        
+        instances = expand_local(calendar, datetime(2026, 3, 1), datetime(2026, 5, 1))
+        
+        # 柏林 3 月 29 日进入夏令时，UTC 的 08:00 从本地 09:00 变为 10:00
+        assert [(start, end) for summary, start, end, key in instances] == [
+            (datetime(2026, 3, 16, 9), datetime(2026, 3, 16, 10)),
+            (datetime(2026, 3, 23, 9), datetime(2026, 3, 23, 10)),
+            (datetime(2026, 3, 30, 10), datetime(2026, 3, 30, 11))]
+        assert instances[0][3] == 'u@20260316T080000Z'
+    
+    def test_tzid_series_keeps_wall_time_across_its_dst(self, local_zone, expand_local, ics):
+        local_zone('UTC')
+        calendar = ics.IcsCalendar.parse(calendar_lines("""
+UID:b
+DTSTART;TZID=Europe/Berlin:20260323T090000
+DTEND;TZID=Europe/Berlin:20260323T100000
+RRULE:FREQ=WEEKLY;UNTIL=20260406T070000Z
+EXDATE:20260406T070000Z
+"""))
+        
+        # 柏林时间每次都是 09:00；UTC 格式的 EXDATE 与夏令时后的 09:00 是同一时刻
+        assert [start for summary, start, end, key in expand_local(
+            calendar, datetime(2026, 3, 1), datetime(2026, 5, 1))] == [
+            datetime(2026, 3, 23, 8), datetime(2026, 3, 30, 7)]
+    
+    def test_tzid_different_from_local_zone(self, local_zone, expand_local, ics):
+        local_zone('Europe/Berlin')
+        calendar = ics.IcsCalendar.parse(calendar_lines("""
+UID:ny
+SUMMARY:纽约
+DTSTART;TZID=America/New_York:20260302T090000
+DTEND;TZID=America/New_York:20260302T100000
+RRULE:FREQ=WEEKLY;UNTIL=20260406T130000Z
+EXDATE;TZID=America/New_York:20260323T090000
+""", """
+UID:ny
+SUMMARY:纽约（改期）
+RECURRENCE-ID:20260316T130000Z
+DTSTART;TZID=America/New_York:20260316T110000
+DTEND;TZID=America/New_York:20260316T120000
+"""))
+        
+        instances = expand_local(calendar, datetime(2026, 3, 1), datetime(2026, 5, 1))
+        
+        # 纽约 3 月 8 日、柏林 3 月 29 日进入夏令时，两者之间时差为 5 小时而不是 6 小时
+        assert [(summary, start) for summary, start, end, key in instances] == [
+            ('纽约', datetime(2026, 3, 2, 15)),
+            ('纽约', datetime(2026, 3, 9, 14)),
+            ('纽约（改期）', datetime(2026, 3, 16, 16)),
+            ('纽约', datetime(2026, 3, 30, 15)),
+            ('纽约', datetime(2026, 4, 6, 15))]
+        assert instances[1][3] == 'ny@20260309T130000Z'
+        assert instances[2][3] == 'ny@20260316T130000Z'
+    
+    def test_unknown_tzid_is_treated_as_local(self, ics):
+        event, = ics.IcsCalendar.parse(calendar_lines("""
+UID:w
+DTSTART;TZID=W. Europe Standard Time:20260302T090000
+""")).events
+        
+        assert event.start == datetime(2026, 3, 2, 9)
+
+
+class TestIcsSource:
+    
+    @staticmethod
+    def upcoming_event(summary):
+        start = (datetime.now() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+        return f"""
+UID:{summary}
+SUMMARY:{summary}
+DTSTART:{start:%Y%m%dT%H%M%S}
+DURATION:PT1H
+"""
+    
+    def test_local_file_is_parsed_again_only_when_changed(self, tmp_path, sources):
+        path = tmp_path / 'calendar.ics'
+        path.write_text(''.join(calendar_lines(self.upcoming_event('复习'))), encoding='utf-8')
+        source = sources.IcsSource(str(path), source_id='school')
+        
+        changes = source.fetch_changes(None)
+        assert changes.full
+        assert [event['id'] for event in changes.events] == ['school:复习']
+        parsed = source.calendar
+        
+        assert source.fetch_changes(changes.token).token == changes.token
+        assert source.calendar is parsed
+        
+        path.write_text(''.join(calendar_lines(self.upcoming_event('复习'), self.upcoming_event('考试'))),
+                        encoding='utf-8')
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        changes = source.fetch_changes(changes.token)
+        
+        assert source.calendar is not parsed
+        assert sorted(event['title'] for event in changes.events) == ['复习', '考试']
+    
+    def test_missing_file_raises_sync_error(self, tmp_path, sources):
+        with pytest.raises(sources.SyncError):
+            sources.IcsSource(str(tmp_path / 'missing.ics')).fetch_changes(None)
+    
+    def test_subscription_uses_etag(self, http_server, sources):
+        body = ''.join(calendar_lines(self.upcoming_event('讲座'))).encode('utf-8')
+        
+        def subscription(request):
+            if request.headers.get('If-None-Match') == '"v1"':
+                return 304, {}, b''
+            return 200, {'Content-Type': 'text/calendar', 'ETag': '"v1"'}, body
+        
+        http_server.routes['/calendar.ics'] = subscription
+        source = sources.IcsSource(http_server.url('/calendar.ics'), timeout=5)
+        
+        first = source.fetch_changes(None)
+        second = source.fetch_changes(first.token)
+        
+        assert second.token == first.token
+        assert [event['title'] for event in second.events] == ['讲座']
+        assert [request.headers.get('If-None-Match') for request in http_server.requests] == [None, '"v1"']
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日历同步插件测试：显示的事件、提醒和数据源
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def add_events(plugin, *events):
+    plugin.event_store.update(events)
+
+
+def make(key, start, all_day=False):
+    return {
+        'id': key,
+        'title': key,
+        'start_datetime': start,
+        'end_datetime': start + timedelta(hours=1),
+        'all_day': all_day
+    }
+
+
+@pytest.mark.parametrize('show_all_day', [True, False])
+def test_reminders_follow_all_day_setting(calendar_plugin, show_all_day):
+    now = datetime.now()
+    add_events(calendar_plugin,
+               make('meeting', now + timedelta(minutes=5)),
+               make('holiday', now + timedelta(minutes=5), all_day=True),
+               make('tomorrow', now + timedelta(days=1)))
+    calendar_plugin.settings.update(show_all_day_events=show_all_day, reminder_minutes=15)
+    reminded = []
+    calendar_plugin.send_reminder = lambda event: reminded.append(event['id'])
+    
+    calendar_plugin.check_reminders()
+    
+    assert sorted(reminded) == (['holiday', 'meeting'] if show_all_day else ['meeting'])
+
+
+def test_displayed_events_follow_all_day_setting(calendar_plugin):
+    now = datetime.now()
+    add_events(calendar_plugin,
+               make('holiday', now - timedelta(minutes=10), all_day=True),
+               make('meeting', now + timedelta(minutes=20)),
+               make('review', now + timedelta(hours=2)))
+    calendar_plugin.settings.update(show_all_day_events=False, show_upcoming_events=3)
+    
+    events = calendar_plugin.filter_events(now)
+    
+    assert [event['id'] for event in events] == ['meeting', 'review']
+    assert [event['status'] for event in events] == ['soon', 'upcoming']
+
+
+def test_outlook_without_login_is_reported(calendar_plugin):
+    calendar_plugin.settings.update(outlook_enabled=True)
+    
+    assert calendar_plugin.sync_calendars(background=False)
+    
+    # 不退回示例数据
+    assert calendar_plugin.sources == []
+    assert calendar_plugin.events == []
+    assert calendar_plugin.sync_status.endswith("（Outlook 未登录）")
+    
+    calendar_plugin.outlook_token_provider = lambda: "token"
+    calendar_plugin.reset_sources()
+    assert [source.source_id for source in calendar_plugin.get_sources()] == ['outlook']
+    assert calendar_plugin.source_warnings == []
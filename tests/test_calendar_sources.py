@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日历数据源测试：在本地模拟的 Google 日历和 Microsoft Graph 服务上验证同步令牌和增量同步
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+CALENDAR_ID = 'team@group.calendar.google.com'
+EVENTS_PATH = '/calendar/v3/calendars/team%40group.calendar.google.com/events'
+
+
+@pytest.fixture(scope='module')
+def sources(plugin_module):
+    return plugin_module('calendar_sync', 'sources')
+
+
+def json_response(data, status=200):
+    return status, {'Content-Type': 'application/json'}, json.dumps(data).encode('utf-8')
+
+
+class FakeGoogleCalendar:
+    """events.list 的最小实现：每次修改递增版本号，同步令牌为版本号，支持分页和令牌过期"""
+    
+    def __init__(self):
+        self.version = 0
+        self.items = {}
+        self.expired_tokens = set()
+        self.failing = False
+    
+    def put(self, event_id, summary, start, end=None):
+        self.version += 1
+        item = {'id': event_id, 'status': 'confirmed', 'summary': summary}
+        if 'T' in start:
+            item['start'], item['end'] = {'dateTime': start}, {'dateTime': end or start}
+        else:
+            item['start'], item['end'] = {'date': start}, {'date': end or start}
+        self.items[event_id] = (self.version, item)
+    
+    def cancel(self, event_id):
+        self.version += 1
+        self.items[event_id] = (self.version, {'id': event_id, 'status': 'cancelled'})
+    
+    def __call__(self, request):
+        if self.failing:
+            return json_response({'error': 'backend'}, 500)
+        token = request.query.get('syncToken')
+        if token in self.expired_tokens:
+            return json_response({'error': 'fullSyncRequired'}, 410)
+        
+        since = int(token) if token else 0
+        items = [item for version, item in sorted(self.items.values(), key=lambda entry: entry[0])
+                 if version > since and (token or item['status'] != 'cancelled')]
+        offset = int(request.query.get('pageToken', 0))
+        size = int(request.query['maxResults'])
+        body = {'items': items[offset:offset + size]}
+        if offset + size < len(items):
+            body['nextPageToken'] = str(offset + size)
+        else:
+            body['nextSyncToken'] = str(self.version)
+        return json_response(body)
+
+
+@pytest.fixture
+def google(http_server):
+    calendar = FakeGoogleCalendar()
+    http_server.routes[EVENTS_PATH] = calendar
+    calendar.put('standup', '站会', '2026-03-02T01:00:00Z', '2026-03-02T01:15:00Z')
+    calendar.put('review', '评审', '2026-03-02T06:00:00Z', '2026-03-02T07:00:00Z')
+    calendar.put('holiday', '假期', '2026-03-03', '2026-03-04')
+    return calendar
+
+
+@pytest.fixture
+def google_source(http_server, sources):
+    return sources.GoogleCalendarSource('test-key', CALENDAR_ID, base_url=http_server.url('/calendar/v3'),
+                                        timeout=5, page_size=2)
+
+
+class TestGoogleCalendarSource:
+    
+    def test_full_sync_follows_pages(self, http_server, google, google_source):
+        changes = google_source.fetch_changes(None)
+        
+        assert changes.full and changes.token == '3'
+        assert sorted(event['id'] for event in changes.events) == ['google:holiday', 'google:review', 'google:standup']
+        requests = http_server.requests_to(EVENTS_PATH)
+        assert len(requests) == 2
+        assert requests[0].query['key'] == 'test-key'
+        assert 'syncToken' not in requests[0].query
+    
+    def test_converts_times(self, google, google_source):
+        events = {event['id']: event for event in google_source.fetch_changes(None).events}
+        
+        standup = events['google:standup']
+        assert standup['end_datetime'] - standup['start_datetime'] == timedelta(minutes=15)
+        assert standup['start_datetime'].tzinfo is None
+        holiday = events['google:holiday']
+        assert holiday['all_day']
+        assert (holiday['start_datetime'], holiday['end_datetime']) == (datetime(2026, 3, 3), datetime(2026, 3, 4))
+    
+    def test_incremental_sync_returns_only_changes(self, http_server, google, google_source):
+        token = google_source.fetch_changes(None).token
+        google.put('review', '评审（改期）', '2026-03-02T08:00:00Z', '2026-03-02T09:00:00Z')
+        google.cancel('standup')
+        
+        changes = google_source.fetch_changes(token)
+        
+        assert not changes.full
+        assert [event['title'] for event in changes.events] == ['评审（改期）']
+        assert changes.removed == ['google:standup']
+        assert changes.token == '5'
+        assert http_server.requests[-1].query['syncToken'] == token
+    
+    def test_expired_token_falls_back_to_full_sync(self, http_server, google, google_source):
+        google.expired_tokens.add('old')
+        
+        changes = google_source.fetch_changes('old')
+        
+        assert changes.full
+        assert len(changes.events) == 3
+        assert 'syncToken' not in http_server.requests[-1].query
+    
+    def test_server_error_raises_sync_error(self, google, google_source, sources):
+        google.failing = True
+        
+        with pytest.raises(sources.SyncError):
+            google_source.fetch_changes(None)
+    
+    @pytest.mark.parametrize('calendar_id', ['', 'primary'])
+    def test_requires_public_calendar_id(self, calendar_id, sources):
+        with pytest.raises(ValueError):
+            sources.GoogleCalendarSource('test-key', calendar_id)
+
+
+class TestOutlookSource:
+    
+    @pytest.fixture
+    def graph(self, http_server):
+        """calendarView delta：第一页带 nextLink，最后一页带 deltaLink，deltaLink 返回删除和修改"""
+        def event(event_id, subject, start, end, **extra):
+            return dict({'id': event_id, 'subject': subject,
+                         'start': {'dateTime': start, 'timeZone': 'UTC'},
+                         'end': {'dateTime': end, 'timeZone': 'UTC'}}, **extra)
+        
+        http_server.routes['/me/calendarView/delta'] = lambda request: json_response({
+            'value': [event('a', '周会', '2026-03-02T02:00:00.0000000', '2026-03-02T03:00:00.0000000')],
+            '@odata.nextLink': http_server.url('/delta/page2')
+        })
+        http_server.routes['/delta/page2'] = lambda request: json_response({
+            'value': [event('b', '年假', '2026-03-05T00:00:00.0000000', '2026-03-06T00:00:00.0000000', isAllDay=True)],
+            '@odata.deltaLink': http_server.url('/delta/token1')
+        })
+        http_server.routes['/delta/token1'] = lambda request: json_response({
+            'value': [{'id': 'a', '@removed': {'reason': 'deleted'}},
+                      event('c', '面试', '2026-03-03T06:00:00.0000000', '2026-03-03T07:00:00.0000000')],
+            '@odata.deltaLink': http_server.url('/delta/token2')
+        })
+        http_server.routes['/delta/expired'] = lambda request: json_response({'error': 'syncStateNotFound'}, 410)
+        return http_server
+    
+    @pytest.fixture
+    def outlook_source(self, graph, sources):
+        return sources.OutlookSource(lambda: 'access-token', base_url=graph.url(''), timeout=5)
+    
+    def test_full_then_delta_sync(self, graph, outlook_source):
+        changes = outlook_source.fetch_changes(None)
+        
+        assert changes.full
+        assert [event['id'] for event in changes.events] == ['outlook:a', 'outlook:b']
+        assert changes.events[1]['all_day']
+        assert changes.events[1]['start_datetime'] == datetime(2026, 3, 5)
+        assert changes.token == graph.url('/delta/token1')
+        assert graph.requests[0].headers['Authorization'] == 'Bearer access-token'
+        assert 'startDateTime' in graph.requests[0].query
+        
+        delta = outlook_source.fetch_changes(changes.token)
+        
+        assert not delta.full
+        assert delta.removed == ['outlook:a']
+        assert [event['id'] for event in delta.events] == ['outlook:c']
+        assert delta.token == graph.url('/delta/token2')
+    
+    def test_expired_delta_link_falls_back_to_full_sync(self, graph, outlook_source):
+        changes = outlook_source.fetch_changes(graph.url('/delta/expired'))
+        
+        assert changes.full
+        assert graph.requests[-2].path == '/me/calendarView/delta'
+
+
+def test_parse_datetime_accepts_graph_precision(sources):
+    parsed = sources.parse_datetime('2026-03-02T02:00:00.1234567Z')
+    
+    assert parsed.tzinfo is None
+    assert parsed.microsecond == 123456
+
+
+class TestPluginSync:
+    """插件通过本地 Google 日历替身同步"""
+    
+    @pytest.fixture
+    def plugin(self, calendar_plugin, http_server, google_source):
+        calendar_plugin.sources = [google_source]
+        return calendar_plugin
+    
+    def test_keeps_token_and_merges_changes(self, plugin, google):
+        plugin.sync_calendars(background=False)
+        assert plugin.sync_tokens == {'google': '3'}
+        assert len(plugin.event_store) == 3
+        
+        google.cancel('holiday')
+        plugin.sync_calendars(background=False)
+        
+        assert plugin.sync_tokens == {'google': '4'}
+        assert 'google:holiday' not in plugin.event_store
+        assert len(plugin.event_store) == 2
+    
+    def test_failed_source_keeps_events_and_token(self, plugin, google):
+        plugin.sync_calendars(background=False)
+        google.failing = True
+        
+        plugin.sync_calendars(background=False)
+        
+        assert plugin.sync_tokens == {'google': '3'}
+        assert len(plugin.event_store) == 3
+        assert '1 个日历同步失败' in plugin.sync_status
+    
+    def test_expired_token_replaces_stale_events(self, plugin, google):
+        plugin.sync_calendars(background=False)
+        # 令牌过期期间删除的事件不会出现在增量结果中，只能靠全量同步清除
+        google.items.pop('review')
+        google.expired_tokens.add('3')
+        
+        plugin.sync_calendars(background=False)
+        
+        assert 'google:review' not in plugin.event_store
+        assert len(plugin.event_store) == 2
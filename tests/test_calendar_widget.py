@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日历组件测试：事件组件按变化就地更新，移除的组件回收复用，布局大小不随更新次数增长
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+BASE = datetime(2026, 3, 2, 8)
+
+
+def make(number, title=None, status='upcoming', all_day=False):
+    start = BASE + timedelta(hours=number)
+    return {
+        'id': f"test:{number}",
+        'title': title or f"事件 {number}",
+        'start_datetime': start,
+        'end_datetime': start + timedelta(hours=1),
+        'start_time': start.strftime('%H:%M'),
+        'end_time': (start + timedelta(hours=1)).strftime('%H:%M'),
+        'all_day': all_day,
+        'status': status
+    }
+
+
+@pytest.fixture
+def calendar_ui(qapp, plugin_module):
+    """插件的界面模块，需要先由 qapp 安装插件基类"""
+    return plugin_module('calendar_sync', 'plugin')
+
+
+@pytest.fixture
+def widget(calendar_ui):
+    widget = calendar_ui.CalendarWidget(None)
+    yield widget
+    widget.deleteLater()
+
+
+def shown_titles(widget):
+    """布局中可见的事件组件的标题，按布局顺序"""
+    shown = set(widget.event_widgets.values())
+    titles = []
+    for index in range(widget.events_layout.count()):
+        item = widget.events_layout.itemAt(index).widget()
+        if item in shown and not item.isHidden():
+            titles.append(item.title_label.text())
+    return titles
+
+
+def all_event_widgets(calendar_ui, widget):
+    return widget.events_widget.findChildren(calendar_ui.EventWidget)
+
+
+class TestCalendarWidget:
+    
+    def test_orders_events_by_start_time(self, widget):
+        widget.update_events([make(3), make(1), make(2)], "最后同步: 08:00")
+        
+        assert shown_titles(widget) == ["事件 1", "事件 2", "事件 3"]
+        assert widget.no_events_label.isHidden()
+        assert widget.status_label.text() == "最后同步: 08:00"
+    
+    def test_removed_widgets_are_hidden_and_reused(self, widget, calendar_ui):
+        widget.update_events([make(1), make(2)], "")
+        first = widget.event_widgets['test:1']
+        
+        widget.update_events([make(2)], "")
+        assert first.isHidden()
+        assert widget.spare_widgets == [first]
+        
+        widget.update_events([make(2), make(5)], "")
+        assert widget.event_widgets['test:5'] is first
+        assert not first.isHidden()
+        assert widget.spare_widgets == []
+        assert len(all_event_widgets(calendar_ui, widget)) == 2
+        assert shown_titles(widget) == ["事件 2", "事件 5"]
+    
+    def test_changed_event_updates_widget_in_place(self, widget, calendar_ui):
+        widget.update_events([make(1), make(2)], "")
+        target = widget.event_widgets['test:1']
+        unchanged = widget.event_widgets['test:2']
+        
+        widget.update_events([make(1, title="改名", status='soon'), make(2)], "")
+        
+        assert widget.event_widgets['test:1'] is target
+        assert widget.event_widgets['test:2'] is unchanged
+        assert target.title_label.text() == "改名"
+        assert target.status_label.text() == "即将开始"
+        assert target.status_label.styleSheet() == calendar_ui.STATUS_LABELS['soon'][1]
+    
+    def test_status_style_is_set_only_when_status_changes(self, widget, monkeypatch):
+        widget.update_events([make(1, status='ongoing')], "")
+        target = widget.event_widgets['test:1']
+        styles = []
+        monkeypatch.setattr(target.status_label, 'setStyleSheet', styles.append)
+        
+        widget.update_events([make(1, title="改名", status='ongoing')], "")
+        assert styles == []
+        
+        widget.update_events([make(1, title="改名", status='upcoming')], "")
+        assert styles == [""]
+        assert target.status_label.text() == ""
+    
+    def test_all_day_event_text(self, widget):
+        widget.update_events([make(1, all_day=True)], "")
+        
+        assert widget.event_widgets['test:1'].time_label.text() == "全天"
+    
+    def test_no_events_label_toggles(self, widget):
+        widget.update_events([make(1)], "")
+        widget.update_events([], "")
+        
+        assert not widget.no_events_label.isHidden()
+        assert shown_titles(widget) == []
+        
+        widget.update_events([make(2)], "")
+        assert widget.no_events_label.isHidden()
+    
+    def test_layout_stays_bounded_over_many_updates(self, widget, calendar_ui):
+        # 每次更新滑动一个事件，模拟一整天的事件依次结束
+        for offset in range(200):
+            widget.update_events([make(number) for number in range(offset, offset + 5)], "")
+        
+        assert shown_titles(widget) == [f"事件 {number}" for number in range(199, 204)]
+        assert len(all_event_widgets(calendar_ui, widget)) == 5
+        # 事件组件、"无日程"提示和弹性空间
+        assert widget.events_layout.count() == 5 + 2
+
+
+def test_plugin_widget_follows_sync(calendar_plugin, plugin_module):
+    calendar_plugin.sync_calendars(background=False)
+    widget = calendar_plugin.get_widget()
+    
+    assert len(widget.event_widgets) == len(calendar_plugin.events)
+    
+    calendar_plugin.events_changed.emit(plugin_module('calendar_sync', 'event_store').EventDiff(
+        removed=list(calendar_plugin.events)), "已清空")
+    
+    assert widget.event_widgets == {}
+    assert len(widget.spare_widgets) == len(calendar_plugin.events)
+    assert widget.status_label.text() == "已清空"
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+依赖解析测试：安装阶段、关键路径、版本约束和循环依赖
+"""
+
+import pytest
+
+from dependency_resolver import (DependencyResolver, DependencyCycleError, MissingDependencyError,
+                                 IncompatibleVersionError, parse_requirement, version_satisfies)
+
+
+def plugin(plugin_id, version='1.0.0', size=100, dependencies=(), **fields):
+    return {'id': plugin_id, 'version': version, 'size': size, 'dependencies': list(dependencies), **fields}
+
+
+@pytest.fixture
+def catalog():
+    # app 依赖 ui 和 data，ui 和 data 都依赖 core；tool 独立
+    return [
+        plugin('core', size=500),
+        plugin('ui', size=100, dependencies=['core>=1.0']),
+        plugin('data', size=300, dependencies=[{'id': 'core', 'version': '<2.0'}]),
+        plugin('app', size=50, dependencies=['ui', 'data']),
+        plugin('tool', size=10),
+    ]
+
+
+@pytest.mark.parametrize('version, constraint, expected', [
+    ('1.2.0', '', True),
+    ('1.2.0', '>=1.0,<2.0', True),
+    ('2.0', '<2.0', False),
+    ('1.0.0', '==1.0', True),
+    ('1.0.1', '!=1.0.1', False),
+    ('1.10', '>1.9', True),
+])
+def test_version_satisfies(version, constraint, expected):
+    assert version_satisfies(version, constraint) is expected
+
+
+def test_parse_requirement():
+    assert parse_requirement('weather_enhanced >= 1.0, <2.0') == ('weather_enhanced', '>= 1.0, <2.0')
+    assert parse_requirement({'id': 'dark_theme'}) == ('dark_theme', '')
+
+
+def test_stages_put_dependencies_first(catalog):
+    plan = DependencyResolver(catalog, '1.0.0').resolve(['app', 'tool'])
+    
+    assert plan.stages == [['core', 'tool'], ['data', 'ui'], ['app']]
+    assert plan.order == ['core', 'tool', 'data', 'ui', 'app']
+    assert plan.total_size == 960
+
+
+def test_critical_path_follows_largest_downloads(catalog):
+    plan = DependencyResolver(catalog, '1.0.0').resolve(['app'])
+    
+    assert plan.critical_path == ['core', 'data', 'app']
+    assert plan.critical_path_size == 850
+
+
+def test_installed_plugins_are_skipped(catalog):
+    plan = DependencyResolver(catalog, '1.0.0', installed={'core': '1.0.0'}).resolve(['ui'])
+    
+    assert plan.stages == [['ui']]
+    assert plan.skipped == ['core']
+
+
+def test_outdated_installed_plugin_is_reinstalled(catalog):
+    plan = DependencyResolver(catalog, '1.0.0', installed={'core': '0.9'}).resolve(['ui'])
+    
+    assert plan.order == ['core', 'ui']
+    assert plan.skipped == []
+
+
+def test_cycle_error_reports_the_cycle():
+    resolver = DependencyResolver([
+        plugin('a', dependencies=['b']),
+        plugin('b', dependencies=['c']),
+        plugin('c', dependencies=['a']),
+    ], '1.0.0')
+    
+    with pytest.raises(DependencyCycleError) as info:
+        resolver.resolve(['a'])
+    assert info.value.cycle == ['a', 'b', 'c', 'a']
+    assert str(info.value) == "循环依赖: a -> b -> c -> a"
+
+
+def test_missing_dependency(catalog):
+    catalog.append(plugin('broken', dependencies=['nowhere']))
+    
+    with pytest.raises(MissingDependencyError, match="插件 nowhere 不在目录中（broken 依赖）"):
+        DependencyResolver(catalog, '1.0.0').resolve(['broken'])
+
+
+def test_version_constraint_checked_for_every_dependent(catalog):
+    catalog.append(plugin('legacy', dependencies=['core<1.0']))
+    
+    with pytest.raises(IncompatibleVersionError, match="插件 core 的版本 1.0.0 不满足 <1.0（legacy 依赖）"):
+        DependencyResolver(catalog, '1.0.0').resolve(['ui', 'legacy'])
+
+
+@pytest.mark.parametrize('app_version, compatible', [('0.9', False), ('1.1.0', True), ('2.1', False)])
+def test_app_version_range(app_version, compatible):
+    resolver = DependencyResolver([plugin('new', min_app_version='1.1.0', max_app_version='2.0')], app_version)
+    
+    if compatible:
+        assert resolver.resolve(['new']).order == ['new']
+    else:
+        with pytest.raises(IncompatibleVersionError, match="不兼容应用版本"):
+            resolver.resolve(['new'])
+
+
+def test_plans_are_cached_per_request_set(catalog):
+    resolver = DependencyResolver(catalog, '1.0.0')
+    plan = resolver.resolve(['app', 'tool'])
+    
+    assert resolver.resolve(['tool', 'app']) is plan
+    resolver.clear_cache()
+    assert resolver.resolve(['tool', 'app']) is not plan
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+插件清单校验测试：必填字段、打包规则、依赖声明和设置校验器
+"""
+
+import json
+
+import pytest
+
+from manifest_schema import (validate_manifest, validate_plugin_dirs, compile_settings_schema,
+                             ManifestError, SettingsValidationError)
+
+
+def manifest(**fields):
+    """合法的最小清单，fields 覆盖或追加字段"""
+    result = {
+        'id': 'demo',
+        'name': '示例插件',
+        'version': '1.0.0',
+        'description': '测试用插件',
+        'author': 'TimeNest',
+        'plugin_class': 'DemoPlugin',
+        'plugin_type': 'utility',
+        'api_version': '1.0.0'
+    }
+    result.update(fields)
+    return result
+
+
+def test_shipped_manifests_are_valid(plugin_loader):
+    assert validate_plugin_dirs(descriptor.plugin_dir for descriptor in plugin_loader.plugins.values()) == {}
+
+
+def test_minimal_manifest_is_valid():
+    assert validate_manifest(manifest(), 'demo') == []
+
+
+@pytest.mark.parametrize('fields, message', [
+    ({'name': ''}, "缺少必填字段或不是字符串: name"),
+    ({'version': 1}, "缺少必填字段或不是字符串: version"),
+    ({'id': 'demo plugin'}, "插件ID只能包含字母、数字、下划线和连字符: demo plugin"),
+    ({'version': '1.0-beta'}, "version 不是有效的版本号: 1.0-beta"),
+    ({'min_app_version': 'latest'}, "min_app_version 不是有效的版本号: latest"),
+    ({'plugin_type': 'widget'}, "未知的插件类型: widget"),
+    ({'permissions': ['root_access']}, "未知的权限: root_access"),
+    ({'permissions': 'network_access'}, "permissions 应为列表"),
+    ({'tags': ['效率', 1]}, "tags 应为字符串列表"),
+    ({'dependencies': ['other_plugin >= x.y']}, "无效的依赖声明: other_plugin >= x.y"),
+    ({'dependencies': 'other_plugin'}, "dependencies 应为列表"),
+])
+def test_rejects_invalid_fields(fields, message):
+    assert validate_manifest(manifest(**fields)) == [message]
+
+
+def test_rejects_mismatched_directory_name():
+    assert validate_manifest(manifest(), 'other') == ["插件ID demo 与目录名 other 不一致"]
+
+
+def test_rejects_non_object():
+    assert validate_manifest([]) == ["manifest.json 应为对象"]
+
+
+class TestReleaseRules:
+    
+    def test_accepts_patterns_and_budget(self):
+        assert validate_manifest(manifest(files=['plugin.py', 'screenshots/'], exclude=['*.psd'],
+                                          max_release_size=524288)) == []
+    
+    @pytest.mark.parametrize('field', ['files', 'exclude'])
+    @pytest.mark.parametrize('value', ['plugin.py', ['plugin.py', 1], [''], {'plugin.py': True}])
+    def test_rejects_invalid_patterns(self, field, value):
+        assert validate_manifest(manifest(**{field: value})) == [f"{field} 应为非空字符串（文件匹配规则）列表"]
+    
+    @pytest.mark.parametrize('value', [0, -1, 1.5, '524288', True])
+    def test_rejects_invalid_size_budget(self, value):
+        assert validate_manifest(manifest(max_release_size=value)) == [
+            f"max_release_size 应为正整数（字节），实际为 {value!r}"]
+
+
+def test_validate_plugin_dirs_reports_only_invalid_plugins(tmp_path):
+    good, bad, broken, missing = (tmp_path / name for name in ('good', 'bad', 'broken', 'missing'))
+    for plugin_dir in (good, bad, broken, missing):
+        plugin_dir.mkdir()
+    (good / 'manifest.json').write_text(json.dumps(manifest(id='good')), encoding='utf-8')
+    (bad / 'manifest.json').write_text(json.dumps(manifest(id='bad', max_release_size=0)), encoding='utf-8')
+    (broken / 'manifest.json').write_text('{', encoding='utf-8')
+    
+    results = validate_plugin_dirs([good, bad, broken, missing])
+    
+    assert set(results) == {'bad', 'broken', 'missing'}
+    assert results['bad'] == ["max_release_size 应为正整数（字节），实际为 0"]
+    assert results['broken'][0].startswith("manifest.json 不是有效的JSON")
+    assert results['missing'] == ["缺少 manifest.json"]
+
+
+class TestSettingsSchema:
+    
+    @pytest.fixture
+    def validator(self):
+        return compile_settings_schema({
+            'interval': {'type': 'integer', 'min': 1, 'max': 60, 'default': 15, 'required': True},
+            'enabled': {'type': 'boolean', 'default': True},
+            'city': {'type': 'string'},
+            'theme': {'type': 'choice', 'choices': ['light', 'dark']}
+        })
+    
+    def test_collects_defaults_and_required(self, validator):
+        assert validator.defaults == {'interval': 15, 'enabled': True}
+        assert validator.required == ['interval']
+    
+    def test_accepts_valid_values(self, validator):
+        validator({'interval': 60, 'enabled': False, 'city': '北京', 'theme': 'dark'})
+    
+    @pytest.mark.parametrize('values, message', [
+        ({'interval': 0}, "设置 interval 不能小于 1，实际为 0"),
+        ({'interval': 61}, "设置 interval 不能大于 60，实际为 61"),
+        ({'interval': True}, "设置 interval 应为整数，实际为 True"),
+        ({'enabled': 1}, "设置 enabled 应为布尔值，实际为 1"),
+        ({'city': None}, "设置 city 应为字符串，实际为 None"),
+        ({'theme': 'blue'}, "设置 theme 应为 dark/light 之一，实际为 'blue'"),
+        ({'unknown': 1}, "未知的设置项: unknown"),
+    ])
+    def test_rejects_invalid_values(self, validator, values, message):
+        with pytest.raises(SettingsValidationError) as info:
+            validator(values)
+        assert info.value.errors == [message]
+    
+    def test_full_validation_requires_required_settings(self, validator):
+        assert validator.validate({'enabled': True}) == []
+        assert validator.validate({'enabled': True}, partial=False) == ["缺少必填设置: interval"]
+    
+    @pytest.mark.parametrize('settings, message', [
+        ({'a': {'type': 'float'}}, "设置 a 的类型未知: 'float'"),
+        ({'a': {'type': 'integer', 'min': 10, 'max': 1}}, "设置 a 的 min 大于 max"),
+        ({'a': {'type': 'integer', 'min': '1'}}, "设置 a 的 min/max 应为整数"),
+        ({'a': {'type': 'choice', 'choices': []}}, "设置 a 的 choices 应为非空字符串列表"),
+        ({'a': {'type': 'integer', 'default': 'x'}}, "默认值不合法: 设置 a 应为整数，实际为 'x'"),
+        ({'a': {'type': 'string', 'required': 'yes'}}, "设置 a 的 required 应为布尔值"),
+        ({'a': 'string'}, "设置 a 的声明应为对象"),
+    ])
+    def test_rejects_invalid_declarations(self, settings, message):
+        with pytest.raises(ManifestError) as info:
+            compile_settings_schema(settings)
+        assert info.value.errors == [message]
+    
+    def test_settings_errors_are_reported_by_validate_manifest(self):
+        assert validate_manifest(manifest(settings={'a': {'type': 'float'}})) == ["设置 a 的类型未知: 'float'"]
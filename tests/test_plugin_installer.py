@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+插件安装器测试：下载、缓存、续传、校验和发布包安全检查
+"""
+
+import hashlib
+import io
+import zipfile
+
+import pytest
+
+from plugin_installer import (PluginInstaller, InstallError, ChecksumMismatchError, UnsafeArchiveError,
+                              extract_archive)
+
+
+def make_archive(files):
+    """生成包含 files（成员名 -> 内容）的ZIP"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for name, content in files.items():
+            zipf.writestr(name, content)
+    return buffer.getvalue()
+
+
+def catalog_entry(server, data, plugin_id='demo', path='/demo.zip'):
+    """与 plugins.json 中格式相同的插件信息"""
+    return {
+        'id': plugin_id,
+        'version': '1.0.0',
+        'download_url': server.url(path),
+        'size': len(data),
+        'checksum': 'sha256:' + hashlib.sha256(data).hexdigest()
+    }
+
+
+def serve_bytes(data, ranges=True):
+    """返回 data 的路由，ranges 为 False 时模拟忽略 Range 请求头的服务器"""
+    def route(request):
+        requested = request.headers.get('Range')
+        if ranges and requested:
+            start = int(requested.split('=')[1].rstrip('-'))
+            if start >= len(data):
+                return 416, {}, b''
+            return 206, {'Content-Range': f'bytes {start}-{len(data) - 1}/{len(data)}'}, data[start:]
+        return 200, {}, data
+    return route
+
+
+# 足够大，续传时前半部分和后半部分都跨越多个读写块
+PAYLOAD = make_archive({
+    'plugin.py': 'def create_plugin():\n    return None\n',
+    'manifest.json': '{"id": "demo"}',
+    'assets/data.bin': bytes(range(256)) * 4096
+})
+
+
+@pytest.fixture
+def installer(tmp_path):
+    return PluginInstaller(tmp_path / "cache", tmp_path / "plugins")
+
+
+def test_install_downloads_verifies_and_extracts(http_server, installer, tmp_path):
+    http_server.routes['/demo.zip'] = serve_bytes(PAYLOAD)
+    plugin = catalog_entry(http_server, PAYLOAD)
+    
+    target = installer.install(plugin)
+    
+    assert target == tmp_path / "plugins" / "demo"
+    assert (target / "plugin.py").read_text().startswith('def create_plugin')
+    assert (target / "assets" / "data.bin").stat().st_size == 256 * 4096
+    assert installer.cache.get(plugin['checksum'].split(':')[1]) is not None
+    assert not list((tmp_path / "plugins").glob('.demo.*'))
+
+
+def test_cached_release_is_not_downloaded_again(http_server, installer, tmp_path):
+    http_server.routes['/demo.zip'] = serve_bytes(PAYLOAD)
+    plugin = catalog_entry(http_server, PAYLOAD)
+    installer.install(plugin)
+    
+    # 新的安装器共用同一个缓存目录
+    again = PluginInstaller(tmp_path / "cache", tmp_path / "other")
+    again.install(plugin)
+    
+    assert len(http_server.requests_to('/demo.zip')) == 1
+    assert (tmp_path / "other" / "demo" / "manifest.json").exists()
+
+
+@pytest.mark.parametrize('ranges', [True, False], ids=['range', 'range-ignored'])
+def test_resumes_from_partial_download(http_server, installer, ranges):
+    http_server.routes['/demo.zip'] = serve_bytes(PAYLOAD, ranges=ranges)
+    plugin = catalog_entry(http_server, PAYLOAD)
+    digest = plugin['checksum'].split(':')[1]
+    
+    # 模拟上次下载在一半时中断
+    half = len(PAYLOAD) // 2
+    partial = installer.cache.partial_path_for(digest)
+    partial.parent.mkdir(parents=True)
+    partial.write_bytes(PAYLOAD[:half])
+    
+    path = installer.download(plugin)
+    
+    request = http_server.requests_to('/demo.zip')[0]
+    assert request.headers.get('Range') == f'bytes={half}-'
+    assert path.read_bytes() == PAYLOAD
+    assert not partial.exists()
+
+
+def test_interrupted_transfer_is_resumed(http_server, installer):
+    """服务器发送一半内容后断开连接，保留 .part 文件，下次用 Range 请求继续"""
+    half = len(PAYLOAD) // 2
+    complete = serve_bytes(PAYLOAD)
+    
+    def route(request):
+        if len(http_server.requests_to('/demo.zip')) == 1:
+            return 200, {'Content-Length': str(len(PAYLOAD))}, PAYLOAD[:half]
+        return complete(request)
+    
+    http_server.routes['/demo.zip'] = route
+    plugin = catalog_entry(http_server, PAYLOAD)
+    partial = installer.cache.partial_path_for(plugin['checksum'].split(':')[1])
+    
+    with pytest.raises(InstallError) as excinfo:
+        installer.download(plugin)
+    assert not isinstance(excinfo.value, ChecksumMismatchError)
+    assert partial.read_bytes() == PAYLOAD[:half]
+    
+    path = installer.download(plugin)
+    
+    assert http_server.requests_to('/demo.zip')[1].headers.get('Range') == f'bytes={half}-'
+    assert path.read_bytes() == PAYLOAD
+    assert not partial.exists()
+
+
+def test_completed_partial_download_is_verified_without_body(http_server, installer):
+    """.part 已经完整时服务器返回416，直接校验已下载的内容"""
+    http_server.routes['/demo.zip'] = serve_bytes(PAYLOAD)
+    plugin = catalog_entry(http_server, PAYLOAD)
+    partial = installer.cache.partial_path_for(plugin['checksum'].split(':')[1])
+    partial.parent.mkdir(parents=True)
+    partial.write_bytes(PAYLOAD)
+    
+    assert installer.download(plugin).read_bytes() == PAYLOAD
+
+
+def test_checksum_mismatch_discards_download(http_server, installer):
+    tampered = bytearray(PAYLOAD)
+    tampered[-1] ^= 0xFF
+    http_server.routes['/demo.zip'] = serve_bytes(bytes(tampered))
+    plugin = catalog_entry(http_server, PAYLOAD)
+    digest = plugin['checksum'].split(':')[1]
+    
+    with pytest.raises(ChecksumMismatchError):
+        installer.install(plugin)
+    
+    assert installer.cache.get(digest) is None
+    assert not installer.cache.partial_path_for(digest).exists()
+    assert not (installer.plugins_dir / "demo").exists()
+
+
+def test_oversized_download_is_rejected(http_server, installer):
+    http_server.routes['/demo.zip'] = serve_bytes(PAYLOAD + b'trailing')
+    plugin = catalog_entry(http_server, PAYLOAD)
+    
+    with pytest.raises(ChecksumMismatchError):
+        installer.download(plugin)
+
+
+@pytest.mark.parametrize('name', ['../evil.py', 'nested/../../evil.py', '/absolute.py', 'C:/evil.py'])
+def test_rejects_path_traversal(http_server, installer, tmp_path, name):
+    data = make_archive({'plugin.py': '', name: 'import os'})
+    http_server.routes['/demo.zip'] = serve_bytes(data)
+    
+    with pytest.raises(UnsafeArchiveError):
+        installer.install(catalog_entry(http_server, data))
+    
+    assert not (tmp_path / "evil.py").exists()
+    assert not (installer.plugins_dir / "demo").exists()
+    assert not list(installer.plugins_dir.glob('.demo.*'))
+
+
+def test_rejects_symlinks(http_server, installer):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zipf:
+        zipf.writestr('plugin.py', '')
+        link = zipfile.ZipInfo('secrets')
+        link.create_system = 3
+        link.external_attr = 0o120777 << 16
+        zipf.writestr(link, '/etc/passwd')
+    data = buffer.getvalue()
+    http_server.routes['/demo.zip'] = serve_bytes(data)
+    
+    with pytest.raises(UnsafeArchiveError):
+        installer.install(catalog_entry(http_server, data))
+    
+    assert not (installer.plugins_dir / "demo").exists()
+
+
+def test_rejects_oversized_members(tmp_path):
+    archive = tmp_path / "bomb.zip"
+    archive.write_bytes(make_archive({'big.bin': b'\0' * 4096}))
+    
+    with pytest.raises(UnsafeArchiveError):
+        extract_archive(archive, tmp_path / "out", max_member_size=1024)
+    
+    assert not (tmp_path / "out").exists()
+
+
+def test_failed_update_keeps_installed_version(http_server, installer):
+    http_server.routes['/demo.zip'] = serve_bytes(PAYLOAD)
+    installer.install(catalog_entry(http_server, PAYLOAD))
+    
+    bad = make_archive({'plugin.py': '', '../evil.py': ''})
+    http_server.routes['/bad.zip'] = serve_bytes(bad)
+    with pytest.raises(UnsafeArchiveError):
+        installer.install(catalog_entry(http_server, bad, path='/bad.zip'))
+    
+    assert (installer.plugins_dir / "demo" / "manifest.json").exists()
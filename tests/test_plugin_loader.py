@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+插件加载器测试：按需导入、插件生命周期和不修改 sys.path 的包导入
+测试插件在临时目录中生成，导入、创建和各生命周期方法的调用记录在 loader_events 模块中
+"""
+
+import json
+import sys
+import types
+
+import pytest
+
+from plugin_loader import (PluginLoader, PluginLoadError, HostModuleFinder, install_host_finder,
+                           PLUGIN_PACKAGE)
+
+
+PLUGIN_SOURCE = """
+import loader_events
+
+loader_events.log.append(('import', __name__))
+
+
+class DemoPlugin:
+    settings_validator = None
+    
+    def initialize(self, plugin_manager):
+        loader_events.log.append(('initialize', plugin_manager))
+        return True
+    
+    def activate(self):
+        loader_events.log.append(('activate',))
+        return True
+    
+    def deactivate(self):
+        loader_events.log.append(('deactivate',))
+        return True
+    
+    def cleanup(self):
+        loader_events.log.append(('cleanup',))
+    
+    def get_widget(self):
+        loader_events.log.append(('get_widget',))
+        return 'widget'
+
+
+def create_plugin():
+    loader_events.log.append(('create_plugin',))
+    return DemoPlugin()
+"""
+
+
+def write_plugin(plugins_dir, plugin_id, source=PLUGIN_SOURCE, **manifest_fields):
+    plugin_dir = plugins_dir / plugin_id
+    plugin_dir.mkdir(parents=True)
+    manifest = {
+        'id': plugin_id,
+        'name': plugin_id,
+        'version': '1.0.0',
+        'description': '测试插件',
+        'author': 'TimeNest',
+        'plugin_class': 'DemoPlugin',
+        'plugin_type': 'utility',
+        'api_version': '1.0.0',
+        **manifest_fields
+    }
+    (plugin_dir / 'manifest.json').write_text(json.dumps(manifest), encoding='utf-8')
+    (plugin_dir / 'plugin.py').write_text(source, encoding='utf-8')
+    return plugin_dir
+
+
+@pytest.fixture
+def events(monkeypatch):
+    """记录插件事件的模块，测试结束后移除测试插件的模块"""
+    module = types.ModuleType('loader_events')
+    module.log = []
+    monkeypatch.setitem(sys.modules, 'loader_events', module)
+    yield module.log
+    for name in [name for name in sys.modules if name.startswith(f"{PLUGIN_PACKAGE}.test_")]:
+        del sys.modules[name]
+
+
+@pytest.fixture
+def plugins_dir(tmp_path):
+    write_plugin(tmp_path, 'test_lazy', settings={'interval': {'type': 'integer', 'min': 1, 'default': 5}})
+    write_plugin(tmp_path, 'test_other')
+    return tmp_path
+
+
+def test_discover_reads_manifests_without_importing(plugins_dir, events):
+    write_plugin(plugins_dir, 'test_invalid', plugin_type='widget')
+    (plugins_dir / 'not_a_plugin').mkdir()
+    
+    loader = PluginLoader(plugins_dir)
+    descriptors = loader.discover()
+    
+    assert [descriptor.id for descriptor in descriptors] == ['test_lazy', 'test_other']
+    assert loader.get('test_lazy').description == '测试插件'
+    assert not loader.get('test_lazy').loaded
+    assert events == []
+    assert f"{PLUGIN_PACKAGE}.test_lazy.plugin" not in sys.modules
+
+
+def test_plugin_is_imported_on_first_activate(plugins_dir, events):
+    manager = object()
+    loader = PluginLoader(plugins_dir, plugin_manager=manager)
+    loader.discover()
+    
+    instance = loader.activate('test_lazy')
+    
+    assert events == [('import', f"{PLUGIN_PACKAGE}.test_lazy.plugin"), ('create_plugin',),
+                      ('initialize', manager), ('activate',)]
+    assert loader.get('test_lazy').instance is instance
+    assert not loader.get('test_other').loaded
+    assert instance.settings_validator.defaults == {'interval': 5}
+
+
+def test_widget_is_created_on_demand(plugins_dir, events):
+    loader = PluginLoader(plugins_dir)
+    loader.discover()
+    assert loader.get_widget('test_lazy') is None
+    
+    loader.activate('test_lazy')
+    assert ('get_widget',) not in events
+    assert loader.get_widget('test_lazy') == 'widget'
+
+
+def test_reactivation_reuses_instance_until_unload(plugins_dir, events):
+    loader = PluginLoader(plugins_dir)
+    loader.discover()
+    instance = loader.activate('test_lazy')
+    
+    assert loader.deactivate('test_lazy')
+    assert loader.activate('test_lazy') is instance
+    assert [event[0] for event in events].count('import') == 1
+    
+    assert loader.unload('test_lazy')
+    assert events[-1] == ('cleanup',)
+    assert f"{PLUGIN_PACKAGE}.test_lazy.plugin" not in sys.modules
+    assert loader.activate('test_lazy') is not instance
+    assert [event[0] for event in events].count('import') == 2
+
+
+def test_discover_keeps_loaded_instances(plugins_dir, events):
+    loader = PluginLoader(plugins_dir)
+    loader.discover()
+    instance = loader.activate('test_lazy')
+    
+    loader.discover()
+    assert loader.get('test_lazy').instance is instance
+
+
+def test_load_errors(plugins_dir, events):
+    write_plugin(plugins_dir, 'test_broken', source="raise RuntimeError('导入失败')\n")
+    write_plugin(plugins_dir, 'test_refuses', source=PLUGIN_SOURCE.replace(
+        "loader_events.log.append(('activate',))\n        return True",
+        "loader_events.log.append(('activate',))\n        return False"))
+    loader = PluginLoader(plugins_dir)
+    loader.discover()
+    
+    with pytest.raises(PluginLoadError, match="插件 test_missing 未安装"):
+        loader.activate('test_missing')
+    with pytest.raises(PluginLoadError, match="导入插件 test_broken 失败: 导入失败"):
+        loader.activate('test_broken')
+    with pytest.raises(PluginLoadError, match="插件 test_refuses 激活失败"):
+        loader.activate('test_refuses')
+
+
+class TestPackageImport:
+    
+    SOURCE = PLUGIN_SOURCE + """
+from .helpers import VALUE
+"""
+    
+    def test_plugins_are_isolated_packages(self, tmp_path, events):
+        for plugin_id in ('test_first', 'test_second'):
+            plugin_dir = write_plugin(tmp_path, plugin_id, source=self.SOURCE)
+            (plugin_dir / 'helpers.py').write_text(f"VALUE = {plugin_id!r}\n", encoding='utf-8')
+        path_before = list(sys.path)
+        loader = PluginLoader(tmp_path)
+        loader.discover()
+        
+        first = loader.import_plugin(loader.get('test_first'))
+        second = loader.import_plugin(loader.get('test_second'))
+        
+        # 同名的 helpers 模块互不覆盖，也不会以顶层模块 helpers 导入
+        assert (first.VALUE, second.VALUE) == ('test_first', 'test_second')
+        assert 'helpers' not in sys.modules
+        assert sys.path == path_before
+    
+    def test_import_plugin_module_skips_main_module(self, tmp_path, events):
+        plugin_dir = write_plugin(tmp_path, 'test_parts')
+        (plugin_dir / 'store.py').write_text("VALUE = 1\n", encoding='utf-8')
+        loader = PluginLoader(tmp_path)
+        loader.discover()
+        
+        assert loader.import_plugin_module(loader.get('test_parts'), 'store').VALUE == 1
+        assert events == []
+        with pytest.raises(PluginLoadError, match="导入插件 test_parts 的模块 missing 失败"):
+            loader.import_plugin_module(loader.get('test_parts'), 'missing')
+
+
+def test_host_finder_only_serves_named_packages(tmp_path):
+    (tmp_path / 'timenest_test_host').mkdir()
+    (tmp_path / 'timenest_test_host' / '__init__.py').write_text("", encoding='utf-8')
+    (tmp_path / 'other_package').mkdir()
+    (tmp_path / 'other_package' / '__init__.py').write_text("", encoding='utf-8')
+    finder = HostModuleFinder(tmp_path, ['timenest_test_host'])
+    
+    spec = finder.find_spec('timenest_test_host')
+    assert spec.origin == str(tmp_path / 'timenest_test_host' / '__init__.py')
+    assert finder.find_spec('other_package') is None
+    assert finder.find_spec('timenest_test_host.plugin_base') is None
+
+
+def test_install_host_finder_registers_each_directory_once(tmp_path):
+    finder = install_host_finder(tmp_path)
+    try:
+        assert install_host_finder(tmp_path) is finder
+        assert sys.meta_path.count(finder) == 1
+    finally:
+        sys.meta_path.remove(finder)
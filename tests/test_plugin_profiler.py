@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+插件加载性能分析测试：阶段测量、内存跟踪和报告
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+
+import pytest
+
+from plugin_loader import PluginLoader, PLUGIN_PACKAGE
+from plugin_profiler import PluginProfiler, PHASES
+
+
+PLUGIN_SOURCE = """
+import time
+
+time.sleep({import_delay})
+
+
+class DemoPlugin:
+    def initialize(self, plugin_manager):
+        return True
+    
+    def activate(self):
+        return True
+    
+    def get_widget(self):
+        return None
+
+
+def create_plugin():
+    return DemoPlugin()
+"""
+
+
+@pytest.fixture
+def profiler():
+    profiler = PluginProfiler()
+    yield profiler
+    profiler.stop()
+
+
+@pytest.fixture
+def plugins_dir(tmp_path):
+    """两个测试插件，test_slow 的导入阶段更慢"""
+    for plugin_id, import_delay in (('test_fast', 0), ('test_slow', 0.05)):
+        plugin_dir = tmp_path / plugin_id
+        plugin_dir.mkdir()
+        (plugin_dir / 'manifest.json').write_text(json.dumps({
+            'id': plugin_id, 'name': plugin_id, 'version': '1.0.0', 'description': '测试插件',
+            'author': 'TimeNest', 'plugin_class': 'DemoPlugin', 'plugin_type': 'utility', 'api_version': '1.0.0'
+        }), encoding='utf-8')
+        (plugin_dir / 'plugin.py').write_text(PLUGIN_SOURCE.format(import_delay=import_delay), encoding='utf-8')
+    yield tmp_path
+    for name in [name for name in sys.modules if name.startswith(f"{PLUGIN_PACKAGE}.test_")]:
+        del sys.modules[name]
+
+
+def test_loader_records_every_phase(plugins_dir, profiler):
+    loader = PluginLoader(plugins_dir, profiler=profiler)
+    loader.discover()
+    for plugin_id in ('test_fast', 'test_slow'):
+        loader.activate(plugin_id)
+        loader.get_widget(plugin_id)
+        loader.get_widget(plugin_id)
+    
+    report = profiler.report()
+    
+    assert report['phases'] == list(PHASES)
+    assert report['slowest'] == ['test_slow', 'test_fast']
+    slow = report['plugins']['test_slow']
+    assert list(slow) == list(PHASES) + ['total']
+    assert slow['import']['wall_ms'] >= 50
+    # 等待不占用CPU时间
+    assert slow['import']['cpu_ms'] < slow['import']['wall_ms']
+    assert slow['total']['ok']
+    assert slow['total']['wall_ms'] == pytest.approx(sum(slow[phase]['wall_ms'] for phase in PHASES), abs=0.01)
+    # 只测量第一次 get_widget()
+    assert len([record for record in profiler.records if record.phase == 'first_get_widget']) == 2
+
+
+def test_failed_phase_is_recorded_and_reraised(profiler):
+    with pytest.raises(RuntimeError):
+        with profiler.measure('demo', 'initialize'):
+            raise RuntimeError("初始化失败")
+    
+    entry = profiler.report()['plugins']['demo']
+    assert entry['initialize']['ok'] is False
+    assert entry['total']['ok'] is False
+    assert '!' in profiler.format_report().splitlines()[1]
+
+
+def test_allocations_are_measured_per_phase(profiler):
+    with profiler.measure('demo', 'import'):
+        kept = bytearray(256 * 1024)
+    with profiler.measure('demo', 'activate'):
+        bytearray(512 * 1024)
+    
+    entry = profiler.report()['plugins']['demo']
+    assert entry['import']['allocated_kib'] >= 256
+    assert entry['activate']['allocated_kib'] < 16
+    assert entry['activate']['peak_kib'] >= 512
+    assert len(kept) == 256 * 1024
+    
+    profiler.stop()
+    assert not tracemalloc.is_tracing()
+
+
+def test_timing_only_profiler():
+    profiler = PluginProfiler(trace_allocations=False)
+    with profiler.measure('demo', 'import'):
+        time.sleep(0.001)
+    
+    entry = profiler.report()['plugins']['demo']
+    assert entry['import']['allocated_kib'] is None
+    assert entry['total']['allocated_kib'] is None
+    assert not tracemalloc.is_tracing()
+
+
+def test_latest_measurement_wins_and_report_is_saved(profiler, tmp_path):
+    with profiler.measure('demo', 'activate'):
+        time.sleep(0.02)
+    with profiler.measure('demo', 'activate'):
+        pass
+    
+    assert profiler.report()['plugins']['demo']['activate']['wall_ms'] < 20
+    profiler.save_report(tmp_path / 'profile.json')
+    assert json.loads((tmp_path / 'profile.json').read_text(encoding='utf-8')) == profiler.report()
+    
+    profiler.clear()
+    assert profiler.report()['plugins'] == {}
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+商城目录客户端测试：增量更新、分词和目录索引查询
+增量更新文件由 build_releases.publish_catalog 在临时目录中生成
+"""
+
+import copy
+import json
+
+import pytest
+
+import build_releases
+from store_catalog import (CatalogIndex, CatalogDeltaError, apply_catalog_delta, refresh_catalog,
+                           delta_path, tokenize, query_tokens)
+
+
+def entry(plugin_id, name, category, tags=(), description='', downloads=0, rating=0, updated_at=''):
+    return {
+        'id': plugin_id,
+        'name': name,
+        'category': category,
+        'tags': list(tags),
+        'description': description,
+        'downloads': downloads,
+        'rating': rating,
+        'updated_at': updated_at
+    }
+
+
+@pytest.fixture
+def index():
+    return CatalogIndex({
+        'featured': ['pomodoro_timer', 'removed_plugin'],
+        'plugins': [
+            entry('weather_enhanced', "增强天气插件", 'component', ['天气', 'Weather'],
+                  "显示详细的天气预报，可以与日历插件一起使用", downloads=1500, rating=4.5,
+                  updated_at='2025-01-10T00:00:00Z'),
+            entry('pomodoro_timer', "番茄钟插件", 'utility', ['效率', '计时器'],
+                  "番茄工作法计时器，支持统计", downloads=3000, rating=4.8, updated_at='2025-01-05T00:00:00Z'),
+            entry('dark_theme', "深色主题包", 'theme', ['主题', '深色'],
+                  "为Windows和macOS提供深色主题", downloads=5000, rating=4.2, updated_at='2025-01-12T00:00:00Z'),
+            entry('calendar_sync', "日历同步插件", 'integration', ['日历', '效率', 'Outlook'],
+                  "与Google日历和Outlook同步，显示即将到来的事件", downloads=800, rating=4.6,
+                  updated_at='2025-01-14T00:00:00Z'),
+        ]
+    })
+
+
+def ids(plugins):
+    return [plugin['id'] for plugin in plugins]
+
+
+class TestCatalogDeltas:
+    
+    @pytest.fixture
+    def store(self, tmp_path, monkeypatch):
+        """临时的商城仓库，publish() 以给定的时间发布 plugins.json"""
+        catalog = {
+            'version': '1.0.0',
+            'last_updated': '2025-01-01T00:00:00Z',
+            'featured': ['a'],
+            'categories': [{'id': 'utility', 'name': '实用工具'}],
+            'plugins': [
+                {'id': 'a', 'name': "插件A", 'version': '1.0.0', 'category': 'utility'},
+                {'id': 'b', 'name': "插件B", 'version': '1.0.0', 'category': 'utility'},
+                {'id': 'c', 'name': "插件C", 'version': '1.0.0', 'category': 'utility'},
+            ]
+        }
+        (tmp_path / 'plugins.json').write_text(json.dumps(catalog), encoding='utf-8')
+        
+        def publish(now):
+            monkeypatch.setattr(build_releases, 'utc_timestamp', lambda: now)
+            return build_releases.publish_catalog(tmp_path / 'plugins.json', tmp_path / 'catalog')
+        
+        publish('2025-01-01T00:00:00Z')
+        return tmp_path, publish
+    
+    @staticmethod
+    def read(store_dir, path):
+        try:
+            return json.loads((store_dir / path).read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return None
+    
+    @staticmethod
+    def edit(store_dir, change):
+        catalog = json.loads((store_dir / 'plugins.json').read_text(encoding='utf-8'))
+        change(catalog)
+        (store_dir / 'plugins.json').write_text(json.dumps(catalog), encoding='utf-8')
+    
+    def test_delta_round_trip(self, store):
+        store_dir, publish = store
+        cached = self.read(store_dir, 'plugins.json')
+        
+        def change(catalog):
+            catalog['plugins'][0]['version'] = '1.1.0'
+            del catalog['plugins'][1]
+            catalog['plugins'].append({'id': 'd', 'name': "插件D", 'version': '1.0.0', 'category': 'utility'})
+            catalog['featured'] = ['d']
+        
+        self.edit(store_dir, change)
+        publish('2025-02-01T00:00:00Z')
+        latest = self.read(store_dir, 'plugins.json')
+        
+        delta = self.read(store_dir, delta_path(cached['last_updated']))
+        assert ids(delta['plugins']) == ['a', 'd']
+        assert delta['removed'] == ['b']
+        assert apply_catalog_delta(copy.deepcopy(cached), delta) == latest
+        
+        # 再发布一次，两个历史版本都能直接更新到最新版本
+        self.edit(store_dir, lambda catalog: catalog['plugins'][1].update(version='2.0.0'))
+        publish('2025-03-01T00:00:00Z')
+        latest = self.read(store_dir, 'plugins.json')
+        assert self.read(store_dir, 'catalog/deltas/index.json')['versions'] == [
+            '2025-01-01T00:00:00Z', '2025-02-01T00:00:00Z']
+        
+        refreshed, method = refresh_catalog(cached, lambda path: self.read(store_dir, path))
+        assert (refreshed, method) == (latest, 'delta')
+    
+    def test_unchanged_catalog_is_not_republished(self, store):
+        store_dir, publish = store
+        
+        assert publish('2025-02-01T00:00:00Z') == 0
+        cached = self.read(store_dir, 'plugins.json')
+        assert cached['last_updated'] == '2025-01-01T00:00:00Z'
+        assert refresh_catalog(cached, lambda path: self.read(store_dir, path)) == (cached, 'unchanged')
+    
+    def test_unknown_version_falls_back_to_full_catalog(self, store):
+        store_dir, publish = store
+        self.edit(store_dir, lambda catalog: catalog['plugins'][0].update(version='1.1.0'))
+        publish('2025-02-01T00:00:00Z')
+        
+        stale = {'last_updated': '2024-06-01T00:00:00Z', 'plugins': []}
+        refreshed, method = refresh_catalog(stale, lambda path: self.read(store_dir, path))
+        assert method == 'full'
+        assert refreshed == self.read(store_dir, 'plugins.json')
+        assert refresh_catalog(None, lambda path: self.read(store_dir, path))[1] == 'full'
+    
+    def test_delta_for_another_version_is_rejected(self):
+        with pytest.raises(CatalogDeltaError):
+            apply_catalog_delta({'last_updated': 'v1', 'plugins': []}, {'from': 'v2', 'to': 'v3'})
+
+
+def test_tokenize_splits_chinese_into_characters_and_bigrams():
+    assert tokenize("番茄钟 Timer2") == ['番', '茄', '钟', '番茄', '茄钟', 'timer2']
+    assert query_tokens("番茄钟 番茄") == ['番茄', '茄钟']
+    assert query_tokens("钟") == ['钟']
+
+
+def test_lookup_and_featured(index):
+    assert index.get('dark_theme')['name'] == "深色主题包"
+    assert index.get('missing') is None
+    assert ids(index.featured()) == ['pomodoro_timer']
+    assert index.category_counts() == {'component': 1, 'utility': 1, 'theme': 1, 'integration': 1}
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("天气", ['weather_enhanced']),
+    ("计时", ['pomodoro_timer']),
+    ("同步 日历", ['calendar_sync']),
+    ("OUTLOOK", ['calendar_sync']),
+    ("wea", ['weather_enhanced']),
+    ("天气 番茄", []),
+])
+def test_text_search_requires_every_term(index, text, expected):
+    assert ids(index.search(text)) == expected
+
+
+def test_prefix_matching_can_be_disabled(index):
+    assert ids(index.search("wea", prefix=False)) == []
+    assert ids(index.search("weather", prefix=False)) == ['weather_enhanced']
+
+
+def test_name_matches_rank_above_description_matches(index):
+    # "日历" 出现在日历同步插件的名称中，只出现在天气插件的描述中，名称命中优先于下载量
+    assert ids(index.search("日历")) == ['calendar_sync', 'weather_enhanced']
+    # 命中权重相同时按下载量排序
+    assert ids(index.search("插件")) == ['pomodoro_timer', 'weather_enhanced', 'calendar_sync']
+
+
+def test_tags_and_category_filters(index):
+    assert ids(index.search(tags=['效率'])) == ['pomodoro_timer', 'calendar_sync']
+    assert ids(index.search(tags=['效率'], category='integration')) == ['calendar_sync']
+    assert ids(index.search(tags=['weather'])) == ['weather_enhanced']
+    assert index.search(tags=['效率'], category='theme') == []
+
+
+@pytest.mark.parametrize('sort, expected', [
+    ('relevance', ['dark_theme', 'pomodoro_timer', 'weather_enhanced', 'calendar_sync']),
+    ('downloads', ['dark_theme', 'pomodoro_timer', 'weather_enhanced', 'calendar_sync']),
+    ('rating', ['pomodoro_timer', 'calendar_sync', 'weather_enhanced', 'dark_theme']),
+    ('updated', ['calendar_sync', 'dark_theme', 'weather_enhanced', 'pomodoro_timer']),
+])
+def test_sort_orders(index, sort, expected):
+    assert ids(index.search(sort=sort)) == expected
+
+
+def test_pagination_matches_full_ordering(index):
+    ordered = ids(index.search(sort='rating'))
+    assert ids(index.search(sort='rating', limit=2)) == ordered[:2]
+    assert ids(index.search(sort='rating', limit=2, offset=1)) == ordered[1:3]
+    assert ids(index.search(sort='rating', offset=3)) == ordered[3:]
+
+
+def test_unknown_sort_is_rejected(index):
+    with pytest.raises(ValueError, match="未知的排序方式"):
+        index.search(sort='name')